@@ -14,28 +14,34 @@ from .forms import (
     ChemicalControlRangeForm,  # ✅ 추가
 )
 
-# XLSX 내보내기용 (누락 보완)
-from io import BytesIO                                  # ← 추가
-from urllib.parse import quote                          # ← 추가
-from openpyxl import Workbook                           # ← 추가
-from openpyxl.styles import Alignment, Font             # ← 추가
+# XLSX 내보내기 (write-only 공용 경로)
+from utils.export import XlsxColumn, iter_queryset, xlsx_response
 
 from django.template.loader import render_to_string      # ✅ 추가
 from django.views.decorators.http import require_http_methods  # ✅ 추가
 
-def chemical_list(request):
+def _filtered_chemical_qs(request):
+    """목록/엑셀 공용 검색 조건"""
     search_name = request.GET.get('name', '')
     search_spec = request.GET.get('spec', '')
     search_customer = request.GET.get('customer', '')
 
-    chemical_qs = Chemical.objects.filter(delete_yn='N')
-
+    qs = Chemical.objects.filter(delete_yn='N')
     if search_name:
-        chemical_qs = chemical_qs.filter(name__icontains=search_name)
+        qs = qs.filter(name__icontains=search_name)
     if search_spec:
-        chemical_qs = chemical_qs.filter(spec__icontains=search_spec)
+        qs = qs.filter(spec__icontains=search_spec)
     if search_customer:
-        chemical_qs = chemical_qs.filter(customer__name__icontains=search_customer)
+        qs = qs.filter(customer__name__icontains=search_customer)
+    return qs
+
+
+def chemical_list(request):
+    search_name = request.GET.get('name', '')
+    search_spec = request.GET.get('spec', '')
+    search_customer = request.GET.get('customer', '')
+
+    chemical_qs = _filtered_chemical_qs(request)
 
     paginator = Paginator(chemical_qs.order_by('name', 'id'), 20)
     page_number = request.GET.get('page')
@@ -116,44 +122,25 @@ def chemical_price_view(request, pk):
     }
     return render(request, 'chemical/chemical_price.html', context)
 
-def chemical_export(request):
-    # 검색 파라미터 그대로 사용
-    search_name = request.GET.get('name', '')
-    search_spec = request.GET.get('spec', '')
-    search_customer = request.GET.get('customer', '')
+CHEMICAL_XLSX_COLUMNS = [
+    XlsxColumn('번호', 6),
+    XlsxColumn('품명', 24),
+    XlsxColumn('규격(자연어)', 30),
+    XlsxColumn('단위규격(정수)', 12, '#,##0'),
+    XlsxColumn('측정 단위', 12),
+    XlsxColumn('포장단위', 12),
+    XlsxColumn('비고', 20),
+    XlsxColumn('고객사', 18),
+    XlsxColumn('사용여부', 10),
+]
 
-    qs = Chemical.objects.filter(delete_yn='N')
-    if search_name:
-        qs = qs.filter(name__icontains=search_name)
-    if search_spec:
-        qs = qs.filter(spec__icontains=search_spec)
-    if search_customer:
-        qs = qs.filter(customer__name__icontains=search_customer)
 
-    qs = qs.order_by('name', 'id')  # 목록 정렬과 동일 권장
-
-    # ── openpyxl로 XLSX 생성 (한글 깨짐 방지: XLSX 사용)
-    wb = Workbook()
-    ws = wb.active
-    ws.title = '약품목록'
-
-    headers = [
-        '번호', '품명', '규격(자연어)', '단위규격(정수)', '측정 단위', '포장단위', '비고',
-        '고객사', '사용여부'
-    ]
-    ws.append(headers)
-
-    # 헤더 스타일
-    header_font = Font(bold=True)
-    center = Alignment(horizontal='center', vertical='center')
-    for col_idx in range(1, len(headers) + 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = header_font
-        cell.alignment = center
-
-    # 데이터
-    for idx, c in enumerate(qs, start=1):
-        ws.append([
+def chemical_export(request):
+    # 검색 조건은 목록과 동일
+    qs = _filtered_chemical_qs(request).select_related('customer').order_by('name', 'id')
+
+    rows = (
+        [
             idx,
             c.name or '',
             c.spec or '',
@@ -163,30 +150,11 @@ def chemical_export(request):
             c.spec_note or '',
             (c.customer.name if c.customer else ''),
             c.get_use_yn_display() if hasattr(c, 'get_use_yn_display') else c.use_yn,
-        ])
-
-    # 열 너비(가독성)
-    widths = [6, 24, 30, 12, 12, 12, 20, 18, 10]
-    for i, w in enumerate(widths, start=1):
-        ws.column_dimensions[chr(64 + i)].width = w
-
-    # 첫 행 고정
-    ws.freeze_panes = 'A2'
-
-    # 응답
-    now = timezone.now().strftime('%Y%m%d_%H%M%S')
-    filename_ko = f'약품목록_{now}.xlsx'
-    resp = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        ]
+        for idx, c in enumerate(iter_queryset(qs), start=1)
     )
-    # 한글 파일명 호환(IE/Edge/Chrome)
-    resp['Content-Disposition'] = f"attachment; filename=chemical.xlsx; filename*=UTF-8''{quote(filename_ko)}"
-
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    resp.write(buffer.getvalue())
-    return resp
+    now = timezone.now().strftime('%Y%m%d_%H%M%S')
+    return xlsx_response(f'약품목록_{now}.xlsx', '약품목록', CHEMICAL_XLSX_COLUMNS, rows)
 
 @require_http_methods(["GET", "POST"])
 def chemical_std_view(request, pk):
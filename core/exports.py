@@ -0,0 +1,197 @@
+# core/exports.py
+"""
+백그라운드 내보내기 (DB 큐 + 로컬 워커)
+
+- 각 앱의 exports.py 에서 @register_export("앱.종류") 로 작업 종류를 등록한다.
+  등록 함수는 params(QueryDict, 화면 querystring 그대로)를 받아 ExportSpec 을 돌려준다.
+  → 목록 화면과 같은 필터 함수를 호출해야 화면과 파일 내용이 일치한다.
+- enqueue_export() 로 큐 적재, 워커(manage.py run_export_worker)가
+  claim_next_job() → run_job() 순서로 처리한다.
+- 결과 파일: MEDIA_ROOT/exports/YYYYMM/<uuid>.<csv|xlsx>
+  (MEDIA 는 공개 경로라 파일명은 추측 불가한 uuid, 다운로드는 권한 확인 뷰로만 안내)
+"""
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from production.orders.views import _today_localdate
+from utils.export import (
+    EXPORT_CHUNK_SIZE, XlsxColumn, iter_csv, iter_queryset, write_xlsx,
+)
+
+from .models import ExportJob
+
+EXPORT_DIR = "exports"
+EXPORT_KEEP_DAYS = 7           # 완료 파일 보관 기간
+EXPORT_STALE_MINUTES = 60      # RUNNING 상태로 이 시간 넘게 진행 기록(heartbeat)이 없는 작업은 재대기
+_PROGRESS_EVERY = EXPORT_CHUNK_SIZE
+
+
+@dataclass
+class ExportSpec:
+    filename: str                       # 다운로드 파일명(확장자 제외)
+    header: list
+    qs: object                          # 쿼리셋 (count + iterator)
+    row_fn: Callable[[object], list]
+    widths: list | None = None          # XLSX 열 너비 (생략 시 12)
+
+
+_REGISTRY: dict[str, tuple[str, Callable[[QueryDict], ExportSpec]]] = {}
+_discovered = False
+
+
+def register_export(kind: str, title: str):
+    """작업 종류 등록 데코레이터"""
+    def deco(fn):
+        _REGISTRY[kind] = (title, fn)
+        return fn
+    return deco
+
+
+def export_kinds() -> dict[str, str]:
+    """{kind: title}"""
+    _discover()
+    return {k: title for k, (title, _fn) in _REGISTRY.items()}
+
+
+def _discover():
+    global _discovered
+    if not _discovered:
+        autodiscover_modules("exports")
+        _discovered = True
+
+
+# ─────────────────────────────────────────────
+# 큐 적재 / 가져가기
+# ─────────────────────────────────────────────
+
+def enqueue_export(kind: str, query: str, *, fmt: str = ExportJob.Format.CSV, user=None) -> ExportJob:
+    if kind not in export_kinds():
+        raise ValueError(f"알 수 없는 내보내기 종류: {kind}")
+    if fmt not in ExportJob.Format.values:
+        raise ValueError(f"지원하지 않는 형식: {fmt}")
+    return ExportJob.objects.create(
+        kind=kind,
+        query=(query or "").lstrip("?"),
+        fmt=fmt,
+        created_by=user if getattr(user, "is_authenticated", False) else None,
+    )
+
+
+def claim_next_job() -> ExportJob | None:
+    """QUEUED 1건을 RUNNING 으로 가져감 (SKIP LOCKED → 워커 여러 개 동시 실행 가능)"""
+    with transaction.atomic():
+        job = (
+            ExportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=ExportJob.Status.QUEUED)
+            .order_by("id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ExportJob.Status.RUNNING
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.done_rows = 0
+        job.error = ""
+        job.save(update_fields=["status", "started_at", "heartbeat_at", "done_rows", "error"])
+    return job
+
+
+def requeue_stale_jobs(minutes: int = EXPORT_STALE_MINUTES) -> int:
+    """
+    워커가 죽어 RUNNING 으로 남은 작업을 다시 대기열로.
+    기준은 마지막 진행 기록(heartbeat_at) — 오래 걸려도 진행 중인 대용량 작업은 건드리지 않음
+    """
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return (
+        ExportJob.objects
+        .filter(status=ExportJob.Status.RUNNING)
+        .filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff))
+        .update(status=ExportJob.Status.QUEUED, started_at=None, heartbeat_at=None)
+    )
+
+
+def purge_old_exports(days: int = EXPORT_KEEP_DAYS) -> int:
+    """보관 기간 지난 작업/파일 정리"""
+    cutoff = timezone.now() - timedelta(days=days)
+    old = ExportJob.objects.filter(created_at__lt=cutoff).exclude(status=ExportJob.Status.RUNNING)
+    count = 0
+    for job in old.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        count += 1
+    old.delete()
+    return count
+
+
+# ─────────────────────────────────────────────
+# 실행
+# ─────────────────────────────────────────────
+
+def _heartbeat(job: ExportJob, **fields) -> None:
+    """진행 상황 + heartbeat_at 기록 (requeue_stale_jobs 가 살아있는 작업으로 봄)"""
+    ExportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now(), **fields)
+
+
+def _progress(job: ExportJob, rows: Iterable) -> Iterable:
+    """행을 그대로 흘려보내면서 EXPORT_CHUNK_SIZE 마다 진행률 + heartbeat 기록"""
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % _PROGRESS_EVERY == 0:
+            _heartbeat(job, done_rows=done)
+    job.done_rows = done
+
+
+def run_job(job: ExportJob) -> ExportJob:
+    """RUNNING 작업 1건 실행 → DONE/FAILED 기록"""
+    _discover()
+    abs_path = None
+    try:
+        entry = _REGISTRY.get(job.kind)
+        if entry is None:
+            raise ValueError(f"알 수 없는 내보내기 종류: {job.kind}")
+        spec = entry[1](QueryDict(job.query))
+
+        job.total_rows = spec.qs.count()
+        _heartbeat(job, total_rows=job.total_rows)
+
+        rel_path = f"{EXPORT_DIR}/{_today_localdate():%Y%m}/{uuid.uuid4().hex}.{job.fmt}"
+        abs_path = os.path.join(settings.MEDIA_ROOT, rel_path)
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+
+        rows = _progress(job, (spec.row_fn(o) for o in iter_queryset(spec.qs)))
+        if job.fmt == ExportJob.Format.XLSX:
+            widths = spec.widths or [12] * len(spec.header)
+            columns = [XlsxColumn(t, w) for t, w in zip(spec.header, widths)]
+            with open(abs_path, "wb") as fp:
+                write_xlsx(fp, job.kind.rsplit(".", 1)[-1], columns, rows)
+        else:
+            with open(abs_path, "w", encoding="utf-8", newline="") as fp:
+                for chunk in iter_csv(spec.header, rows):
+                    fp.write(chunk)
+
+        job.file.name = rel_path
+        job.filename = f"{spec.filename}.{job.fmt}"
+        job.status = ExportJob.Status.DONE
+    except Exception as e:  # 작업 단위 실패는 기록만 하고 워커는 계속
+        job.status = ExportJob.Status.FAILED
+        job.error = f"{type(e).__name__}: {e}"[:2000]
+        if abs_path and os.path.exists(abs_path):
+            os.remove(abs_path)
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        "status", "total_rows", "done_rows", "file", "filename", "error", "finished_at",
+    ])
+    return job
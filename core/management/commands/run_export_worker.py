@@ -0,0 +1,47 @@
+# core/management/commands/run_export_worker.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.exports import claim_next_job, purge_old_exports, requeue_stale_jobs, run_job
+
+_HOUSEKEEP_SEC = 3600
+
+
+class Command(BaseCommand):
+    help = "내보내기 작업 큐(core_export_job)를 처리하는 로컬 워커. 여러 개 동시 실행 가능."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="대기 작업을 모두 처리하고 종료")
+        parser.add_argument("--sleep", type=float, default=2.0, help="대기열이 비었을 때 폴링 간격(초)")
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        sleep = options["sleep"]
+        last_housekeep = 0.0
+
+        while True:
+            now = time.monotonic()
+            if now - last_housekeep >= _HOUSEKEEP_SEC:
+                requeued = requeue_stale_jobs()
+                purged = purge_old_exports()
+                if requeued or purged:
+                    self.stdout.write(f"정리: 재대기 {requeued}건, 만료 삭제 {purged}건")
+                last_housekeep = now
+
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    return
+                time.sleep(sleep)
+                continue
+
+            job = run_job(job)
+            if job.status == job.Status.DONE:
+                self.stdout.write(self.style.SUCCESS(
+                    f"[{job.pk}] {job.kind} 완료: {job.done_rows}행 → {job.file.name}"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f"[{job.pk}] {job.kind} 실패: {job.error}"))
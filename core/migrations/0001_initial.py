@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='작업 종류')),
+                ('query', models.TextField(blank=True, default='', verbose_name='검색조건')),
+                ('fmt', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'XLSX')], default='csv', max_length=4, verbose_name='형식')),
+                ('status', models.CharField(choices=[('QUEUED', '대기'), ('RUNNING', '진행중'), ('DONE', '완료'), ('FAILED', '실패')], default='QUEUED', max_length=10, verbose_name='상태')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='전체 행 수')),
+                ('done_rows', models.PositiveIntegerField(default=0, verbose_name='처리 행 수')),
+                ('file', models.FileField(blank=True, default='', upload_to='exports/', verbose_name='결과 파일')),
+                ('filename', models.CharField(blank=True, default='', max_length=200, verbose_name='다운로드 파일명')),
+                ('error', models.TextField(blank=True, default='', verbose_name='오류')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='요청일시')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='시작일시')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='종료일시')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='요청자')),
+            ],
+            options={
+                'verbose_name': '내보내기 작업',
+                'verbose_name_plural': '내보내기 작업',
+                'db_table': 'core_export_job',
+                'indexes': [models.Index(fields=['status', 'id'], name='ix_export_job_status')],
+            },
+        ),
+    ]
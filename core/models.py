@@ -1,3 +1,64 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+# ─────────────────────────────────────────────
+#  백그라운드 내보내기 작업 (DB 큐)
+# ─────────────────────────────────────────────
+
+class ExportJob(models.Model):
+    """
+    목록 화면의 대용량 내보내기 요청.
+    화면 검색조건(querystring)을 그대로 저장해 두고, 로컬 워커(run_export_worker)가
+    QUEUED 건을 하나씩 가져가 MEDIA_ROOT/exports/ 아래에 파일을 만든다. (core.exports 참고)
+    """
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "대기"
+        RUNNING = "RUNNING", "진행중"
+        DONE = "DONE", "완료"
+        FAILED = "FAILED", "실패"
+
+    class Format(models.TextChoices):
+        CSV = "csv", "CSV"
+        XLSX = "xlsx", "XLSX"
+
+    kind = models.CharField("작업 종류", max_length=50)
+    query = models.TextField("검색조건", blank=True, default="")
+    fmt = models.CharField("형식", max_length=4, choices=Format.choices, default=Format.CSV)
+    status = models.CharField("상태", max_length=10, choices=Status.choices, default=Status.QUEUED)
+
+    total_rows = models.PositiveIntegerField("전체 행 수", default=0)
+    done_rows = models.PositiveIntegerField("처리 행 수", default=0)
+
+    file = models.FileField("결과 파일", upload_to="exports/", blank=True, default="")
+    filename = models.CharField("다운로드 파일명", max_length=200, blank=True, default="")
+    error = models.TextField("오류", blank=True, default="")
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+        null=True, blank=True, related_name="+", verbose_name="요청자",
+    )
+    created_at = models.DateTimeField("요청일시", auto_now_add=True)
+    started_at = models.DateTimeField("시작일시", null=True, blank=True)
+    finished_at = models.DateTimeField("종료일시", null=True, blank=True)
+    # 실행 중 진행률을 기록할 때마다 갱신 → 멈춘 작업 판별 기준 (started_at 이 아님)
+    heartbeat_at = models.DateTimeField("최근 진행 기록", null=True, blank=True)
+
+    class Meta:
+        db_table = "core_export_job"
+        verbose_name = "내보내기 작업"
+        verbose_name_plural = "내보내기 작업"
+        indexes = [
+            models.Index(fields=["status", "id"], name="ix_export_job_status"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def percent(self) -> int:
+        if self.status == self.Status.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.done_rows * 100 // self.total_rows)
@@ -1,5 +1,8 @@
 from django.urls import path, reverse_lazy
-from .views import CustomLoginView, dashboard_view
+from .views import (
+    CustomLoginView, dashboard_view,
+    export_job_create, export_job_status, export_job_download,
+)
 from django.contrib.auth.views import LogoutView
 
 
@@ -7,4 +10,9 @@ urlpatterns = [
     path('', CustomLoginView.as_view(), name='login'),
     path('dashboard/', dashboard_view, name='dashboard'),
     path('logout/', LogoutView.as_view(next_page=reverse_lazy('login')), name='logout'),
-]
\ No newline at end of file
+
+    # 백그라운드 내보내기
+    path('exports/', export_job_create, name='export_job_create'),
+    path('exports/<int:pk>/', export_job_status, name='export_job_status'),
+    path('exports/<int:pk>/download/', export_job_download, name='export_job_download'),
+]
@@ -1,7 +1,12 @@
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
-from django.urls import reverse_lazy
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse, reverse_lazy
+from django.views.decorators.http import require_GET, require_POST
+
+from .exports import enqueue_export
+from .models import ExportJob
 
 class CustomLoginView(LoginView):
     template_name = 'login_page.html'
@@ -10,4 +15,69 @@ class CustomLoginView(LoginView):
 
 @login_required
 def dashboard_view(request):
-    return render(request, 'dashboard.html')
\ No newline at end of file
+    return render(request, 'dashboard.html')
+
+# ─────────────────────────────────────────────
+# 백그라운드 내보내기 (요청 / 진행률 / 다운로드)
+# ─────────────────────────────────────────────
+
+def _job_payload(job):
+    return {
+        "ok": True,
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "total": job.total_rows,
+        "done": job.done_rows,
+        "percent": job.percent,
+        "error": job.error,
+        "status_url": reverse("export_job_status", args=[job.pk]),
+        "download_url": reverse("export_job_download", args=[job.pk])
+        if job.status == ExportJob.Status.DONE else "",
+    }
+
+
+def _get_own_job(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk)
+    if job.created_by_id != request.user.pk and not request.user.is_staff:
+        raise Http404
+    return job
+
+
+@login_required
+@require_POST
+def export_job_create(request):
+    """
+    POST kind, query(화면 querystring), fmt(csv|xlsx)
+    → {"ok": true, "id", "status_url", ...}
+    """
+    try:
+        job = enqueue_export(
+            (request.POST.get("kind") or "").strip(),
+            request.POST.get("query") or "",
+            fmt=(request.POST.get("fmt") or ExportJob.Format.CSV).lower(),
+            user=request.user,
+        )
+    except ValueError as e:
+        return JsonResponse({"ok": False, "msg": str(e)}, status=400)
+    return JsonResponse(_job_payload(job))
+
+
+@login_required
+@require_GET
+def export_job_status(request, pk):
+    return JsonResponse(_job_payload(_get_own_job(request, pk)))
+
+
+@login_required
+@require_GET
+def export_job_download(request, pk):
+    job = _get_own_job(request, pk)
+    if job.status != ExportJob.Status.DONE or not job.file:
+        raise Http404
+    try:
+        fp = job.file.open("rb")
+    except FileNotFoundError:
+        raise Http404
+    return FileResponse(fp, as_attachment=True, filename=job.filename or job.file.name.rsplit("/", 1)[-1])
@@ -7,8 +7,11 @@ from .models import Injection
 from .forms import InjectionForm, MoldHistoryForm
 from .forms import InjectionPriceForm
 
+from utils.export import XlsxColumn, iter_queryset, xlsx_response
 
-def injection_list(request):
+
+def _filtered_injection_qs(request):
+    """목록/엑셀 공용 검색 조건"""
     # ✅ 검색 조건 수집
     name = request.GET.get('name', '')
     program_name = request.GET.get('program_name', '')
@@ -33,9 +36,12 @@ def injection_list(request):
         queryset = queryset.filter(weight__icontains=weight)
     if vendor:
         queryset = queryset.filter(vendor__name__icontains=vendor)
+    return queryset
+
 
+def injection_list(request):
     # ✅ 정렬 및 페이징
-    queryset = queryset.order_by('-id')
+    queryset = _filtered_injection_qs(request).order_by('-id')
     paginator = Paginator(queryset, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -46,6 +52,36 @@ def injection_list(request):
     }
     return render(request, 'injection/injection_list.html', context)
 
+
+INJECTION_XLSX_COLUMNS = [
+    XlsxColumn('번호', 6),
+    XlsxColumn('품명', 24),
+    XlsxColumn('프로그램명', 16),
+    XlsxColumn('상태', 8),
+    XlsxColumn('별칭', 16),
+    XlsxColumn('Part Number', 16),
+    XlsxColumn('Sub Part Number', 16),
+    XlsxColumn('소재', 10),
+    XlsxColumn('톤수', 8),
+    XlsxColumn('CYCLETIME', 10),
+    XlsxColumn('Weight (g)', 10),
+    XlsxColumn('사출사', 18),
+    XlsxColumn('사용여부', 10),
+]
+
+
+def injection_export(request):
+    qs = _filtered_injection_qs(request).order_by('-id').values_list(
+        'name', 'program_name', 'status', 'alias', 'part_number', 'sub_part_number',
+        'material', 'ton', 'cycle_time', 'weight', 'vendor__name', 'use_yn',
+    )
+    rows = (
+        [idx, *(v if v is not None else '' for v in values)]
+        for idx, values in enumerate(iter_queryset(qs), start=1)
+    )
+    now = timezone.now().strftime('%Y%m%d_%H%M%S')
+    return xlsx_response(f'사출목록_{now}.xlsx', '사출목록', INJECTION_XLSX_COLUMNS, rows)
+
 def injection_create(request):
     if request.method == 'POST':
         form = InjectionForm(request.POST, request.FILES)
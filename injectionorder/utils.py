@@ -1,9 +1,8 @@
 # injectionorder/utils.py
 
-from django.utils import timezone
-from .models import InjectionOrder
+from utils.lot import next_lot
 
-def generate_order_lot():
-    today = timezone.now().strftime("%Y%m%d")
-    count = InjectionOrder.objects.filter(order_lot__startswith=f"ORD{today}").count() + 1
-    return f"ORD{today}{str(count).zfill(3)}"
\ No newline at end of file
+
+def generate_order_lot(order_date=None):
+    """발주 LOT: OR + YYYYMMDD + '-' + 3자리 (카운터 블록 발급)"""
+    return next_lot("OR", order_date)
@@ -0,0 +1,232 @@
+# mis/lineage.py
+"""
+LOT 계보(lot_edge) 기록 서비스
+
+- 연결이 생기는 시점에 set_edges/add_edges, 끊기는 시점에 remove_edges 호출
+- 호출하는 쪽 트랜잭션 안에서 실행되므로 원본 데이터와 함께 커밋/롤백된다
+- walk_lot_edges(): 상위/하위 계보를 WITH RECURSIVE 1회로 탐색
+- rebuild_lot_edges(): 원본 테이블 기준 전체 재구성(초기 적재/정합성 복구용)
+"""
+from django.db import connection, transaction
+from django.db.models import Q
+
+from mis.models import LotEdge, LotType
+
+
+def _upsert(rows, accumulate: bool) -> int:
+    rows = [r for r in rows if r[1] and r[3]]
+    if not rows:
+        return 0
+    # 같은 간선이 여러 번 들어오면 한 행으로 합침(ON CONFLICT 는 한 문장 내 중복 키 불가)
+    merged: dict[tuple, int] = {}
+    for src_type, src_lot, dst_type, dst_lot, qty in rows:
+        key = (src_type, src_lot, dst_type, dst_lot)
+        merged[key] = (merged.get(key, 0) if accumulate else 0) + int(qty or 0)
+
+    update_expr = "lot_edge.qty + EXCLUDED.qty" if accumulate else "EXCLUDED.qty"
+    values_sql = ", ".join(["(%s, %s, %s, %s, %s, now(), now())"] * len(merged))
+    params = []
+    for key, qty in merged.items():
+        params.extend([*key, qty])
+
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO lot_edge (src_type, src_lot, dst_type, dst_lot, qty, created_at, updated_at)
+            VALUES {values_sql}
+            ON CONFLICT (src_type, src_lot, dst_type, dst_lot)
+            DO UPDATE SET qty = {update_expr}, updated_at = now()
+            """,
+            params,
+        )
+    return len(merged)
+
+
+def set_edges(rows) -> int:
+    """rows: (src_type, src_lot, dst_type, dst_lot, qty) — 수량 덮어쓰기"""
+    return _upsert(rows, accumulate=False)
+
+
+def add_edges(rows) -> int:
+    """rows: (src_type, src_lot, dst_type, dst_lot, qty) — 수량 누적(BOX 적재 등)"""
+    return _upsert(rows, accumulate=True)
+
+
+def remove_edges(pairs) -> int:
+    """pairs: (src_type, src_lot, dst_type, dst_lot)"""
+    cond = Q()
+    for src_type, src_lot, dst_type, dst_lot in pairs:
+        cond |= Q(src_type=src_type, src_lot=src_lot, dst_type=dst_type, dst_lot=dst_lot)
+    if not cond:
+        return 0
+    deleted, _ = LotEdge.objects.filter(cond).delete()
+    return deleted
+
+
+# ─────────────────────────────────────────────
+#  도메인별 간선 구성 헬퍼
+# ─────────────────────────────────────────────
+
+def receipt_edges(receipt, lines=()) -> list[tuple]:
+    """사출 입고: OR → IN(헤더 수량), IN → IN-SS(라인 수량)"""
+    rows = []
+    order_lot = getattr(receipt, "order_lot_snapshot", "") or getattr(receipt.order, "order_lot", "")
+    rows.append((LotType.ORDER, order_lot, LotType.RECEIPT_HEADER, receipt.receipt_lot, receipt.qty))
+    for ln in lines:
+        rows.append((LotType.RECEIPT_HEADER, receipt.receipt_lot, LotType.RECEIPT_LINE, ln.sub_lot, ln.qty))
+    return rows
+
+
+def usage_edge(line, workorder, qty) -> tuple:
+    """사출투입: IN-SS → JB"""
+    return (LotType.RECEIPT_LINE, line.sub_lot, LotType.WORK, workorder.work_lot, qty)
+
+
+def fill_edge(workorder, box, qty) -> tuple:
+    """BOX 적재: JB → C-LOT"""
+    return (LotType.WORK, workorder.work_lot, LotType.CLOT, box.lot_no, qty)
+
+
+def ship_edge(c_lot, sh_lot, qty) -> tuple:
+    """출하: C-LOT → SH"""
+    return (LotType.CLOT, c_lot, LotType.SHIP, sh_lot, qty)
+
+
+# ─────────────────────────────────────────────
+#  계보 탐색 (WITH RECURSIVE 1회)
+# ─────────────────────────────────────────────
+
+TRACE_UP = "up"        # 어디서 왔나 (원자재 방향)
+TRACE_DOWN = "down"    # 어디로 갔나 (출하 방향)
+TRACE_BOTH = "both"
+TRACE_DIRECTIONS = (TRACE_UP, TRACE_DOWN, TRACE_BOTH)
+
+_WALK_CTE = {
+    # 시작 LOT 을 dst 로 갖는 간선부터 src 쪽으로 거슬러 올라감
+    TRACE_UP: """
+    up(src_type, src_lot, dst_type, dst_lot, qty, depth) AS (
+        SELECT e.src_type, e.src_lot, e.dst_type, e.dst_lot, e.qty, 1
+          FROM lot_edge e
+          JOIN roots r ON e.dst_type = r.lot_type AND e.dst_lot = r.lot_no
+        UNION
+        SELECT e.src_type, e.src_lot, e.dst_type, e.dst_lot, e.qty, w.depth + 1
+          FROM lot_edge e
+          JOIN up w ON e.dst_type = w.src_type AND e.dst_lot = w.src_lot
+         WHERE w.depth < %(max_depth)s
+    )""",
+    # 시작 LOT 을 src 로 갖는 간선부터 dst 쪽으로 내려감
+    TRACE_DOWN: """
+    down(src_type, src_lot, dst_type, dst_lot, qty, depth) AS (
+        SELECT e.src_type, e.src_lot, e.dst_type, e.dst_lot, e.qty, 1
+          FROM lot_edge e
+          JOIN roots r ON e.src_type = r.lot_type AND e.src_lot = r.lot_no
+        UNION
+        SELECT e.src_type, e.src_lot, e.dst_type, e.dst_lot, e.qty, w.depth + 1
+          FROM lot_edge e
+          JOIN down w ON e.src_type = w.dst_type AND e.src_lot = w.dst_lot
+         WHERE w.depth < %(max_depth)s
+    )""",
+}
+
+
+def walk_lot_edges(roots, direction: str = TRACE_BOTH, max_depth: int = 10, limit: int | None = None):
+    """
+    roots(=(lot_type, lot_no) 목록)에서 시작해 lot_edge 를 재귀 탐색한다. 쿼리 1회.
+    반환: [(direction, src_type, src_lot, dst_type, dst_lot, qty, depth), ...] — depth 오름차순
+    - 같은 간선이 여러 경로로 닿으면 가장 얕은 depth 하나만 남긴다
+    - limit: 반환 간선 수 상한(노드 상한 적용 전 1차 컷)
+    """
+    roots = list(roots)
+    if not roots:
+        return []
+    if direction not in TRACE_DIRECTIONS:
+        raise ValueError(f"지원하지 않는 방향입니다: {direction}")
+
+    walks = [TRACE_UP, TRACE_DOWN] if direction == TRACE_BOTH else [direction]
+    ctes = ",".join(_WALK_CTE[w] for w in walks)
+    selects = " UNION ALL ".join(
+        f"""
+        SELECT '{w}', src_type, src_lot, dst_type, dst_lot, qty, MIN(depth) AS depth
+          FROM {w}
+         GROUP BY src_type, src_lot, dst_type, dst_lot, qty
+        """
+        for w in walks
+    )
+    sql = f"""
+    WITH RECURSIVE
+    roots(lot_type, lot_no) AS (
+        SELECT * FROM unnest(%(types)s::text[], %(lots)s::text[])
+    ),{ctes}
+    SELECT * FROM ({selects}) t
+     ORDER BY depth
+    """
+    params = {
+        "types": [t for t, _lot in roots],
+        "lots": [lot for _t, lot in roots],
+        "max_depth": max(int(max_depth), 1),
+    }
+    if limit:
+        sql += " LIMIT %(limit)s"
+        params["limit"] = int(limit)
+
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+# ─────────────────────────────────────────────
+#  전체 재구성
+# ─────────────────────────────────────────────
+
+@transaction.atomic
+def rebuild_lot_edges() -> int:
+    """원본 테이블 기준으로 lot_edge 를 비우고 다시 채운다."""
+    from django.db.models import Sum
+    from purchase.models import InjectionReceipt, InjectionReceiptLine
+    from production.models import WorkOrderInjectionUsage
+    from quality.inspections.models import FinishedBoxFill
+    from sales.models import SalesShipmentLine
+
+    rows: list[tuple] = []
+
+    for rlot, olot, snap, qty in (
+        InjectionReceipt.objects
+        .filter(is_deleted=False)
+        .values_list("receipt_lot", "order__order_lot", "order_lot_snapshot", "qty")
+    ):
+        rows.append((LotType.ORDER, snap or olot, LotType.RECEIPT_HEADER, rlot, qty))
+
+    for rlot, sub_lot, qty in (
+        InjectionReceiptLine.objects
+        .filter(receipt__is_deleted=False)
+        .values_list("receipt__receipt_lot", "sub_lot", "qty")
+    ):
+        rows.append((LotType.RECEIPT_HEADER, rlot, LotType.RECEIPT_LINE, sub_lot, qty))
+
+    for sub_lot, work_lot, qty in (
+        WorkOrderInjectionUsage.objects
+        .values_list("line__sub_lot", "workorder__work_lot", "used_qty")
+    ):
+        rows.append((LotType.RECEIPT_LINE, sub_lot, LotType.WORK, work_lot, qty))
+
+    for work_lot, lot_no, qty in (
+        FinishedBoxFill.objects
+        .filter(box__dlt_yn="N")
+        .values("inspection__workorder__work_lot", "box__lot_no")
+        .annotate(s=Sum("qty_added"))
+        .values_list("inspection__workorder__work_lot", "box__lot_no", "s")
+    ):
+        rows.append((LotType.WORK, work_lot, LotType.CLOT, lot_no, qty))
+
+    for c_lot, sh_lot, qty in (
+        SalesShipmentLine.objects
+        .filter(delete_yn="N", shipment__delete_yn="N")
+        .values_list("c_lot", "shipment__sh_lot", "quantity")
+    ):
+        rows.append((LotType.CLOT, c_lot, LotType.SHIP, sh_lot, qty))
+
+    LotEdge.objects.all().delete()
+    total = 0
+    for i in range(0, len(rows), 1000):
+        total += add_edges(rows[i:i + 1000])
+    return total
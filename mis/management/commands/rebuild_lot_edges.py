@@ -0,0 +1,12 @@
+# mis/management/commands/rebuild_lot_edges.py
+from django.core.management.base import BaseCommand
+
+from mis.lineage import rebuild_lot_edges
+
+
+class Command(BaseCommand):
+    help = "원본 테이블(입고/사출투입/BOX 적재/출하) 기준으로 lot_edge 를 재구성합니다."
+
+    def handle(self, *args, **options):
+        count = rebuild_lot_edges()
+        self.stdout.write(self.style.SUCCESS(f"lot_edge 재구성 완료: {count}건"))
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LotEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('src_type', models.CharField(choices=[('ORDER', '발주 LOT'), ('RECEIPT', '입고 헤더 LOT'), ('RECEIPT_LINE', '입고 서브 LOT'), ('WORK', '작업 LOT'), ('CLOT', '완성 LOT'), ('SHIP', '출하 LOT')], max_length=20, verbose_name='상위 LOT 유형')),
+                ('src_lot', models.CharField(max_length=40, verbose_name='상위 LOT')),
+                ('dst_type', models.CharField(choices=[('ORDER', '발주 LOT'), ('RECEIPT', '입고 헤더 LOT'), ('RECEIPT_LINE', '입고 서브 LOT'), ('WORK', '작업 LOT'), ('CLOT', '완성 LOT'), ('SHIP', '출하 LOT')], max_length=20, verbose_name='하위 LOT 유형')),
+                ('dst_lot', models.CharField(max_length=40, verbose_name='하위 LOT')),
+                ('qty', models.IntegerField(default=0, verbose_name='수량')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='생성일시')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='수정일시')),
+            ],
+            options={
+                'verbose_name': 'LOT 계보',
+                'verbose_name_plural': 'LOT 계보',
+                'db_table': 'lot_edge',
+                'indexes': [models.Index(fields=['src_lot'], name='ix_lot_edge_src_lot'), models.Index(fields=['dst_lot'], name='ix_lot_edge_dst_lot')],
+                'constraints': [models.UniqueConstraint(fields=('src_type', 'src_lot', 'dst_type', 'dst_lot'), name='uq_lot_edge_src_dst')],
+            },
+        ),
+    ]
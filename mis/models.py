@@ -1,3 +1,60 @@
 from django.db import models
+from django.db.models import UniqueConstraint
 
-# Create your models here.
+
+# ─────────────────────────────────────────────
+#  LOT 타입 정의
+# ─────────────────────────────────────────────
+
+class LotType:
+    ORDER = "ORDER"                # OR 발주 LOT
+    RECEIPT_HEADER = "RECEIPT"     # IN 헤더
+    RECEIPT_LINE = "RECEIPT_LINE"  # IN 서브
+    WORK = "WORK"                  # JB 작업 LOT
+    CLOT = "CLOT"                  # C-LOT
+    SHIP = "SHIP"                  # SH 출하 LOT
+    UNKNOWN = "UNKNOWN"
+
+
+LOT_TYPE_CHOICES = [
+    (LotType.ORDER, "발주 LOT"),
+    (LotType.RECEIPT_HEADER, "입고 헤더 LOT"),
+    (LotType.RECEIPT_LINE, "입고 서브 LOT"),
+    (LotType.WORK, "작업 LOT"),
+    (LotType.CLOT, "완성 LOT"),
+    (LotType.SHIP, "출하 LOT"),
+]
+
+
+class LotEdge(models.Model):
+    """
+    LOT 계보(OR → IN → IN-SS → JB → C-LOT → SH) 간선.
+    연결이 생기거나 끊기는 시점(입고확정/사출투입/BOX 적재/출하)에 함께 기록되며,
+    추적 화면은 이 테이블만 읽는다. (mis.lineage 참고)
+    """
+    src_type = models.CharField("상위 LOT 유형", max_length=20, choices=LOT_TYPE_CHOICES)
+    src_lot = models.CharField("상위 LOT", max_length=40)
+    dst_type = models.CharField("하위 LOT 유형", max_length=20, choices=LOT_TYPE_CHOICES)
+    dst_lot = models.CharField("하위 LOT", max_length=40)
+    qty = models.IntegerField("수량", default=0)
+
+    created_at = models.DateTimeField("생성일시", auto_now_add=True)
+    updated_at = models.DateTimeField("수정일시", auto_now=True)
+
+    class Meta:
+        db_table = "lot_edge"
+        verbose_name = "LOT 계보"
+        verbose_name_plural = "LOT 계보"
+        constraints = [
+            UniqueConstraint(
+                fields=["src_type", "src_lot", "dst_type", "dst_lot"],
+                name="uq_lot_edge_src_dst",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["src_lot"], name="ix_lot_edge_src_lot"),
+            models.Index(fields=["dst_lot"], name="ix_lot_edge_dst_lot"),
+        ]
+
+    def __str__(self):
+        return f"{self.src_lot} → {self.dst_lot} ({self.qty})"
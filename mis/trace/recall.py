@@ -0,0 +1,171 @@
+# mis/trace/recall.py
+"""
+리콜 영향 범위 산출
+
+불량 원자재 LOT(입고 헤더/서브 LOT) 목록 → lot_edge 하위 계보를 한 번에 탐색 →
+영향받은 작업지시 / C-LOT BOX / 출하 / 고객사를 수량과 함께 정리한다.
+- 계보 탐색: walk_lot_edges(WITH RECURSIVE 1회)
+- 상세 정보: 유형별 IN 조회 1회씩 (작업지시, BOX, 출하)
+"""
+import csv
+import io
+import re
+from collections import defaultdict
+
+from mis.lineage import TRACE_DOWN, walk_lot_edges
+from mis.models import LotType
+
+RECALL_MAX_DEPTH = 10
+RECALL_MAX_LOTS = 2000  # 한 번에 받을 수 있는 LOT 수 상한
+
+_SPLIT_RE = re.compile(r"[\s,;]+")
+
+
+def parse_lot_text(text: str) -> list[str]:
+    """붙여넣기 텍스트 → LOT 목록 (공백/쉼표/세미콜론/줄바꿈 구분, 순서 유지 중복 제거)"""
+    lots = [t.strip().upper() for t in _SPLIT_RE.split(text or "") if t.strip()]
+    return list(dict.fromkeys(lots))
+
+
+def parse_lot_csv(fileobj) -> list[str]:
+    """업로드 CSV → LOT 목록 (각 행 첫 번째 컬럼, 헤더/빈 행 무시)"""
+    raw = fileobj.read()
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8-sig", errors="ignore")
+    lots = []
+    for row in csv.reader(io.StringIO(raw)):
+        if row and row[0].strip():
+            lots.append(row[0].strip().upper())
+    return list(dict.fromkeys(lots))
+
+
+def compute_recall_impact(roots: list[tuple[str, str]]) -> dict:
+    """
+    roots: [(lot_type, lot_no), ...]
+    반환:
+      {
+        "roots": [...], "missing": [계보가 없는 LOT],
+        "workorders": [...], "boxes": [...], "shipments": [...], "customers": [...],
+        "totals": {...},
+      }
+    """
+    from production.models import WorkOrder
+    from quality.inspections.models import FinishedBox
+    from sales.models import SalesShipment
+
+    rows = walk_lot_edges(roots, direction=TRACE_DOWN, max_depth=RECALL_MAX_DEPTH)
+
+    # 1) 계보 간선 → 유형별 영향 수량
+    work_in_qty: dict[str, int] = defaultdict(int)      # JB ← (불량 LOT 계열) 투입 수량
+    box_fill_qty: dict[str, int] = defaultdict(int)     # C-LOT ← 영향 JB 적재 수량
+    box_works: dict[str, set] = defaultdict(set)
+    ship_box_qty: dict[str, dict[str, int]] = defaultdict(dict)  # SH → {C-LOT: 출하수량}
+    root_keys = set(roots)
+    reached_roots = set()
+
+    for _dir, src_type, src_lot, dst_type, dst_lot, qty, _depth in rows:
+        if (src_type, src_lot) in root_keys:
+            reached_roots.add(src_lot)
+        if dst_type == LotType.WORK:
+            work_in_qty[dst_lot] += int(qty or 0)
+        elif dst_type == LotType.CLOT:
+            box_fill_qty[dst_lot] += int(qty or 0)
+            box_works[dst_lot].add(src_lot)
+        elif dst_type == LotType.SHIP:
+            ship_box_qty[dst_lot][src_lot] = int(qty or 0)
+
+    # 2) 상세 정보 일괄 조회
+    workorders = []
+    for wo in (
+        WorkOrder.all_objects
+        .select_related("product", "customer")
+        .filter(work_lot__in=list(work_in_qty))
+        .order_by("work_lot")
+    ):
+        workorders.append({
+            "work_lot": wo.work_lot,
+            "product": getattr(wo.product, "name", ""),
+            "customer": getattr(wo.customer, "name", "") if wo.customer_id else "",
+            "status": wo.status,
+            "order_qty": wo.order_qty,
+            "input_qty": work_in_qty[wo.work_lot],
+        })
+
+    shipped_by_box = {c: sh for sh, boxes in ship_box_qty.items() for c in boxes}
+    boxes = []
+    for b in (
+        FinishedBox.objects
+        .select_related("product")
+        .filter(lot_no__in=list(box_fill_qty))
+        .order_by("lot_no")
+    ):
+        boxes.append({
+            "lot_no": b.lot_no,
+            "product": getattr(b.product, "name", ""),
+            "qty": b.qty,
+            "fill_qty": box_fill_qty[b.lot_no],
+            "work_lots": ", ".join(sorted(box_works[b.lot_no])),
+            "shipped": b.shipped,
+            "sh_lot": shipped_by_box.get(b.lot_no, ""),
+            "deleted": b.dlt_yn == "Y",
+        })
+
+    shipments = []
+    customers: dict[str, dict] = {}
+    for sh in (
+        SalesShipment.objects
+        .select_related("customer")
+        .filter(sh_lot__in=list(ship_box_qty))
+        .order_by("ship_date", "sh_lot")
+    ):
+        box_map = ship_box_qty[sh.sh_lot]
+        qty = sum(box_map.values())
+        cust = getattr(sh.customer, "name", "") if sh.customer_id else ""
+        shipments.append({
+            "sh_lot": sh.sh_lot,
+            "ship_date": sh.ship_date,
+            "customer": cust,
+            "product_name": sh.product_name or "",
+            "box_count": len(box_map),
+            "c_lots": ", ".join(sorted(box_map)),
+            "qty": qty,
+            "status": sh.status,
+        })
+        c = customers.setdefault(cust, {"customer": cust, "shipment_count": 0, "box_count": 0, "qty": 0})
+        c["shipment_count"] += 1
+        c["box_count"] += len(box_map)
+        c["qty"] += qty
+
+    return {
+        "roots": [lot for _t, lot in roots],
+        "missing": [lot for _t, lot in roots if lot not in reached_roots],
+        "workorders": workorders,
+        "boxes": boxes,
+        "shipments": shipments,
+        "customers": sorted(customers.values(), key=lambda c: -c["qty"]),
+        "totals": {
+            "workorders": len(workorders),
+            "boxes": len(boxes),
+            "box_qty": sum(b["qty"] or 0 for b in boxes),
+            "unshipped_boxes": sum(1 for b in boxes if not b["shipped"]),
+            "shipments": len(shipments),
+            "shipped_qty": sum(s["qty"] for s in shipments),
+            "customers": len(customers),
+        },
+    }
+
+
+def iter_recall_csv_rows(impact: dict):
+    """CSV 행 생성기 (헤더 포함) — 구분 컬럼으로 작업지시/BOX/출하를 한 파일에"""
+    yield ["구분", "LOT", "품명", "고객사", "수량", "영향수량", "일자", "상태", "연결 LOT"]
+    for w in impact["workorders"]:
+        yield ["작업지시", w["work_lot"], w["product"], w["customer"], w["order_qty"],
+               w["input_qty"], "", w["status"], ""]
+    for b in impact["boxes"]:
+        yield ["완성BOX", b["lot_no"], b["product"], "", b["qty"], b["fill_qty"], "",
+               "출하" if b["shipped"] else "미출하", b["work_lots"]]
+    for s in impact["shipments"]:
+        yield ["출하", s["sh_lot"], s["product_name"], s["customer"], s["qty"], s["qty"],
+               s["ship_date"].isoformat() if s["ship_date"] else "", s["status"], s["c_lots"]]
+    for lot in impact["missing"]:
+        yield ["계보없음", lot, "", "", "", "", "", "", ""]
@@ -1,35 +1,28 @@
 # mis/trace/views.py
 
+import json
 import re
 import traceback
 from dataclasses import dataclass
 from typing import List, Dict, Tuple
 
-from django.http import JsonResponse
+from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
 
-from sales.models import SalesShipment, SalesShipmentLine
-from quality.inspections.models import FinishedBox, FinishedBoxFill
-from production.models import WorkOrder, WorkOrderInjectionUsage
-from purchase.models import InjectionReceipt, InjectionReceiptLine
-from injectionorder.models import InjectionOrder
+from mis.lineage import TRACE_BOTH, TRACE_DIRECTIONS, walk_lot_edges
+from mis.models import LotType
+from mis.trace.recall import (
+    RECALL_MAX_LOTS, compute_recall_impact, iter_recall_csv_rows, parse_lot_csv, parse_lot_text,
+)
+from production.orders.views import _today_localdate
+from utils.export import csv_response
 
 
 # ─────────────────────────────────────────────
-#  LOT 타입 정의
+#  LOT 타입 정의 (mis.models.LotType)
 # ─────────────────────────────────────────────
 
-class LotType:
-    ORDER = "ORDER"                # OR 발주 LOT
-    RECEIPT_HEADER = "RECEIPT"     # IN 헤더
-    RECEIPT_LINE = "RECEIPT_LINE"  # IN 서브
-    WORK = "WORK"                  # JB 작업 LOT
-    CLOT = "CLOT"                  # C-LOT
-    SHIP = "SHIP"                  # SH 출하 LOT
-    UNKNOWN = "UNKNOWN"
-
-
 LOT_TYPE_LABEL = {
     LotType.ORDER: "발주 LOT",
     LotType.RECEIPT_HEADER: "입고 헤더 LOT",
@@ -40,6 +33,12 @@ LOT_TYPE_LABEL = {
     LotType.UNKNOWN: "LOT",
 }
 
+TRACE_DIRECTION_LABEL = {
+    "up": "상위(원자재 방향)",
+    "down": "하위(출하 방향)",
+    "both": "양방향",
+}
+
 # 여기 추가 👇
 LOT_CLASS_MAP = {
     LotType.ORDER: "lot-order",          # OR
@@ -68,8 +67,8 @@ def detect_lot_type(lot_no: str) -> str:
         # 그 외는 헤더 LOT
         return LotType.RECEIPT_HEADER
 
-    # 작업 LOT 패턴: JB20251211-001 처럼 J? + 날짜 + - + 3자리
-    if re.match(r"^J[A-Z]\d{8}-\d{3}$", lot_no):
+    # 작업 LOT 패턴: JB20251211-001 / J20251211-001 (J + 선택 영문 + 날짜 + - + 3자리 이상)
+    if re.match(r"^J[A-Z]?\d{8}-\d{3,}$", lot_no):
         return LotType.WORK
 
     # C-LOT
@@ -106,79 +105,6 @@ class LotGraph:
     edges: List[LotEdge]
 
 
-# ─────────────────────────────────────────────
-#  샘플 그래프 생성 (UI 테스트용)
-#  → 나중에 DB 조회 버전으로 교체
-# ─────────────────────────────────────────────
-
-def build_sample_graph(lot_no: str, lot_type: str) -> LotGraph:
-    """
-    지금은 LOT 타입에 따라 예시 체인만 만든다.
-    실제 구현 시 DB 기반 trace 함수로 교체.
-    """
-    nodes: List[LotNode] = []
-    edges: List[LotEdge] = []
-
-    root = LotNode(key="N0", lot_no=lot_no, lot_type=lot_type)
-    nodes.append(root)
-
-    # C-LOT 기준: OR → IN → IN-SS → JB → C(root)
-    if lot_type == LotType.CLOT:
-        n_or = LotNode("N1", "OR20251211-001", LotType.ORDER)
-        n_in = LotNode("N2", "IN20251211002", LotType.RECEIPT_HEADER)
-        n_inss = LotNode("N3", "IN20251211002-02", LotType.RECEIPT_LINE)
-        n_jb = LotNode("N4", "JB20251211-001", LotType.WORK)
-
-        nodes.extend([n_or, n_in, n_inss, n_jb])
-
-        edges.extend([
-            LotEdge("N1", "N2"),
-            LotEdge("N2", "N3"),
-            LotEdge("N3", "N4"),
-            LotEdge("N4", "N0"),
-        ])
-
-    # 작업 LOT 기준: OR → IN-SS → JB(root) → C 2개
-    elif lot_type == LotType.WORK:
-        n_or = LotNode("N1", "OR20251211-001", LotType.ORDER)
-        n_inss = LotNode("N2", "IN20251211002-02", LotType.RECEIPT_LINE)
-        n_c1 = LotNode("N3", "C-20251211-01", LotType.CLOT)
-        n_c2 = LotNode("N4", "C-20251211-02", LotType.CLOT)
-
-        nodes.extend([n_or, n_inss, n_c1, n_c2])
-
-        edges.extend([
-            LotEdge("N1", "N2"),
-            LotEdge("N2", "N0"),  # N0 = JB(root)
-            LotEdge("N0", "N3"),
-            LotEdge("N0", "N4"),
-        ])
-
-    # 출하 LOT 기준: OR → IN → IN-SS → JB → C → SH(root)
-    elif lot_type == LotType.SHIP:
-        n_c1 = LotNode("N1", "C-20251211-01", LotType.CLOT)
-        n_c2 = LotNode("N2", "C-20251211-02", LotType.CLOT)
-        n_jb = LotNode("N3", "JB20251211-001", LotType.WORK)
-        n_inss = LotNode("N4", "IN20251211002-02", LotType.RECEIPT_LINE)
-        n_in = LotNode("N5", "IN20251211002", LotType.RECEIPT_HEADER)
-        n_or = LotNode("N6", "OR20251211-001", LotType.ORDER)
-
-        nodes.extend([n_c1, n_c2, n_jb, n_inss, n_in, n_or])
-
-        edges.extend([
-            LotEdge("N6", "N5"),
-            LotEdge("N5", "N4"),
-            LotEdge("N4", "N3"),
-            LotEdge("N3", "N1"),
-            LotEdge("N3", "N2"),
-            LotEdge("N1", "N0"),
-            LotEdge("N2", "N0"),
-        ])
-
-    # 그 외 타입은 일단 단일 노드만 표시
-    return LotGraph(nodes=nodes, edges=edges)
-
-
 # ─────────────────────────────────────────────
 #  Mermaid 코드 생성
 # ─────────────────────────────────────────────
@@ -252,298 +178,62 @@ def build_mermaid_from_graph(graph: LotGraph) -> str:
 
 
 # ─────────────────────────────────────────────
-#  SH LOT(출하 LOT) 실제 DB 기반 그래프 빌더
+#  lot_edge 기반 그래프 빌더
 # ─────────────────────────────────────────────
 
-def _build_graph_for_shipment(sh_lot: str) -> LotGraph:
-    """
-    출하 LOT(SH...) 기준으로 실제 DB에서 관계를 읽어와
-    OR → IN → IN-SS → JB → C-LOT → SH 그래프를 만든다.
-    """
-    nodes: List[LotNode] = []
-    edges: List[LotEdge] = []
-
-    # (lot_type, lot_no) → key(N0, N1, ...)
-    node_map: Dict[Tuple[str, str], str] = {}
-    edge_set: set[Tuple[str, str]] = set()
-
-    def ensure_node(lot_type: str, lot_no: str) -> str:
-        key = (lot_type, lot_no)
-        if key in node_map:
-            return node_map[key]
-        node_id = f"N{len(node_map)}"
-        node_map[key] = node_id
-        nodes.append(LotNode(key=node_id, lot_no=lot_no, lot_type=lot_type))
-        return node_id
-
-    def add_edge(src_key: str, dst_key: str) -> None:
-        pair = (src_key, dst_key)
-        if pair in edge_set:
-            return
-        edge_set.add(pair)
-        edges.append(LotEdge(src=src_key, dst=dst_key))
-
-    # 1) 출하 헤더 찾기
-    try:
-        shipment = SalesShipment.objects.get(sh_lot=sh_lot)
-    except SalesShipment.DoesNotExist:
-        return LotGraph(nodes=[], edges=[])
-
-    # 루트 노드(SH LOT)
-    root_key = ensure_node(LotType.SHIP, shipment.sh_lot)
-
-    # 2) 출하 라인 → FinishedBox(C-LOT) 전부
-    line_qs = (
-        SalesShipmentLine.objects
-        .select_related("finished_box")
-        .filter(shipment=shipment)
-    )
-
-    finished_boxes: List[FinishedBox] = []
-    seen_box_ids: set[int] = set()
-    for line in line_qs:
-        if line.finished_box_id and line.finished_box_id not in seen_box_ids:
-            finished_boxes.append(line.finished_box)
-            seen_box_ids.add(line.finished_box_id)
-
-    if not finished_boxes:
-        # C-LOT 이 없는 출하라면 출하만 표시
-        return LotGraph(nodes=nodes, edges=edges)
-
-    box_id_list = [fb.id for fb in finished_boxes]
-
-    # 3) C-LOT ↔ WorkOrder (FinishedBoxFill)
-    #    FK 이름: box / box_id, workorder 는 inspection 을 통해 접근
-    fill_qs = (
-        FinishedBoxFill.objects
-        .select_related("box", "inspection__workorder")
-        .filter(box_id__in=box_id_list)
-    )
+TRACE_DEFAULT_DEPTH = 10
+TRACE_MAX_DEPTH = 20
+TRACE_MAX_NODES = 300   # 다이어그램이 감당 가능한 노드 수 상한
 
-    # 이 출하에 연결된 모든 WorkOrder id 수집
-    workorder_ids: set[int] = set()
-    for f in fill_qs:
-        if f.inspection_id and getattr(f.inspection, "workorder_id", None):
-            workorder_ids.add(f.inspection.workorder_id)
-
-    # 4) WorkOrder → 사용된 입고 서브 LOT
-    usage_qs = (
-        WorkOrderInjectionUsage.objects
-        .select_related(
-            "workorder",
-            "line__receipt__order",  # ✅ receipt_line → line 으로 수정
-        )
-        .filter(workorder_id__in=workorder_ids)
-    )
 
-    # OR → IN → IN-SS → JB 체인 구성
-    for usage in usage_qs:
-        workorder = usage.workorder
-        receipt_line = usage.line  # ✅ usage.receipt_line → usage.line
-        if not workorder or not receipt_line:
-            continue
-
-        receipt = receipt_line.receipt
-        order = receipt.order if receipt else None
-
-        jb_key = ensure_node(LotType.WORK, workorder.work_lot)
-        inss_key = ensure_node(LotType.RECEIPT_LINE, receipt_line.sub_lot)
-
-        in_key = None
-        or_key = None
-
-        if receipt:
-            in_key = ensure_node(LotType.RECEIPT_HEADER, receipt.receipt_lot)
-        if order:
-            or_key = ensure_node(LotType.ORDER, order.order_lot)
-
-        # OR → IN
-        if or_key and in_key:
-            add_edge(or_key, in_key)
-        # IN → IN-SS
-        if in_key:
-            add_edge(in_key, inss_key)
-        # IN-SS → JB
-        add_edge(inss_key, jb_key)
-
-    # 5) C-LOT 노드 및 C-LOT ↔ JB ↔ SH 연결
-    #    (FinishedBoxFill 기준)
-    for fb in finished_boxes:
-        c_key = ensure_node(LotType.CLOT, fb.lot_no)
-        # C-LOT → SH(출하 LOT)
-        add_edge(c_key, root_key)
-
-        # 이 C-LOT 과 연결된 모든 WorkOrder
-        for f in filter(lambda x: x.box_id == fb.id, fill_qs):
-            if not f.inspection_id or not getattr(f.inspection, "workorder", None):
-                continue
-            wo = f.inspection.workorder
-            jb_key = ensure_node(LotType.WORK, wo.work_lot)
-            # JB → C-LOT
-            add_edge(jb_key, c_key)
-
-    return LotGraph(nodes=nodes, edges=edges)
-
-def _build_graph_for_order(order_lot: str) -> LotGraph:
+def build_graph_for_lot(
+    lot_no: str,
+    lot_type: str,
+    direction: str = TRACE_BOTH,
+    max_depth: int = TRACE_DEFAULT_DEPTH,
+    max_nodes: int = TRACE_MAX_NODES,
+) -> Tuple[LotGraph, bool]:
     """
-    발주 LOT(OR...) 기준 LOT 그래프.
-    - OR → IN(헤더) → IN-SS(서브 LOT) → JB(작업 LOT) → C-LOT → SH 까지 전부 그린다.
-    - SH LOT 이 여러 개면 전부 오른쪽에 붙음.
+    모든 LOT 타입 공통 그래프 빌더.
+    - direction: up(어디서 왔나) / down(어디로 갔나) / both
+    - 얕은 depth 부터 노드를 채우다가 max_nodes 를 넘으면 중단
+    반환: (graph, truncated)
     """
+    rows = walk_lot_edges(
+        [(lot_type, lot_no)],
+        direction=direction,
+        max_depth=max_depth,
+        limit=max_nodes * 4,
+    )
+    if not rows:
+        return LotGraph(nodes=[], edges=[]), False
+
     nodes: List[LotNode] = []
     edges: List[LotEdge] = []
-
     node_map: Dict[Tuple[str, str], str] = {}
     edge_set: set[Tuple[str, str]] = set()
 
-    def ensure_node(lot_type: str, lot_no: str) -> str:
-        key = (lot_type, lot_no)
-        if key in node_map:
-            return node_map[key]
-        node_id = f"N{len(node_map)}"
-        node_map[key] = node_id
-        nodes.append(LotNode(key=node_id, lot_no=lot_no, lot_type=lot_type))
-        return node_id
-
-    def add_edge(src_key: str, dst_key: str) -> None:
-        pair = (src_key, dst_key)
-        if pair in edge_set:
-            return
-        edge_set.add(pair)
-        edges.append(LotEdge(src=src_key, dst=dst_key))
-
-    # 1) 발주 헤더 찾기
-    try:
-        order = InjectionOrder.objects.get(order_lot=order_lot)
-    except InjectionOrder.DoesNotExist:
-        return LotGraph(nodes=[], edges=[])
-
-    # OR 노드(루트)
-    or_key = ensure_node(LotType.ORDER, order.order_lot)
-
-    # 2) 이 발주와 연결된 입고 헤더 LOT 들
-    receipt_qs = InjectionReceipt.objects.filter(order=order)
-    receipts = list(receipt_qs)
-    if not receipts:
-        return LotGraph(nodes=nodes, edges=edges)
-
-    receipt_ids = [r.id for r in receipts]
-
-    # 3) 입고 서브 LOT(IN-SS)
-    line_qs = InjectionReceiptLine.objects.filter(receipt_id__in=receipt_ids)
-    lines = list(line_qs)
-    if not lines:
-        # OR → IN 까지만 있는 경우
-        for r in receipts:
-            in_key = ensure_node(LotType.RECEIPT_HEADER, r.receipt_lot)
-            add_edge(or_key, in_key)
-        return LotGraph(nodes=nodes, edges=edges)
-
-    line_ids = [ln.id for ln in lines]
-
-    # 4) 서브 LOT 사용 이력: IN-SS → JB
-    usage_qs = (
-        WorkOrderInjectionUsage.objects
-        .select_related(
-            "workorder",
-            "line__receipt__order",
-        )
-        .filter(line_id__in=line_ids)
-    )
-
-    workorder_ids: set[int] = set()
-
-    for usage in usage_qs:
-        workorder = usage.workorder
-        receipt_line = usage.line
-        if not workorder or not receipt_line:
-            continue
-
-        receipt = receipt_line.receipt
-        # OR 는 이미 or_key 하나로 고정
-
-        in_key = None
-        inss_key = ensure_node(LotType.RECEIPT_LINE, receipt_line.sub_lot)
-        jb_key = ensure_node(LotType.WORK, workorder.work_lot)
-
-        if receipt:
-            in_key = ensure_node(LotType.RECEIPT_HEADER, receipt.receipt_lot)
-
-        # OR → IN
-        if in_key:
-            add_edge(or_key, in_key)
-            # IN → IN-SS
-            add_edge(in_key, inss_key)
-        else:
-            # 헤더 없이 IN-SS 만 있다면 OR → IN-SS 직접 연결
-            add_edge(or_key, inss_key)
-
-        # IN-SS → JB
-        add_edge(inss_key, jb_key)
-        workorder_ids.add(workorder.id)
-
-    if not workorder_ids:
-        return LotGraph(nodes=nodes, edges=edges)
-
-    # 5) JB → C-LOT (FinishedBoxFill)
-    fill_qs = (
-        FinishedBoxFill.objects
-        .select_related("box", "inspection__workorder")
-        .filter(inspection__workorder_id__in=workorder_ids)
-    )
-
-    box_ids: set[int] = set()
-    for f in fill_qs:
-        if not f.box_id:
-            continue
-        box_ids.add(f.box_id)
-
-        c_key = ensure_node(LotType.CLOT, f.box.lot_no)
-        jb = f.inspection.workorder
-        if jb:
-            jb_key = ensure_node(LotType.WORK, jb.work_lot)
-            add_edge(inss_key := jb_key, c_key)  # JB → C-LOT
-
-    if not box_ids:
-        return LotGraph(nodes=nodes, edges=edges)
-
-    # 6) C-LOT → 출하(SH)
-    ship_line_qs = (
-        SalesShipmentLine.objects
-        .select_related("shipment", "finished_box")
-        .filter(finished_box_id__in=box_ids)
-    )
-
-    seen_ship_ids: set[int] = set()
-    for sl in ship_line_qs:
-        fb = sl.finished_box
-        ship = sl.shipment
-        if not fb or not ship:
-            continue
-
-        c_key = ensure_node(LotType.CLOT, fb.lot_no)
-        sh_key = ensure_node(LotType.SHIP, ship.sh_lot)
-        add_edge(c_key, sh_key)  # C-LOT → SH
+    def ensure_node(n_type: str, n_lot: str) -> str:
+        key = (n_type, n_lot)
+        if key not in node_map:
+            node_map[key] = f"N{len(node_map)}"
+            nodes.append(LotNode(key=node_map[key], lot_no=n_lot, lot_type=n_type))
+        return node_map[key]
 
-        seen_ship_ids.add(ship.id)
-
-    return LotGraph(nodes=nodes, edges=edges)
-
-# ─────────────────────────────────────────────
-#  LOT 타입별 그래프 빌더 라우팅
-# ─────────────────────────────────────────────
+    ensure_node(lot_type, lot_no)  # 루트 = N0
+    truncated = len(rows) >= max_nodes * 4
 
-def build_graph_for_lot(lot_no: str, lot_type: str) -> LotGraph:
-    """
-    LOT 타입별로 적절한 그래프 빌더 호출.
-    - SHIP(출하 LOT): 실제 DB 기반 그래프
-    - 그 외: 일단 샘플 그래프 (추후 점진적 확장)
-    """
-    if lot_type == LotType.SHIP:
-        return _build_graph_for_shipment(lot_no)
+    for _dir, src_type, src_lot, dst_type, dst_lot, _qty, _depth in rows:
+        new_nodes = {(src_type, src_lot), (dst_type, dst_lot)} - node_map.keys()
+        if len(node_map) + len(new_nodes) > max_nodes:
+            truncated = True
+            break
+        pair = (ensure_node(src_type, src_lot), ensure_node(dst_type, dst_lot))
+        if pair not in edge_set:
+            edge_set.add(pair)
+            edges.append(LotEdge(src=pair[0], dst=pair[1]))
 
-    # TODO: ORDER / RECEIPT / WORK / C-LOT 도 차차 실제 쿼리로 대체
-    return build_sample_graph(lot_no, lot_type)
+    return LotGraph(nodes=nodes, edges=edges), truncated
 
 
 # ─────────────────────────────────────────────
@@ -561,8 +251,8 @@ def lot_trace_page(request):
 def lot_trace_api(request):
     """
     LOT Trace API (/mis/trace/api/)
-    - GET 파라미터: lot_no
-    - 응답: { success, message, summary, mermaid }
+    - GET 파라미터: lot_no, direction(up/down/both, 기본 both), max_depth(기본 10, 최대 20)
+    - 응답: { success, message, summary, mermaid, node_count, truncated }
     """
     lot_no = (request.GET.get("lot_no") or "").strip()
 
@@ -572,6 +262,19 @@ def lot_trace_api(request):
             status=400,
         )
 
+    direction = (request.GET.get("direction") or TRACE_BOTH).strip().lower()
+    if direction not in TRACE_DIRECTIONS:
+        return JsonResponse(
+            {"success": False, "message": f"direction 은 up/down/both 중 하나여야 합니다: {direction}"},
+            status=400,
+        )
+
+    try:
+        max_depth = int(request.GET.get("max_depth") or TRACE_DEFAULT_DEPTH)
+    except ValueError:
+        max_depth = TRACE_DEFAULT_DEPTH
+    max_depth = min(max(max_depth, 1), TRACE_MAX_DEPTH)
+
     try:
         lot_type = detect_lot_type(lot_no)
 
@@ -584,7 +287,7 @@ def lot_trace_api(request):
                 status=400,
             )
 
-        graph = build_graph_for_lot(lot_no, lot_type)
+        graph, truncated = build_graph_for_lot(lot_no, lot_type, direction, max_depth)
 
         if not graph.nodes:
             return JsonResponse(
@@ -596,13 +299,20 @@ def lot_trace_api(request):
             )
 
         mermaid_code = build_mermaid_from_graph(graph)
-        summary = f"{lot_no} ({LOT_TYPE_LABEL.get(lot_type, 'LOT')}) 기준 LOT 흐름"
+        summary = (
+            f"{lot_no} ({LOT_TYPE_LABEL.get(lot_type, 'LOT')}) 기준 LOT 흐름 "
+            f"· {TRACE_DIRECTION_LABEL[direction]} · 깊이 {max_depth} · 노드 {len(graph.nodes)}"
+        )
+        if truncated:
+            summary += f" (노드 {TRACE_MAX_NODES}개 초과분 생략)"
 
         return JsonResponse(
             {
                 "success": True,
                 "summary": summary,
                 "mermaid": mermaid_code,
+                "node_count": len(graph.nodes),
+                "truncated": truncated,
             }
         )
 
@@ -620,3 +330,117 @@ def lot_trace_api(request):
             },
             status=500,
         )
+
+
+# ─────────────────────────────────────────────
+#  View: 리콜 영향 범위 (불량 LOT 일괄)
+# ─────────────────────────────────────────────
+
+RECALL_ROOT_TYPES = (LotType.RECEIPT_HEADER, LotType.RECEIPT_LINE)
+
+
+def _collect_recall_roots(request) -> Tuple[list, list, str]:
+    """
+    요청에서 불량 LOT 목록 수집 (붙여넣기 lots + 업로드 lots_file, JSON {"lots": [...]})
+    반환: (roots[(lot_type, lot_no)], unknown[lot_no], error)
+    """
+    lots: list[str] = []
+    if request.content_type == "application/json":
+        try:
+            payload = json.loads(request.body.decode("utf-8") or "{}")
+        except json.JSONDecodeError:
+            return [], [], "잘못된 JSON 형식입니다."
+        raw = payload.get("lots") or []
+        lots = parse_lot_text(" ".join(raw) if isinstance(raw, list) else str(raw))
+    else:
+        lots = parse_lot_text(request.POST.get("lots") or "")
+        upload = request.FILES.get("lots_file")
+        if upload:
+            lots = list(dict.fromkeys(lots + parse_lot_csv(upload)))
+
+    if not lots:
+        return [], [], "불량 LOT 을 입력하거나 CSV 파일을 업로드해 주세요."
+    if len(lots) > RECALL_MAX_LOTS:
+        return [], [], f"한 번에 최대 {RECALL_MAX_LOTS}개 LOT 까지 조회할 수 있습니다."
+
+    roots, unknown = [], []
+    for lot in lots:
+        lot_type = detect_lot_type(lot)
+        if lot_type in RECALL_ROOT_TYPES:
+            roots.append((lot_type, lot))
+        else:
+            unknown.append(lot)
+    return roots, unknown, ""
+
+
+@require_http_methods(["GET", "POST"])
+def recall_impact_page(request):
+    """
+    리콜 영향 범위 화면 (/mis/trace/recall/)
+    - 입고 헤더/서브 LOT 을 붙여넣거나 CSV 업로드 → 하위 계보 일괄 산출
+    """
+    ctx = {"lots_text": "", "impact": None, "unknown": [], "error": ""}
+    if request.method == "POST":
+        ctx["lots_text"] = request.POST.get("lots") or ""
+        roots, unknown, error = _collect_recall_roots(request)
+        ctx["unknown"] = unknown
+        if error:
+            ctx["error"] = error
+        elif roots:
+            ctx["impact"] = compute_recall_impact(roots)
+        else:
+            ctx["error"] = "입고 헤더/서브 LOT(IN...) 형식의 LOT 이 없습니다."
+    return render(request, "trace/recall_impact.html", ctx)
+
+
+@require_POST
+def recall_impact_api(request):
+    """
+    리콜 영향 범위 API (/mis/trace/recall/api/)
+    - 입력: JSON {"lots": [...]} 또는 form(lots, lots_file)
+    - 응답: { success, unknown, missing, totals, workorders, boxes, shipments, customers }
+    """
+    roots, unknown, error = _collect_recall_roots(request)
+    if error:
+        return JsonResponse({"success": False, "message": error}, status=400)
+    if not roots:
+        return JsonResponse(
+            {"success": False, "message": "입고 헤더/서브 LOT(IN...) 형식의 LOT 이 없습니다.", "unknown": unknown},
+            status=400,
+        )
+
+    impact = compute_recall_impact(roots)
+    return JsonResponse(
+        {
+            "success": True,
+            "unknown": unknown,
+            "missing": impact["missing"],
+            "totals": impact["totals"],
+            "workorders": impact["workorders"],
+            "boxes": impact["boxes"],
+            "shipments": [
+                {**s, "ship_date": s["ship_date"].isoformat() if s["ship_date"] else ""}
+                for s in impact["shipments"]
+            ],
+            "customers": impact["customers"],
+        }
+    )
+
+
+@require_POST
+def recall_impact_export(request):
+    """리콜 영향 범위 CSV (스트리밍, 엑셀 호환 BOM)"""
+    roots, unknown, error = _collect_recall_roots(request)
+    if error or not roots:
+        return HttpResponseBadRequest(error or "입고 헤더/서브 LOT(IN...) 형식의 LOT 이 없습니다.")
+
+    impact = compute_recall_impact(roots)
+    rows = iter_recall_csv_rows(impact)
+    header = next(rows)
+
+    def _rows():
+        yield from rows
+        for lot in unknown:
+            yield ["형식오류", lot, "", "", "", "", "", "", ""]
+
+    return csv_response(f"recall_impact_{_today_localdate():%Y%m%d}.csv", header, _rows())
@@ -26,4 +26,21 @@ urlpatterns = [
         trace_views.lot_trace_api,
         name="lot_trace_api",
     ),
+
+    # 리콜 영향 범위 (불량 LOT 일괄 → 하위 계보)
+    path(
+        "trace/recall/",
+        trace_views.recall_impact_page,
+        name="recall_impact",
+    ),
+    path(
+        "trace/recall/api/",
+        trace_views.recall_impact_api,
+        name="recall_impact_api",
+    ),
+    path(
+        "trace/recall/export/",
+        trace_views.recall_impact_export,
+        name="recall_impact_export",
+    ),
 ]
@@ -5,6 +5,7 @@ app_name = 'nonferrous'
 
 urlpatterns = [
     path('', views.nonferrous_list, name='nonferrous_list'),
+    path('export/', views.nonferrous_export, name='nonferrous_export'),
     path('add/', views.nonferrous_add, name='nonferrous_add'),
     path('<int:pk>/edit/', views.nonferrous_edit, name='nonferrous_edit'),
     path('<int:pk>/delete/', views.nonferrous_delete, name='nonferrous_delete'),
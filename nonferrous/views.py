@@ -8,20 +8,31 @@ from django.utils import timezone
 
 from django.db.models import Q
 
+from utils.export import XlsxColumn, iter_queryset, xlsx_response
 
-def nonferrous_list(request):
+
+def _filtered_nonferrous_qs(request):
+    """목록/엑셀 공용 검색 조건"""
     search_name = request.GET.get('name', '')
     search_spec = request.GET.get('spec', '')
     search_customer = request.GET.get('customer', '')
 
-    nonferrous_qs = Chemical.objects.filter(delete_yn='N')
-
+    qs = Chemical.objects.filter(delete_yn='N')
     if search_name:
-        nonferrous_qs = nonferrous_qs.filter(name__icontains=search_name)
+        qs = qs.filter(name__icontains=search_name)
     if search_spec:
-        nonferrous_qs = nonferrous_qs.filter(spec__icontains=search_spec)
+        qs = qs.filter(spec__icontains=search_spec)
     if search_customer:
-        nonferrous_qs = nonferrous_qs.filter(customer__name__icontains=search_customer)
+        qs = qs.filter(customer__name__icontains=search_customer)
+    return qs
+
+
+def nonferrous_list(request):
+    search_name = request.GET.get('name', '')
+    search_spec = request.GET.get('spec', '')
+    search_customer = request.GET.get('customer', '')
+
+    nonferrous_qs = _filtered_nonferrous_qs(request)
 
     paginator = Paginator(nonferrous_qs.order_by('-id'), 10)
     page_number = request.GET.get('page')
@@ -36,6 +47,28 @@ def nonferrous_list(request):
     return render(request, 'nonferrous/nonferrous_list.html', context)
 
 
+NONFERROUS_XLSX_COLUMNS = [
+    XlsxColumn('번호', 6),
+    XlsxColumn('품명', 24),
+    XlsxColumn('규격', 24),
+    XlsxColumn('고객사', 18),
+    XlsxColumn('사용여부', 10),
+    XlsxColumn('등록일시', 18, 'yyyy-mm-dd hh:mm'),
+]
+
+
+def nonferrous_export(request):
+    qs = _filtered_nonferrous_qs(request).order_by('-id').values_list(
+        'name', 'spec', 'customer__name', 'use_yn', 'created_dt',
+    )
+    rows = (
+        [idx, name or '', spec or '', customer or '', use_yn, created]
+        for idx, (name, spec, customer, use_yn, created) in enumerate(iter_queryset(qs), start=1)
+    )
+    now = timezone.now().strftime('%Y%m%d_%H%M%S')
+    return xlsx_response(f'비철목록_{now}.xlsx', '비철목록', NONFERROUS_XLSX_COLUMNS, rows)
+
+
 def nonferrous_add(request):
     if request.method == 'POST':
         form = ChemicalForm(request.POST, request.FILES)
@@ -1,14 +1,14 @@
 # partnerorder/views.py
 from datetime import datetime, date, timedelta
-import csv, io, base64, qrcode
+import io, base64, qrcode
 import re
 from typing import List
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction, models
-from django.db.models import Prefetch, Sum
-from django.http import HttpResponse, HttpResponseForbidden
+from django.db.models import OuterRef, Prefetch, Subquery, Sum
+from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 
 from injectionorder.models import FlowStatus
@@ -21,6 +21,7 @@ from .models import (
     recalc_order_shipping_and_flow,
 )
 from django.views.generic import ListView
+from utils.export import stream_queryset_csv
 
 # ---------------------------------------------------------------------
 # 공통 파서
@@ -327,7 +328,8 @@ class OrderListView(ListView):
         except Exception:
             return None
 
-    def get_queryset(self):
+    def get_filtered_queryset(self):
+        """목록/엑셀 공용 검색 조건(평가하지 않은 쿼리셋)"""
         qs = (InjectionOrder.objects
               .select_related("vendor")
               .filter(dlt_yn="N", use_yn="Y")       # 헤더: 삭제/미사용 제외
@@ -370,7 +372,10 @@ class OrderListView(ListView):
         if flow_status:
             qs = qs.filter(flow_status=flow_status)
 
-        qs = qs.distinct()
+        return qs.distinct()
+
+    def get_queryset(self):
+        qs = self.get_filtered_queryset()
 
         # 라인(살아있는 것만) 프리패치 + 대표품명/합계 표시용
         pre = Prefetch(
@@ -397,34 +402,40 @@ class OrderListView(ListView):
 # ---------------------------------------------------------------------
 @login_required
 def order_export(request):
-    # 목록과 동일한 필터 재사용
+    # 목록과 동일한 필터 재사용 (스트리밍 — 대표품명/수량합은 서브쿼리)
     view = OrderListView()
     view.request = request
-    orders = view.get_queryset()
-
-    # 한글 깨짐 방지: utf-8-sig
-    resp = HttpResponse(content_type="text/csv; charset=utf-8-sig")
-    resp["Content-Disposition"] = 'attachment; filename="partner_orders.csv"'
-    writer = csv.writer(resp)
-    writer.writerow(["발주LOT","발주처","발주일","품명(대표)","수량합",
-                     "입고예정일","발주상태","진행상태","취소일시","취소자"])
-
-    for o in orders:
-        item_name = "-"
-        if getattr(o, "alive_items", None):
-            first = o.alive_items[0] if o.alive_items else None
-            item_name = first.injection.name if first else "-"
-        writer.writerow([
+    alive_items = InjectionOrderItem.objects.filter(order=OuterRef("pk"), dlt_yn="N")
+    orders = (
+        view.get_filtered_queryset()
+        .select_related("cancel_by")
+        .annotate(
+            first_item_name=Subquery(alive_items.order_by("id").values("injection__name")[:1]),
+            alive_qty_sum=Subquery(
+                alive_items.order_by().values("order").annotate(s=Sum("quantity")).values("s")[:1]
+            ),
+        )
+    )
+
+    def _row(o):
+        return [
             o.order_lot,
             o.vendor.name if o.vendor else "-",
             o.order_date.strftime("%Y-%m-%d") if o.order_date else "-",
-            item_name,
-            getattr(o, "qty_sum", 0),
+            o.first_item_name or "-",
+            o.alive_qty_sum or 0,
             o.due_date.strftime("%Y-%m-%d") if getattr(o, "due_date", None) else "-",
             o.get_order_status_display(),
             o.get_flow_status_display(),
             o.cancel_at.strftime("%Y-%m-%d %H:%M") if getattr(o, "cancel_at", None) else "-",
             (getattr(o.cancel_by, "full_name", None) or
              getattr(o.cancel_by, "username", None) or "-") if getattr(o, "cancel_by", None) else "-"
-        ])
-    return resp
+        ]
+
+    return stream_queryset_csv(
+        orders,
+        "partner_orders.csv",
+        ["발주LOT","발주처","발주일","품명(대표)","수량합",
+         "입고예정일","발주상태","진행상태","취소일시","취소자"],
+        _row,
+    )
@@ -5,6 +5,7 @@ app_name = 'product'
 
 urlpatterns = [
     path('', views.product_list, name='product_list'),
+    path('export/', views.product_export, name='product_export'),
     path('add/', views.product_add, name='product_add'),
     path('<int:pk>/edit/', views.product_edit, name='product_edit'),
     path('<int:pk>/delete/', views.product_delete, name='product_delete'),
@@ -6,19 +6,30 @@ from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q
 
-def product_list(request):
+from utils.export import XlsxColumn, iter_queryset, xlsx_response
+
+def _filtered_product_qs(request):
+    """목록/엑셀 공용 검색 조건"""
     search_name = request.GET.get('name', '')
     search_program = request.GET.get('program_name', '')
     search_status = request.GET.get('status', '')
 
     products = Product.objects.filter(delete_yn='N')
-
     if search_name:
         products = products.filter(name__icontains=search_name)
     if search_program:
         products = products.filter(program_name__icontains=search_program)
     if search_status:
         products = products.filter(status=search_status)
+    return products
+
+
+def product_list(request):
+    search_name = request.GET.get('name', '')
+    search_program = request.GET.get('program_name', '')
+    search_status = request.GET.get('status', '')
+
+    products = _filtered_product_qs(request)
 
     paginator = Paginator(products.order_by('-id'), 10)
     page_number = request.GET.get('page')
@@ -33,6 +44,37 @@ def product_list(request):
     return render(request, 'product/product_list.html', context)
 
 
+PRODUCT_XLSX_COLUMNS = [
+    XlsxColumn('번호', 6),
+    XlsxColumn('품명', 24),
+    XlsxColumn('프로그램명', 16),
+    XlsxColumn('상태', 8),
+    XlsxColumn('별칭', 16),
+    XlsxColumn('Part Number', 16),
+    XlsxColumn('Sub Part Number', 16),
+    XlsxColumn('소재', 10),
+    XlsxColumn('고객사', 18),
+    XlsxColumn('사출사', 18),
+    XlsxColumn('무게 (g)', 10),
+    XlsxColumn('박스당 포장 수량', 14, '#,##0'),
+    XlsxColumn('사용여부', 10),
+]
+
+
+def product_export(request):
+    qs = _filtered_product_qs(request).order_by('-id').values_list(
+        'name', 'program_name', 'status', 'alias', 'part_number', 'sub_part_number',
+        'material', 'customer__name', 'injection_vendor__name', 'weight',
+        'package_quantity', 'use_yn',
+    )
+    rows = (
+        [idx, *(v if v is not None else '' for v in values)]
+        for idx, values in enumerate(iter_queryset(qs), start=1)
+    )
+    now = timezone.now().strftime('%Y%m%d_%H%M%S')
+    return xlsx_response(f'제품목록_{now}.xlsx', '제품목록', PRODUCT_XLSX_COLUMNS, rows)
+
+
 def product_add(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES)
@@ -7,7 +7,8 @@ from django.contrib import messages
 from django.db import transaction
 from django.forms import inlineformset_factory
 
-from ..models import (ChemicalAddition,ChemicalAdditionLine)
+from ..models import (ChemicalAddition,ChemicalAdditionLine, ConsumptionKind)
+from ..consumption.rollups import addition_keys, refresh_for_addition
 from ..forms import (
     ChemicalAdditionForm,
     ChemicalAdditionLineForm,
@@ -144,6 +145,7 @@ def chemadd_create(request):
 
             formset.instance = addition
             formset.save()
+            refresh_for_addition(ConsumptionKind.CHEMICAL, addition)
 
             messages.success(request, "약품 투입 일지가 저장되었습니다.")  # ← 추가
 
@@ -251,6 +253,7 @@ def chemadd_edit(request, pk):
     """
     addition = get_object_or_404(ChemicalAddition, pk=pk)
     process_obj = addition.process
+    before = addition_keys(addition)  # 폼이 instance 를 바꾸기 전 (집계 재계산용)
 
     if request.method == "POST":
         form = ChemicalAdditionForm(request.POST, instance=addition)
@@ -274,6 +277,7 @@ def chemadd_edit(request, pk):
                 addition.created_by = request.user
             addition.save()
             formset.save()
+            refresh_for_addition(ConsumptionKind.CHEMICAL, addition, before)
 
             messages.success(request, "약품 투입 일지가 저장되었습니다.")  # ← 추가
 
@@ -306,7 +310,10 @@ def chemadd_delete(request, pk):
     addition = get_object_or_404(ChemicalAddition, pk=pk)
 
     if request.method == "POST":
-        addition.delete()
+        before = addition_keys(addition)
+        with transaction.atomic():
+            addition.delete()
+            refresh_for_addition(ConsumptionKind.CHEMICAL, None, before)
         return redirect("production:chemadd:chemadd_list")
 
     # GET 으로 직접 치고 들어오면 목록으로 돌려보냄
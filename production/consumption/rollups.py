@@ -0,0 +1,225 @@
+# production/consumption/rollups.py
+"""
+약품/비철 투입량 집계(production_consumption_rollup) 유지/조회
+
+- 투입일지 저장/삭제 시: 영향받는 (구분, 공정, 일자) 구간만
+    1) 일(D) 행: DELETE → 투입일지 라인에서 INSERT ... SELECT
+    2) 주(W)/월(M) 행: 해당 주·월을 일(D) 행에서 다시 합산
+  → 수정으로 공정/일자가 바뀌어도 이전·새 값을 함께 넘기면 증감 계산 없이 맞춰짐
+  → 유니크 키가 없으므로 DELETE 전에 (구분, 공정) advisory lock — 주간/야간 일지를 동시에 저장해도
+    두 번째 재계산은 첫 번째 커밋 뒤에 실행되어 일/주/월 행이 중복되지 않음
+- 전체 재구성: rebuild_consumption_rollups() / manage.py rebuild_consumption_rollups
+- 원단위(1,000EA 당 투입량)의 생산량은 작업지시(대기 제외) 지시수량을
+  실 시작(없으면 계획 시작) 일자 기준으로 같은 기간에 합산 — 작업지시에 공정이 없어 공장 전체 기준
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import DateField, Sum
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+
+from production.models import (
+    ChemicalAddition,
+    ChemicalAdditionLine,
+    ConsumptionGrain,
+    ConsumptionKind,
+    ConsumptionRollup,
+    NonFerrousAddition,
+    NonFerrousAdditionLine,
+    WorkOrder,
+)
+from utils.locks import advisory_xact_lock
+
+_T = ConsumptionRollup._meta.db_table
+_COLS = ("grain, period, kind, process_id, chemical_id, nonferrous_id, equipment_id, "
+         "shift, unit, qty, entry_count")
+
+_DAY_SQL = {
+    ConsumptionKind.CHEMICAL: f"""
+INSERT INTO {_T} ({_COLS})
+SELECT %(day)s, a.work_date, %(kind)s, a.process_id, l.chemical_id, NULL, l.equipment_id,
+       a.shift, l.unit, SUM(l.quantity), COUNT(*)
+  FROM {ChemicalAdditionLine._meta.db_table} l
+  JOIN {ChemicalAddition._meta.db_table} a ON a.id = l.addition_id
+ WHERE a.is_active AND a.dlt_yn = 'N' AND l.quantity IS NOT NULL AND l.quantity <> 0 {{scope}}
+ GROUP BY a.work_date, a.process_id, l.chemical_id, l.equipment_id, a.shift, l.unit
+""",
+    ConsumptionKind.NONFERROUS: f"""
+INSERT INTO {_T} ({_COLS})
+SELECT %(day)s, a.work_date, %(kind)s, a.process_id, NULL, l.nonferrous_id, NULL,
+       a.shift, l.unit, SUM(l.quantity), COUNT(*)
+  FROM {NonFerrousAdditionLine._meta.db_table} l
+  JOIN {NonFerrousAddition._meta.db_table} a ON a.id = l.addition_id
+ WHERE a.is_active AND a.dlt_yn = 'N' AND l.quantity <> 0 {{scope}}
+ GROUP BY a.work_date, a.process_id, l.nonferrous_id, a.shift, l.unit
+""",
+}
+
+# 일(D) 행 → 주/월 행 (date_trunc('week') = 월요일)
+_ROLL_SQL = f"""
+INSERT INTO {_T} ({_COLS})
+SELECT %(grain)s, date_trunc(%(trunc)s, period)::date, kind, process_id, chemical_id,
+       nonferrous_id, equipment_id, shift, unit, SUM(qty), SUM(entry_count)
+  FROM {_T}
+ WHERE grain = %(day)s AND kind = %(kind)s {{scope}}
+ GROUP BY 2, kind, process_id, chemical_id, nonferrous_id, equipment_id, shift, unit
+"""
+
+_TRUNC = {ConsumptionGrain.WEEK: "week", ConsumptionGrain.MONTH: "month"}
+
+
+def period_start(grain: str, d: date) -> date:
+    if grain == ConsumptionGrain.MONTH:
+        return d.replace(day=1)
+    if grain == ConsumptionGrain.WEEK:
+        return d - timedelta(days=d.weekday())
+    return d
+
+
+def next_period(grain: str, d: date) -> date:
+    if grain == ConsumptionGrain.MONTH:
+        return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if grain == ConsumptionGrain.WEEK:
+        return d + timedelta(days=7)
+    return d + timedelta(days=1)
+
+
+def _execute(sql: str, params: dict) -> int:
+    with connection.cursor() as cur:
+        cur.execute(sql, {"day": ConsumptionGrain.DAY, **params})
+        return cur.rowcount
+
+
+# ─────────────────────────────────────────────
+# 구간 재계산 (투입일지 저장/삭제 시)
+# ─────────────────────────────────────────────
+
+def refresh_consumption(kind: str, process_ids, days) -> int:
+    """(구분, 공정들, 일자들) 구간 재계산. 수정 시 이전/새 공정·일자를 함께 넘긴다."""
+    process_ids = sorted({int(p) for p in process_ids if p})
+    days = sorted({d for d in days if d})
+    if not process_ids or not days:
+        return 0
+
+    base = {"kind": kind, "process_ids": process_ids}
+    with transaction.atomic():
+        advisory_xact_lock(f"{_T}:{kind}", process_ids)
+        ConsumptionRollup.objects.filter(
+            grain=ConsumptionGrain.DAY, kind=kind, process_id__in=process_ids, period__in=days,
+        ).delete()
+        count = _execute(
+            _DAY_SQL[kind].format(scope="AND a.process_id = ANY(%(process_ids)s) "
+                                        "AND a.work_date = ANY(%(days)s)"),
+            {**base, "days": days},
+        )
+        for grain, trunc in _TRUNC.items():
+            periods = sorted({period_start(grain, d) for d in days})
+            ConsumptionRollup.objects.filter(
+                grain=grain, kind=kind, process_id__in=process_ids, period__in=periods,
+            ).delete()
+            count += _execute(
+                _ROLL_SQL.format(scope="AND process_id = ANY(%(process_ids)s) "
+                                       "AND date_trunc(%(trunc)s, period)::date = ANY(%(periods)s)"),
+                {**base, "grain": grain, "trunc": trunc, "periods": periods},
+            )
+    return count
+
+
+def addition_keys(addition) -> tuple:
+    """저장 전 상태 캡처용: (공정 id, 투입일자)"""
+    return addition.process_id, addition.work_date
+
+
+def refresh_for_addition(kind: str, addition, *before) -> int:
+    """투입일지 1건 저장/삭제 후 호출. before = addition_keys(변경 전) 들"""
+    keys = [k for k in before if k] + ([addition_keys(addition)] if addition and addition.pk else [])
+    return refresh_consumption(kind, {p for p, _d in keys}, {d for _p, d in keys})
+
+
+def rebuild_consumption_rollups() -> int:
+    """집계 테이블을 비우고 투입일지 전체로 다시 채운다."""
+    with transaction.atomic():
+        with connection.cursor() as cur:
+            cur.execute(f"TRUNCATE {_T}")
+        count = 0
+        for kind in ConsumptionKind.values:
+            count += _execute(_DAY_SQL[kind].format(scope=""), {"kind": kind})
+            for grain, trunc in _TRUNC.items():
+                count += _execute(_ROLL_SQL.format(scope=""), {"kind": kind, "grain": grain, "trunc": trunc})
+    return count
+
+
+# ─────────────────────────────────────────────
+# 조회 (추이 / 원단위)
+# ─────────────────────────────────────────────
+
+def _at(d: date) -> datetime:
+    """USE_TZ 설정에 맞춘 00:00 시각"""
+    dt = datetime.combine(d, time.min)
+    return timezone.make_aware(dt) if settings.USE_TZ else dt
+
+
+def output_by_period(grain: str, start: date, end: date) -> dict:
+    """기간별 생산량(EA): 대기 외 작업지시 지시수량, 실 시작(없으면 계획 시작) 일자 기준"""
+    trunc = {ConsumptionGrain.DAY: "day", **_TRUNC}[grain]
+    rows = (
+        WorkOrder.objects
+        .exclude(status="대기")
+        .annotate(base_dt=Coalesce("actual_start", "planned_start"))
+        .filter(base_dt__gte=_at(start), base_dt__lt=_at(end))
+        .annotate(p=Trunc("base_dt", trunc, output_field=DateField()))
+        .values("p")
+        .annotate(ea=Sum("order_qty"))
+        .values_list("p", "ea")
+    )
+    return {p: ea or 0 for p, ea in rows}
+
+
+def trend(grain: str, kind: str, start: date, end: date, *, filters=None, top: int = 10) -> dict:
+    """
+    [start, end) 기간의 품목(+단위)별 투입량 / 1,000EA 당 투입량 시계열
+    - filters: process_id / equipment_id / shift / item_id
+    - top: 기간 합계 상위 품목 수
+    """
+    periods, p = [], period_start(grain, start)
+    while p < end:
+        periods.append(p)
+        p = next_period(grain, p)
+
+    item_field = "chemical" if kind == ConsumptionKind.CHEMICAL else "nonferrous"
+    qs = ConsumptionRollup.objects.filter(grain=grain, kind=kind, period__gte=periods[0] if periods else start,
+                                          period__lt=end)
+    filters = filters or {}
+    for key in ("process_id", "equipment_id", "shift"):
+        if filters.get(key):
+            qs = qs.filter(**{key: filters[key]})
+    if filters.get("item_id"):
+        qs = qs.filter(**{f"{item_field}_id": filters["item_id"]})
+
+    series: dict[tuple, dict] = {}
+    for item_id, name, unit, period, qty in (
+        qs.values_list(f"{item_field}_id", f"{item_field}__name", "unit", "period")
+        .annotate(s=Sum("qty"))
+        .order_by()
+    ):
+        s = series.setdefault((item_id, unit), {"item_id": item_id, "name": name, "unit": unit, "by": {}})
+        s["by"][period] = qty
+
+    output = output_by_period(grain, periods[0], end) if periods else {}
+    out = [output.get(p, 0) for p in periods]
+
+    rows = []
+    for s in series.values():
+        qty = [float(s["by"].get(p) or 0) for p in periods]
+        rows.append({
+            "item_id": s["item_id"],
+            "name": s["name"],
+            "unit": s["unit"],
+            "total": round(sum(qty), 2),
+            "qty": qty,
+            "per_1000": [round(q * 1000 / ea, 3) if ea else None for q, ea in zip(qty, out)],
+        })
+    rows.sort(key=lambda r: -r["total"])
+    return {"periods": periods, "output": out, "series": rows[:top]}
@@ -0,0 +1,24 @@
+# production/consumption/urls.py
+
+from django.urls import path
+from . import views
+
+app_name = "consumption"
+
+urlpatterns = [
+    # 약품/비철 투입 추이 · 원단위 화면
+    # /production/consumption/
+    path(
+        "",
+        views.consumption_trend,
+        name="consumption_trend",
+    ),
+
+    # 기간별 투입량 / 1,000EA 당 투입량 (JSON)
+    # /production/consumption/api/?grain=M&kind=CHEM
+    path(
+        "api/",
+        views.consumption_api,
+        name="consumption_api",
+    ),
+]
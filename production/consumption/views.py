@@ -0,0 +1,141 @@
+# production/consumption/views.py
+"""
+약품/비철 투입량 추이 · 원단위(1,000EA 당) 화면/API — 집계(production_consumption_rollup)만 읽는다.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET
+
+from chemical.models import Chemical
+from equipment.models import Equipment
+from nonferrous.models import Chemical as NonFerrous
+from process.models import Process
+from production.orders.views import _today_localdate
+from production.models import ChemicalAddition, ConsumptionGrain, ConsumptionKind
+from production.consumption.rollups import next_period, period_start, trend
+
+TOP_N = 10
+MAX_TOP = 50
+
+# 집계단위별 기본 조회 기간 (기간 수)
+DEFAULT_SPAN = {
+    ConsumptionGrain.MONTH: 12,
+    ConsumptionGrain.WEEK: 12,
+    ConsumptionGrain.DAY: 31,
+}
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _params(request) -> dict:
+    """
+    GET 파라미터
+      - grain : M(기본) / W / D
+      - kind  : CHEM(약품, 기본) / NF(비철)
+      - start / end : 조회 기간 (기본: 집계단위별 최근 12개월 / 12주 / 31일)
+      - process / item / equipment / shift : 필터
+      - top   : 상위 품목 수 (기본 10)
+    """
+    today = _today_localdate()
+    grain = request.GET.get("grain") or ConsumptionGrain.MONTH
+    if grain not in ConsumptionGrain.values:
+        grain = ConsumptionGrain.MONTH
+    kind = request.GET.get("kind") or ConsumptionKind.CHEMICAL
+    if kind not in ConsumptionKind.values:
+        kind = ConsumptionKind.CHEMICAL
+
+    end = parse_date(request.GET.get("end") or "") or today
+    start = parse_date(request.GET.get("start") or "")
+    if start is None:
+        start = period_start(grain, end)
+        for _ in range(DEFAULT_SPAN[grain] - 1):
+            start = period_start(grain, start - timedelta(days=1))
+    if end < start:
+        start, end = end, start
+
+    shift = (request.GET.get("shift") or "").strip()
+    return {
+        "grain": grain,
+        "kind": kind,
+        "start": period_start(grain, start),
+        "end": end,
+        "top": min(max(_int(request.GET.get("top")) or TOP_N, 1), MAX_TOP),
+        "filters": {
+            "process_id": _int(request.GET.get("process")),
+            "item_id": _int(request.GET.get("item")),
+            "equipment_id": _int(request.GET.get("equipment")) if kind == ConsumptionKind.CHEMICAL else None,
+            "shift": shift if shift in dict(ChemicalAddition.SHIFT_CHOICES) else "",
+        },
+    }
+
+
+def _trend(p: dict) -> dict:
+    # end 가 속한 기간까지 포함
+    end_excl = next_period(p["grain"], period_start(p["grain"], p["end"]))
+    return trend(p["grain"], p["kind"], p["start"], end_excl, filters=p["filters"], top=p["top"])
+
+
+@login_required
+@require_GET
+def consumption_api(request):
+    """기간별 투입량 / 생산량 / 1,000EA 당 투입량 (JSON)"""
+    p = _params(request)
+    data = _trend(p)
+    return JsonResponse({
+        "ok": True,
+        "grain": p["grain"],
+        "kind": p["kind"],
+        "start": p["start"].isoformat(),
+        "end": p["end"].isoformat(),
+        "periods": [d.isoformat() for d in data["periods"]],
+        "output": data["output"],
+        "series": data["series"],
+    })
+
+
+@login_required
+@require_GET
+def consumption_trend(request):
+    """약품/비철 투입 추이 화면 (기본 최근 12개월)"""
+    p = _params(request)
+    data = _trend(p)
+
+    periods = data["periods"]
+    output_max = max(data["output"], default=0)
+    rows = []
+    for s in data["series"]:
+        qty_max = max(s["qty"], default=0)
+        rows.append({
+            **s,
+            "qty_max": qty_max,
+            "cells": [
+                {"period": d, "qty": q, "per_1000": r, "ea": ea}
+                for d, q, r, ea in zip(periods, s["qty"], s["per_1000"], data["output"])
+            ],
+        })
+
+    item_model = Chemical if p["kind"] == ConsumptionKind.CHEMICAL else NonFerrous
+    ctx = {
+        **p,
+        **p["filters"],
+        "grain_choices": ConsumptionGrain.choices,
+        "kind_choices": ConsumptionKind.choices,
+        "shift_choices": ChemicalAddition.SHIFT_CHOICES,
+        "processes": Process.objects.order_by("name"),
+        "items": item_model.objects.order_by("name"),
+        "equipments": Equipment.objects.order_by("name") if p["kind"] == ConsumptionKind.CHEMICAL else [],
+        "periods": periods,
+        "output": list(zip(periods, data["output"])),
+        "output_max": output_max,
+        "rows": rows,
+    }
+    return render(request, "production/consumption/trend.html", ctx)
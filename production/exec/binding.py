@@ -0,0 +1,173 @@
+# production/exec/binding.py
+"""
+사출투입 LOT 바인딩 (작업지시 ↔ 사출 입고 Sub LOT)
+
+한 번의 바인딩을 트랜잭션 1개 + 일정한 쿼리 수로 처리한다 (선택 LOT 수와 무관).
+  1) 대상 InjectionReceiptLine 을 id 순으로 한 번에 잠금(select_for_update)
+     → 같은 LOT 를 동시에 바인딩하는 작업자는 여기서 순서대로 처리됨
+  2) 새 used_qty / use_status 를 메모리에서 계산 → bulk_update 1회
+  3) WorkOrderInjectionUsage: INSERT ... ON CONFLICT (workorder, line) DO UPDATE 1회 + 0건 매핑 삭제 1회
+  4) InjectionUsage 원장: 라인 사용수량 증감분만 bulk insert
+     (같은 request_uid 가 이미 원장에 있으면 재전송으로 보고 잠금 직후 아무것도 바꾸지 않고 반환)
+  5) 입고 헤더 is_used / used_at: UPDATE 1문장 (미완료 라인 존재 여부 서브쿼리)
+  6) 사출 LOT 색인(잔량/상태) 갱신 + LOT 계보(IN-SS → JB) 간선 갱신
+"""
+import uuid
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Case, Exists, OuterRef, When
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from mis.lineage import remove_edges, set_edges, usage_edge
+from production.models import WorkOrder, WorkOrderInjectionUsage
+from purchase.models import InjectionReceipt, InjectionReceiptLine, InjectionUsage
+from purchase.services import refresh_injection_lot_index
+
+BIND_ACTIONS = {"use", "cancel", "partial"}
+
+# InjectionUsage.ref_type
+REF_WORKORDER = "workorder"
+
+
+@dataclass
+class BindResult:
+    lines: list = field(default_factory=list)      # 갱신된 InjectionReceiptLine
+    missing: list = field(default_factory=list)    # 찾지 못한 Sub LOT
+    ledger: int = 0                                 # 원장 기록 대상 행 수(증감 있는 라인)
+    duplicate: bool = False                         # 이미 처리된 request_uid (재전송)
+
+
+def _new_used(action: str, ln) -> int:
+    """기존 화면 규칙 그대로: use=전량, cancel=0, partial=0 과 qty 사이 값"""
+    qty = ln.qty or 0
+    if action == "use":
+        return qty
+    if action == "cancel":
+        return 0
+    if qty <= 1:
+        return 0
+    if 0 < (ln.used_qty or 0) < qty:
+        return ln.used_qty
+    if ln.use_status == "사용완료":
+        return max(qty - 1, 1)
+    return 1
+
+
+def _refresh_receipts(receipt_ids) -> int:
+    """헤더 is_used = 전 라인 사용완료 여부 (UPDATE 1문장)"""
+    if not receipt_ids:
+        return 0
+    pending = Exists(
+        InjectionReceiptLine.objects
+        .filter(receipt_id=OuterRef("pk"))
+        .exclude(use_status="사용완료")
+    )
+    return InjectionReceipt.objects.filter(pk__in=receipt_ids).update(
+        is_used=~pending,
+        used_at=Case(When(pending, then=None), default=Now()),
+    )
+
+
+@transaction.atomic
+def bind_lots(workorder, lots, action: str, *, user, request_uid: str | None = None) -> BindResult:
+    """
+    workorder 에 Sub LOT 목록(lots)을 action(use/cancel/partial) 으로 바인딩.
+    - user: InjectionUsage.recorded_by (로그인 사용자)
+    - request_uid: 화면이 보낸 요청 키(재전송 시 같은 값) → 원장 transaction_uid 접두어
+    """
+    if action not in BIND_ACTIONS:
+        raise ValueError("잘못된 동작입니다.")
+    lots = list(dict.fromkeys(x.strip() for x in lots if x and x.strip()))
+    result = BindResult()
+
+    # 1) 잠금 조회 (id 순 → 교착 방지)
+    lines = list(
+        InjectionReceiptLine.objects
+        .select_for_update(of=("self",))
+        .select_related("receipt")
+        .filter(sub_lot__in=lots)
+        .order_by("id")
+    )
+    found = {ln.sub_lot for ln in lines}
+    result.missing = [x for x in lots if x not in found]
+    uid = (request_uid or uuid.uuid4().hex)[:40]
+
+    # 재전송 판별 (잠금 뒤라 같은 요청의 동시 재전송도 여기서 직렬화됨)
+    # → 동작이 달라도 같은 uid 면 라인/원장 어느 쪽도 바꾸지 않아 원장과 라인 수량이 어긋나지 않음
+    if request_uid and lines and InjectionUsage.objects.filter(
+        transaction_uid__in=[f"{uid}:{ln.pk}" for ln in lines],
+    ).exists():
+        result.duplicate = True
+        result.lines = lines
+        return result
+
+    # WorkOrder.inbound_lot 문자열 관리 (필드 있을 때만)
+    if hasattr(workorder, "inbound_lot"):
+        cur = [s.strip() for s in (workorder.inbound_lot or "").split(",") if s.strip()]
+        if action == "cancel":
+            cur = [x for x in cur if x not in lots]
+        else:
+            cur += [x for x in lots if x not in cur]
+        workorder.inbound_lot = ",".join(cur)
+        WorkOrder.all_objects.filter(pk=workorder.pk).update(inbound_lot=workorder.inbound_lot)
+
+    if not lines:
+        return result
+
+    # 2) 메모리 계산
+    now = timezone.now()
+    changed, upserts, drop_ids, ledger = [], [], [], []
+    edge_set, edge_del = [], []
+    for ln in lines:
+        old = ln.used_qty or 0
+        ln.used_qty = min(max(_new_used(action, ln), 0), ln.qty or 0)
+        ln._refresh_use_status()
+        delta = ln.used_qty - old
+        if delta:
+            changed.append(ln)
+            ledger.append(InjectionUsage(
+                line=ln,
+                action=InjectionUsage.Action.CONSUME if delta > 0 else InjectionUsage.Action.RETURN,
+                qty_change=delta,
+                occurred_at=now,
+                recorded_by=user,
+                ref_type=REF_WORKORDER,
+                ref_id=str(workorder.pk),
+                note=f"{action} {workorder.work_lot}"[:200],
+                transaction_uid=f"{uid}:{ln.pk}",
+            ))
+
+        if action == "cancel" or ln.used_qty == 0:
+            drop_ids.append(ln.pk)
+            edge_del.append(usage_edge(ln, workorder, 0)[:4])
+        else:
+            upserts.append(WorkOrderInjectionUsage(workorder=workorder, line=ln, used_qty=ln.used_qty))
+            edge_set.append(usage_edge(ln, workorder, ln.used_qty))
+
+    # 3) 저장 (각 1문장)
+    if changed:
+        InjectionReceiptLine.objects.bulk_update(changed, ["used_qty", "use_status"])
+    if upserts:
+        WorkOrderInjectionUsage.objects.bulk_create(
+            upserts,
+            update_conflicts=True,
+            unique_fields=["workorder", "line"],
+            update_fields=["used_qty"],
+        )
+    if drop_ids:
+        WorkOrderInjectionUsage.objects.filter(workorder=workorder, line_id__in=drop_ids).delete()
+    if ledger:
+        InjectionUsage.objects.bulk_create(ledger)
+        result.ledger = len(ledger)
+
+    _refresh_receipts({ln.receipt_id for ln in lines if ln.receipt_id})
+    refresh_injection_lot_index(line_ids=[ln.pk for ln in changed])
+
+    # LOT 계보: IN-SS → JB
+    remove_edges(edge_del)
+    set_edges(edge_set)
+
+    result.lines = lines
+    return result
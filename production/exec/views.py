@@ -6,13 +6,17 @@ from django.utils import timezone
 from django.shortcuts import render, get_object_or_404   # ← get_object_or_404 추가
 from django.utils.dateparse import parse_date
 from django.views.decorators.http import require_GET, require_POST
-from django.db.models import Q
 
 from production.models import WorkOrder
-from purchase.models import InjectionReceipt, InjectionReceiptLine   # ← 사출 입고 모델 추가
+from master.models import Warehouse
+from purchase.models import InjectionLotIndex
 from production.orders.views import _today_localdate, _day_range_for
-from production.models import WorkOrder, WorkOrderInjectionUsage
+from production.models import WorkOrder
 from django.db import transaction
+from .binding import BIND_ACTIONS, bind_lots
+
+# 생산투입 창고(사출 LOT 후보 조회 기준)
+EFFECTIVE_WH = "sk_wh_9"
 
 
 @require_GET
@@ -73,12 +77,10 @@ def exec_injection_lot_candidates(request, pk: int):
     """
     생산진행 LOT 매칭 팝업용:
     - 대상: 선택한 작업지시(pk)의 제품(product)에 연결된 사출품(injection_item)
-    - 조건:
-        * InjectionReceipt: is_active=True, is_deleted=False
-          (★ is_used 조건은 빼서, 이미 사용완료된 것도 다시 볼 수 있게 함)
-        * InjectionReceiptLine:
-            - warehouse = 'sk_wh_9' (또는 warehouse가 NULL 이면 헤더 warehouse가 sk_wh_9)
-            - use_status 는 전체(미사용/부분사용/사용완료) 다 보여줌
+    - 사출 LOT 색인(InjectionLotIndex)에서 (사출품, 투입창고) 범위 1회 조회, 입고일 FIFO 순
+        * 색인에는 활성·미삭제 입고만 있음 (헤더 is_used 와 무관 → 사용완료도 다시 볼 수 있음)
+        * 창고 = 라인 창고, 없으면 헤더 창고 (색인 갱신 시 계산)
+        * use_status 는 전체(미사용/부분사용/사용완료) 다 보여줌
     """
     wo = get_object_or_404(
         WorkOrder.objects.select_related("product"),
@@ -91,62 +93,37 @@ def exec_injection_lot_candidates(request, pk: int):
     if not inj_item_id:
         return JsonResponse({"ok": True, "items": []})
 
-    EFFECTIVE_WH = "sk_wh_9"
-
-    # 헤더: is_used 조건 제거
-    header_qs = (
-        InjectionReceipt.objects
-        .filter(
-            is_active=True,
-            is_deleted=False,
-            # is_used=False,  ← 이 줄을 없앤 상태
-            order__items__injection_id=inj_item_id,
-        )
-        .select_related("order", "warehouse")
-        .order_by("-date", "-id")
-        .distinct()
-    )
-
-    rec_ids = list(header_qs.values_list("id", flat=True))
-    if not rec_ids:
+    wh = Warehouse.objects.filter(warehouse_id=EFFECTIVE_WH).first()
+    if not wh:
         return JsonResponse({"ok": True, "items": []})
 
-    # 라인: 창고만 필터, 상태는 전부 보여줌
-    lines_qs = (
-        InjectionReceiptLine.objects
-        .filter(receipt_id__in=rec_ids)
-        .select_related("warehouse", "receipt", "receipt__warehouse")
-        .filter(
-            Q(warehouse__warehouse_id=EFFECTIVE_WH) |
-            Q(
-                warehouse__isnull=True,
-                receipt__warehouse__warehouse_id=EFFECTIVE_WH,
-            )
-        )
-        .order_by("receipt__receipt_lot", "sub_lot")
+    rows = (
+        InjectionLotIndex.objects
+        .filter(injection_id=inj_item_id, warehouse_id=wh.id)
+        .order_by("receipt_date", "sub_lot")
+        .values_list("receipt_lot", "sub_lot", "qty", "remaining_qty", "use_status", "receipt_date")
     )
 
-    items = []
-    for ln in lines_qs:
-        receipt = ln.receipt
-        wh = ln.warehouse or receipt.warehouse
-        items.append({
-            "receipt_lot": getattr(receipt, "receipt_lot", ""),
-            "sub_lot": ln.sub_lot,
-            "qty": ln.qty,
-            "use_status": ln.use_status,   # 미사용 / 부분사용 / 사용완료
-            "date": (receipt.date.isoformat()
-                     if getattr(receipt, "date", None) else None),
-            "warehouse_name": getattr(wh, "name", ""),
-            "warehouse_code": getattr(wh, "warehouse_id", ""),
-        })
+    items = [
+        {
+            "receipt_lot": receipt_lot,
+            "sub_lot": sub_lot,
+            "qty": qty,
+            "remaining_qty": remaining,
+            "use_status": use_status,   # 미사용 / 부분사용 / 사용완료
+            "date": receipt_date.isoformat() if receipt_date else None,
+            "warehouse_name": wh.name,
+            "warehouse_code": wh.warehouse_id,
+        }
+        for receipt_lot, sub_lot, qty, remaining, use_status, receipt_date in rows
+    ]
 
     return JsonResponse({"ok": True, "items": items})
 
 @require_POST
 def exec_bind_lot(request, pk: int):
     """
-    사출 입고 LOT를 작업지시와 매핑 + 상태 변경 + LOT 사용이력 기록
+    사출 입고 LOT를 작업지시와 매핑 + 상태 변경 + LOT 사용이력(InjectionUsage 원장) 기록
 
     action:
       - use     : 사용등록  (used_qty = qty  → 사용완료)
@@ -154,7 +131,7 @@ def exec_bind_lot(request, pk: int):
       - partial : 부분사용  (0 < used_qty < qty → 부분사용)
     """
     action = (request.POST.get("action") or "use").strip().lower()
-    if action not in {"use", "cancel", "partial"}:
+    if action not in BIND_ACTIONS:
         return JsonResponse({"ok": False, "msg": "잘못된 동작입니다."}, status=400)
 
     # LOT 모음
@@ -181,95 +158,23 @@ def exec_bind_lot(request, pk: int):
             status=400,
         )
 
-    # ── 1) WorkOrder.inbound_lot 문자열 관리 (필드 있을 때만 처리) ──
-    if hasattr(wo, "inbound_lot"):
-        cur_str = getattr(wo, "inbound_lot") or ""
-        cur = [s.strip() for s in cur_str.split(",") if s.strip()]
-    else:
-        cur = []
-
-    if action in {"use", "partial"}:
-        # 신규 LOT 추가 (중복 제거)
-        for lot in lots:
-            if lot not in cur:
-                cur.append(lot)
-    elif action == "cancel":
-        # 선택 LOT 제거
-        cur = [x for x in cur if x not in lots]
-
-    if hasattr(wo, "inbound_lot"):
-        wo.inbound_lot = ",".join(cur)
-        wo.save(update_fields=["inbound_lot"])
-
-    # ── 2) 선택된 Sub LOT 라인들 조회 ──
-    lines = list(
-        InjectionReceiptLine.objects
-        .select_related("receipt")
-        .filter(sub_lot__in=lots)
+    # 사용 원장(InjectionUsage.recorded_by) 기록에 처리자가 필요
+    if not request.user.is_authenticated:
+        return JsonResponse({"ok": False, "msg": "로그인 후 등록하세요."}, status=403)
+
+    # 잠금 → 메모리 계산 → bulk 저장 (binding.bind_lots, 트랜잭션 1개)
+    result = bind_lots(
+        wo, lots, action,
+        user=request.user,
+        request_uid=(request.POST.get("request_uid") or "").strip() or None,
     )
-    if not lines:
+    if not result.lines:
         return JsonResponse(
             {"ok": False, "msg": "해당 LOT를 찾을 수 없습니다."},
             status=400,
         )
 
-    receipt_ids = set()
-
-    # ── 3) 라인별 used_qty / use_status + 매핑 테이블 처리 ──
-    for ln in lines:
-        qty = ln.qty or 0
-
-        # used_qty 계산
-        if action == "use":
-            new_used = qty
-        elif action == "cancel":
-            new_used = 0
-        else:  # partial
-            # 간단한 부분사용 로직: 0과 qty 사이 값으로 맞추기
-            if qty <= 1:
-                new_used = 0
-            else:
-                if 0 < (ln.used_qty or 0) < qty:
-                    new_used = ln.used_qty
-                elif ln.use_status == "사용완료":
-                    new_used = max(qty - 1, 1)
-                else:
-                    new_used = 1
-
-        # 라인 저장 (use_status 는 모델에서 자동 계산된다고 가정)
-        ln.used_qty = new_used
-        ln.save()   # update_fields 안 쓰고 전체 save()
-
-        # ── 3-1) 매핑 테이블(WorkOrderInjectionUsage) 처리 ──
-        if action == "cancel" or new_used == 0:
-            # 사용취소거나 사용수량 0이면 매핑 삭제
-            WorkOrderInjectionUsage.objects.filter(
-                workorder=wo,
-                line=ln,
-            ).delete()
-        else:
-            # 사용 / 부분사용 : 사용수량 기준으로 upsert
-            WorkOrderInjectionUsage.objects.update_or_create(
-                workorder=wo,
-                line=ln,
-                defaults={"used_qty": new_used},
-            )
-
-        if ln.receipt_id:
-            receipt_ids.add(ln.receipt_id)
-
-    # ── 4) 헤더 is_used / used_at 갱신 (전 라인이 사용완료일 때만 True) ──
-    for rid in receipt_ids:
-        all_done = not InjectionReceiptLine.objects.filter(
-            receipt_id=rid
-        ).exclude(use_status="사용완료").exists()
-
-        InjectionReceipt.objects.filter(id=rid).update(
-            is_used=all_done,
-            used_at=timezone.now() if all_done else None,
-        )
-
-    return JsonResponse({"ok": True})
+    return JsonResponse({"ok": True, "missing": result.missing, "duplicate": result.duplicate})
 
 @require_POST
 def exec_cancel(request, pk: int):
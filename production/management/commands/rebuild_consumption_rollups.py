@@ -0,0 +1,12 @@
+# production/management/commands/rebuild_consumption_rollups.py
+from django.core.management.base import BaseCommand
+
+from production.consumption.rollups import rebuild_consumption_rollups
+
+
+class Command(BaseCommand):
+    help = "약품/비철 투입일지로 투입량 집계(production_consumption_rollup)를 재구성합니다."
+
+    def handle(self, *args, **options):
+        count = rebuild_consumption_rollups()
+        self.stdout.write(self.style.SUCCESS(f"투입량 집계 재구성 완료: {count}건"))
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chemical', '0004_chemical_msds_file_chemical_tds_file_and_more'),
+        ('equipment', '0002_equipmenthistory'),
+        ('nonferrous', '0001_initial'),
+        ('process', '0004_processnonferrous_process_nonferrous'),
+        ('production', '0011_nonferrousaddition_nonferrousadditionline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumptionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('D', '일'), ('W', '주'), ('M', '월')], max_length=1, verbose_name='집계단위')),
+                ('period', models.DateField(verbose_name='기간 시작일')),
+                ('kind', models.CharField(choices=[('CHEM', '약품'), ('NF', '비철')], max_length=4, verbose_name='구분')),
+                ('shift', models.CharField(max_length=10, verbose_name='근무조')),
+                ('unit', models.CharField(max_length=10, verbose_name='단위')),
+                ('qty', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='투입량')),
+                ('entry_count', models.PositiveIntegerField(default=0, verbose_name='라인 수')),
+                ('chemical', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chemical.chemical', verbose_name='약품')),
+                ('equipment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='equipment.equipment', verbose_name='설비')),
+                ('nonferrous', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='nonferrous.chemical', verbose_name='비철')),
+                ('process', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='process.process', verbose_name='공정')),
+            ],
+            options={
+                'db_table': 'production_consumption_rollup',
+                'indexes': [models.Index(fields=['grain', 'kind', 'period'], name='ix_consumption_grain_period'), models.Index(fields=['grain', 'process', 'period'], name='ix_consumption_process')],
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models, IntegrityError, transaction
+from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -6,6 +6,8 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 import math
 
+from utils.lot import next_lot
+
 # -------------------------------
 # Soft Delete Manager / QuerySet
 # -------------------------------
@@ -101,15 +103,9 @@ class WorkOrder(models.Model):
         return f"{self.work_lot} - {self.product.name} ({self.order_qty}EA)"
 
     # ---------- LOT 시퀀스/생성 ----------
-    def _next_sequence_for(self, yyyymmdd: str) -> int:
-        prefix = f"J{yyyymmdd}-"
-        existing = WorkOrder.objects.filter(work_lot__startswith=prefix).count()
-        return existing + 1
-
     def _generate_work_lot(self) -> str:
         ymd = _today_str()
-        seq = self._next_sequence_for(ymd)
-        return f"J{ymd}-{seq:03d}"
+        return next_lot("J", datetime.strptime(ymd, "%Y%m%d").date())
 
     # ---------- 저장 ----------
     def save(self, *args, **kwargs):
@@ -118,21 +114,10 @@ class WorkOrder(models.Model):
         self.actual_start = _ensure_aware(self.actual_start)
         self.actual_end = _ensure_aware(self.actual_end)
 
+        # 카운터 블록 발급이라 중복 번호가 나오지 않음 → 재시도 불필요
         if not self.work_lot:
-            attempts = 5
-            last_err = None
-            for _ in range(attempts):
-                try:
-                    if not self.work_lot:
-                        self.work_lot = self._generate_work_lot()
-                    with transaction.atomic():
-                        return super().save(*args, **kwargs)
-                except IntegrityError as e:
-                    last_err = e
-                    self.work_lot = None
-            raise last_err
-        else:
-            return super().save(*args, **kwargs)
+            self.work_lot = self._generate_work_lot()
+        return super().save(*args, **kwargs)
 
     # ---------- 소프트 삭제/복구 ----------
     def soft_delete(self):
@@ -608,4 +593,55 @@ class NonFerrousAdditionLine(models.Model):
         verbose_name_plural = "비철 투입 상세"
 
     def __str__(self):
-        return f"{self.nonferrous} : {self.quantity}{self.unit}"
\ No newline at end of file
+        return f"{self.nonferrous} : {self.quantity}{self.unit}"
+
+# -------------------------------
+# 약품/비철 투입량 집계 (추이/원단위 화면용)
+# -------------------------------
+class ConsumptionKind(models.TextChoices):
+    CHEMICAL = "CHEM", "약품"
+    NONFERROUS = "NF", "비철"
+
+
+class ConsumptionGrain(models.TextChoices):
+    DAY = "D", "일"
+    WEEK = "W", "주"
+    MONTH = "M", "월"
+
+
+class ConsumptionRollup(models.Model):
+    """
+    투입일지 라인 집계: (기간, 공정, 품목, 설비, 근무조, 단위) 별 투입량
+    - period: 기간 시작일 (일=해당일, 주=월요일, 월=1일)
+    - 비철은 설비가 없으므로 equipment=NULL
+    - 투입일지 저장/삭제 시 production.consumption.rollups 가 해당 공정·일자 구간만 재계산
+    """
+    grain = models.CharField("집계단위", max_length=1, choices=ConsumptionGrain.choices)
+    period = models.DateField("기간 시작일")
+    kind = models.CharField("구분", max_length=4, choices=ConsumptionKind.choices)
+    process = models.ForeignKey(
+        "process.Process", on_delete=models.CASCADE, related_name="+", verbose_name="공정",
+    )
+    chemical = models.ForeignKey(
+        "chemical.Chemical", on_delete=models.CASCADE,
+        null=True, blank=True, related_name="+", verbose_name="약품",
+    )
+    nonferrous = models.ForeignKey(
+        "nonferrous.Chemical", on_delete=models.CASCADE,
+        null=True, blank=True, related_name="+", verbose_name="비철",
+    )
+    equipment = models.ForeignKey(
+        "equipment.Equipment", on_delete=models.CASCADE,
+        null=True, blank=True, related_name="+", verbose_name="설비",
+    )
+    shift = models.CharField("근무조", max_length=10)
+    unit = models.CharField("단위", max_length=10)
+    qty = models.DecimalField("투입량", max_digits=14, decimal_places=2, default=0)
+    entry_count = models.PositiveIntegerField("라인 수", default=0)
+
+    class Meta:
+        db_table = "production_consumption_rollup"
+        indexes = [
+            models.Index(fields=["grain", "kind", "period"], name="ix_consumption_grain_period"),
+            models.Index(fields=["grain", "process", "period"], name="ix_consumption_process"),
+        ]
@@ -8,7 +8,8 @@ from django.db import transaction
 from django.forms import inlineformset_factory
 from django.shortcuts import get_object_or_404, redirect, render
 
-from ..models import NonFerrousAddition, NonFerrousAdditionLine
+from ..models import ConsumptionKind, NonFerrousAddition, NonFerrousAdditionLine
+from ..consumption.rollups import addition_keys, refresh_for_addition
 from ..forms import NonFerrousAdditionForm, NonFerrousAdditionLineFormSet, NonFerrousAdditionLineForm
 
 from process.models import Process, ProcessNonFerrous
@@ -102,12 +103,14 @@ def nfadd_create(request):
         )
 
         if form.is_valid() and formset.is_valid():
-            addition = form.save(commit=False)
-            addition.created_by = request.user
-            addition.save()
+            with transaction.atomic():
+                addition = form.save(commit=False)
+                addition.created_by = request.user
+                addition.save()
 
-            formset.instance = addition
-            formset.save()
+                formset.instance = addition
+                formset.save()
+                refresh_for_addition(ConsumptionKind.NONFERROUS, addition)
 
             messages.success(request, "비철 투입 정보가 저장되었습니다.")
             return redirect("production:nfadd:nfadd_edit", pk=addition.pk)
@@ -212,6 +215,7 @@ def nfadd_create(request):
 def nfadd_edit(request, pk):
     """비철 투입일지 수정"""
     addition = get_object_or_404(NonFerrousAddition, pk=pk)
+    before = addition_keys(addition)  # 폼이 instance 를 바꾸기 전 (집계 재계산용)
 
     if request.method == "POST":
         form = NonFerrousAdditionForm(request.POST, instance=addition)
@@ -222,8 +226,10 @@ def nfadd_edit(request, pk):
         )
 
         if form.is_valid() and formset.is_valid():
-            form.save()
-            formset.save()
+            with transaction.atomic():
+                form.save()
+                formset.save()
+                refresh_for_addition(ConsumptionKind.NONFERROUS, addition, before)
 
             # ✅ 수정 성공 메시지
             messages.success(request, "비철 투입 정보가 저장되었습니다.")
@@ -255,7 +261,10 @@ def nfadd_delete(request, pk):
     addition = get_object_or_404(NonFerrousAddition, pk=pk)
 
     if request.method == "POST":
-        addition.delete()
+        before = addition_keys(addition)
+        with transaction.atomic():
+            addition.delete()
+            refresh_for_addition(ConsumptionKind.NONFERROUS, None, before)
         return redirect("production:nfadd:nfadd_list")
 
     # GET 으로 직접 들어오면 목록으로 돌려보냄
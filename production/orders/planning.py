@@ -0,0 +1,460 @@
+# production/orders/planning.py
+"""
+작업지시 자동 편성 (유한 용량 · 품번 전환 고려)
+
+대상: 계획 구간 안(또는 계획시각 없음)의 '대기' WorkOrder
+- 소요  = 첫 라인 hanger_count × HANGER_INTERVAL_SEC (없으면 Product.hanger_count)
+- 완료  = 라인 종료 + Product.turn_time_per_hanger(분) — 마지막 행거가 라인을 빠져나오는 시간
+- 납기  = 미출고 수주상세(CustomerOrderItem.delivery_date)를 (제품, 고객사)별로 FIFO 배정
+          · 진행중 작업지시 수량이 먼저 앞쪽 수주를 소진
+          · 같은 (제품, 고객사) 작업지시는 편성 순서대로 앞 납기부터 가져감
+- 용량  = 하루 근무창 [PLAN_SHIFT_START, +PLAN_SHIFT_HOURS) − 그날 고정 작업(대기 외 상태) 종료시각 이후
+- 비용  = 납기지연(분) × W_TARDY_MIN + 프로그램 전환 × W_PROGRAM + 렉 전환 × W_RACK + 미편성 × W_UNPLACED
+
+최적화: ATCS(납기 여유·전환비용 가중) 디스패칭으로 초기해 → 같은 프로그램/렉 옆으로 옮기기 +
+인접 교환 지역탐색(시간 제한 PLAN_SEARCH_SECONDS). 300건 / 7일 기준 수 초 이내.
+
+미리보기는 DB 를 바꾸지 않는다. 적용(apply_plan)은 화면에서 확인한 (작업지시, 일자) 순서를 받아
+그날 고정 작업 뒤에 연속 배치하고 bulk_update 로 한 번에 저장한다.
+적용 시에는 편성안에 없는 '대기' 작업(미리보기의 미편성 = 기존 계획 유지, 미리보기 이후 등록분)도
+시각을 그대로 두므로 고정 작업으로 보고 그 뒤에 배치한다 (라인 이중 점유 방지).
+"""
+import math
+import time as _time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from production.models import WorkOrder, WorkOrderLine
+from sales.models import CustomerOrderItem
+
+from .schedule import DAY_ORDERING, HANGER_INTERVAL_SEC, first_lines, line_duration
+
+# 편성 대상 / 고정 작업 구분
+MOVABLE_STATUS = "대기"
+
+# 비용 가중치 (단위: 지연 1분 = W_TARDY_MIN)
+W_TARDY_MIN = 10
+W_PROGRAM = 60
+W_RACK = 20
+W_UNPLACED = 1_000_000
+
+# ATCS 파라미터 (납기 여유 / 전환비용 민감도)
+K_SLACK = 2.0
+K_SETUP = 0.7
+
+# 지역탐색: 작업 하나당 평가할 최대 후보 위치 수
+SEARCH_CANDIDATES = 12
+
+
+def shift_window(day_range) -> tuple[datetime, datetime]:
+    """하루 구간(호출 측 타임존 규칙) → 근무창 [시작, 종료)"""
+    start_dt, end_dt = day_range
+    hh, mm = (int(x) for x in str(getattr(settings, "PLAN_SHIFT_START", "08:00")).split(":"))
+    hours = float(getattr(settings, "PLAN_SHIFT_HOURS", 16))
+    open_dt = start_dt + timedelta(hours=hh, minutes=mm)
+    return open_dt, min(open_dt + timedelta(hours=hours), end_dt)
+
+
+@dataclass
+class _Job:
+    wo: WorkOrder
+    dur: int            # 라인 점유(초)
+    tail: int           # 턴 시간(초)
+    program: str
+    rack: str
+    group: tuple        # (product_id, customer_id)
+
+
+@dataclass
+class PlanRow:
+    wo: WorkOrder
+    start: datetime
+    end: datetime
+    due: date | None
+    late_min: int
+    program: str
+    rack: str
+    program_change: bool
+    rack_change: bool
+
+
+@dataclass
+class PlanDay:
+    day: date
+    open_at: datetime
+    close_at: datetime
+    fixed_count: int
+    rows: list = field(default_factory=list)
+
+    @property
+    def load_min(self) -> int:
+        return sum(int((r.end - r.start).total_seconds()) for r in self.rows) // 60
+
+
+@dataclass
+class PlanStats:
+    cost: float = 0
+    late_jobs: int = 0
+    late_min: int = 0
+    program_changes: int = 0
+    rack_changes: int = 0
+    unplaced: int = 0
+
+
+@dataclass
+class Plan:
+    start: date
+    days: list                    # [PlanDay]
+    unplaced: list                # [WorkOrder]
+    before: PlanStats
+    after: PlanStats
+    job_count: int = 0
+    elapsed: float = 0.0
+
+
+# ─────────────────────────────────────────────
+# 입력 적재
+# ─────────────────────────────────────────────
+
+def _fixed_load(day_ranges, exclude_ids=(), *, include_movable=False) -> tuple[dict, dict]:
+    """
+    일자별 고정 작업 건수 / 최종 종료시각
+    - 기본(미리보기): 대기 외 상태만 고정
+    - include_movable(적용): exclude_ids(이번에 배치할 작업) 외에는 '대기' 도 고정
+    """
+    horizon = Q(planned_start__gte=day_ranges[0][1][0], planned_start__lt=day_ranges[-1][1][1])
+    qs = WorkOrder.objects.filter(horizon).exclude(pk__in=list(exclude_ids))
+    if not include_movable:
+        qs = qs.exclude(status=MOVABLE_STATUS)
+    qs = qs.values_list("planned_start", "planned_end")
+    counts, ends = defaultdict(int), {}
+    for ps, pe in qs:
+        for d, (s, e) in day_ranges:
+            if s <= ps < e:
+                counts[d] += 1
+                if pe and (d not in ends or pe > ends[d]):
+                    ends[d] = pe
+                break
+    return counts, ends
+
+
+def _windows(day_ranges, fixed_ends):
+    """일자별 (가용 시작, 근무 종료, 근무 시작)"""
+    out = []
+    for d, rng in day_ranges:
+        open_dt, close_dt = shift_window(rng)
+        cur = max(open_dt, fixed_ends.get(d) or open_dt)
+        out.append((cur, close_dt, open_dt))
+    return out
+
+
+def _group_dues(jobs, ordered_ids) -> dict:
+    """(제품, 고객사) → 편성 순서대로 가져갈 납기 목록 (수주 FIFO 페깅)"""
+    groups = defaultdict(list)
+    for i in ordered_ids:
+        groups[jobs[i].group].append(jobs[i])
+    if not groups:
+        return {}
+    product_ids = {g[0] for g in groups}
+
+    demand = defaultdict(list)
+    items = (
+        CustomerOrderItem.objects
+        .filter(product_id__in=product_ids, delete_yn="N", use_yn="Y",
+                order__delete_yn="N", shipped_date__isnull=True)
+        .exclude(status="출고")
+        .order_by("delivery_date", "id")
+        .values_list("product_id", "order__customer_id", "delivery_date", "quantity")
+    )
+    for pid, cid, due, qty in items:
+        demand[(pid, cid)].append([due, qty or 0])
+
+    # 진행중 작업지시가 앞쪽 수주부터 소진
+    running = (
+        WorkOrder.objects.filter(status="진행중", product_id__in=product_ids)
+        .values("product_id", "customer_id").annotate(qty=Sum("order_qty"))
+    )
+    covered = defaultdict(int, {(r["product_id"], r["customer_id"]): r["qty"] or 0 for r in running})
+
+    dues = {}
+    for g, members in groups.items():
+        queue, supply, k, out = demand.get(g, []), covered[g], 0, []
+        for job in members:
+            while k < len(queue) and supply >= queue[k][1]:
+                supply -= queue[k][1]
+                k += 1
+            out.append(queue[k][0] if k < len(queue) else None)
+            supply += job.wo.order_qty or 0
+        dues[g] = out
+    return dues
+
+
+def _duration(line, product) -> timedelta:
+    """일 스케줄 엔진과 같은 소요. 라인이 아예 없을 때만 제품 기본 행거수 사용"""
+    if line is None:
+        return timedelta(seconds=int(product.hanger_count or 0) * HANGER_INTERVAL_SEC)
+    return line_duration(line)
+
+
+def _load_jobs(day_ranges) -> list[_Job]:
+    horizon = Q(planned_start__gte=day_ranges[0][1][0], planned_start__lt=day_ranges[-1][1][1])
+    orders = list(
+        WorkOrder.objects
+        .filter(horizon | Q(planned_start__isnull=True), status=MOVABLE_STATUS)
+        .select_related("product", "customer")
+        .order_by(*DAY_ORDERING)
+    )
+    lines = first_lines(wo.id for wo in orders)
+    jobs = []
+    for wo in orders:
+        p = wo.product
+        jobs.append(_Job(
+            wo=wo,
+            dur=int(_duration(lines.get(wo.id), p).total_seconds()),
+            tail=int(p.turn_time_per_hanger or 0) * 60,
+            program=(p.production_program_code or "").strip(),
+            rack=(p.rack_info or "").strip(),
+            group=(wo.product_id, wo.customer_id),
+        ))
+    return jobs
+
+
+# ─────────────────────────────────────────────
+# 평가 / 탐색 (초 단위 정수 오프셋, 메모리 계산)
+# ─────────────────────────────────────────────
+
+class _Model:
+    def __init__(self, jobs, windows, dues, base, start):
+        self.jobs = jobs
+        self.base = base
+        self.win = [(int((c - base).total_seconds()), int((e - base).total_seconds()),
+                     int((o - base).total_seconds())) for c, e, o in windows]
+        # 납기 = 출하일 00:00 까지 완료 (오프셋 초)
+        self.dues = {
+            g: [None if d is None else (d - start).days * 86400 for d in lst]
+            for g, lst in dues.items()
+        }
+        self.due_dates = dues
+
+    def evaluate(self, seq, detail=False):
+        jobs, win, dues = self.jobs, self.win, self.dues
+        nd = len(win)
+        d = 0
+        cur, close, open_ = win[0] if nd else (0, 0, 0)
+        seen = defaultdict(int)
+        tardy = late_jobs = prog = rack = unplaced = 0
+        last = None
+        placed = [] if detail else None
+        for j in seq:
+            job = jobs[j]
+            while d < nd and cur + job.dur > close and cur > open_:
+                d += 1
+                if d < nd:
+                    cur, close, open_ = win[d]
+            if d >= nd:
+                unplaced += 1
+                if detail:
+                    placed.append((j, None, None, None, None, 0, False, False))
+                continue
+            k = seen[job.group]
+            seen[job.group] = k + 1
+            lst = dues.get(job.group) or ()
+            due = lst[k] if k < len(lst) else None
+            pc = last is not None and job.program != last.program
+            rc = last is not None and job.rack != last.rack
+            prog += pc
+            rack += rc
+            start, cur = cur, cur + job.dur
+            late = 0
+            if due is not None:
+                late = cur + job.tail - due
+                if late > 0:
+                    tardy += late
+                    late_jobs += 1
+                else:
+                    late = 0
+            if detail:
+                dl = self.due_dates.get(job.group) or ()
+                placed.append((j, d, start, cur, dl[k] if k < len(dl) else None, late, pc, rc))
+            last = job
+        stats = PlanStats(
+            cost=tardy / 60 * W_TARDY_MIN + prog * W_PROGRAM + rack * W_RACK + unplaced * W_UNPLACED,
+            late_jobs=late_jobs, late_min=tardy // 60,
+            program_changes=prog, rack_changes=rack, unplaced=unplaced,
+        )
+        return (stats, placed) if detail else stats.cost
+
+    def dispatch(self, order):
+        """ATCS: 납기 여유가 작고, 직전 작업과 프로그램/렉이 같고, 짧은 작업 우선"""
+        jobs, win, dues = self.jobs, self.win, self.dues
+        if not order:
+            return []
+        p_avg = sum(jobs[j].dur for j in order) / len(order)
+        s_avg = (W_PROGRAM + W_RACK) / 2
+        remaining = list(order)
+        seq = []
+        nd = len(win)
+        d = 0
+        cur, close, open_ = win[0] if nd else (0, 0, 0)
+        seen = defaultdict(int)
+        last = None
+        while remaining:
+            best, best_score = None, None
+            for j in remaining:
+                job = jobs[j]
+                lst = dues.get(job.group) or ()
+                k = seen[job.group]
+                due = lst[k] if k < len(lst) else None
+                slack = (due - cur - job.dur - job.tail) if due is not None else 30 * 86400
+                setup = 0
+                if last is not None:
+                    setup = W_PROGRAM * (job.program != last.program) + W_RACK * (job.rack != last.rack)
+                score = (-math.log(max(job.dur, 1)) - max(slack, 0) / (K_SLACK * p_avg)
+                         - setup / (K_SETUP * s_avg))
+                if best_score is None or score > best_score:
+                    best, best_score = j, score
+            remaining.remove(best)
+            seq.append(best)
+            job = jobs[best]
+            seen[job.group] += 1
+            while d < nd and cur + job.dur > close and cur > open_:
+                d += 1
+                if d < nd:
+                    cur, close, open_ = win[d]
+            cur += job.dur
+            last = job
+        return seq
+
+    def improve(self, seq, deadline):
+        """같은 프로그램/렉 작업 옆으로 옮기기 + 인접 교환 (first-improvement)"""
+        jobs = self.jobs
+        best = self.evaluate(seq)
+        improved = True
+        while improved and _time.monotonic() < deadline:
+            improved = False
+            for j in list(seq):
+                if _time.monotonic() >= deadline:
+                    break
+                i = seq.index(j)
+                job = jobs[j]
+                base = seq[:i] + seq[i + 1:]
+                cands = [k for k, o in enumerate(base)
+                         if jobs[o].program == job.program and jobs[o].rack == job.rack]
+                cands.sort(key=lambda k: abs(k - i))
+                targets = {k + 1 for k in cands[:SEARCH_CANDIDATES]}
+                targets.update(t for t in (i - 2, i - 1, i + 1, i + 2) if 0 <= t <= len(base))
+                targets.discard(i)
+                for t in sorted(targets, key=lambda t: abs(t - i)):
+                    trial = base[:t] + [j] + base[t:]
+                    cost = self.evaluate(trial)
+                    if cost < best:
+                        seq, best, improved = trial, cost, True
+                        break
+        return seq
+
+
+# ─────────────────────────────────────────────
+# 공개 API
+# ─────────────────────────────────────────────
+
+def build_plan(start: date, days: int, day_range_for) -> Plan:
+    """
+    start 부터 days 일 동안의 편성안 계산 (DB 변경 없음)
+    - day_range_for: date → (start_dt, end_dt) — 호출 측 타임존 규칙
+    """
+    t0 = _time.monotonic()
+    day_ranges = [(start + timedelta(days=i), day_range_for(start + timedelta(days=i))) for i in range(days)]
+    jobs = _load_jobs(day_ranges)
+    fixed_counts, fixed_ends = _fixed_load(day_ranges)
+    windows = _windows(day_ranges, fixed_ends)
+
+    current = list(range(len(jobs)))          # 현재 계획 순서 (planned_start, 생성순)
+    dues = _group_dues(jobs, current)
+    model = _Model(jobs, windows, dues, day_ranges[0][1][0], start)
+
+    before = model.evaluate(current, detail=True)[0]
+    seq = model.dispatch(current)
+    if model.evaluate(current) < model.evaluate(seq):
+        seq = current
+    budget = float(getattr(settings, "PLAN_SEARCH_SECONDS", 3))
+    seq = model.improve(seq, t0 + budget)
+    after, placed = model.evaluate(seq, detail=True)
+
+    plan_days = [
+        PlanDay(day=d, open_at=w[2], close_at=w[1], fixed_count=fixed_counts.get(d, 0))
+        for (d, _), w in zip(day_ranges, windows)
+    ]
+    base = model.base
+    unplaced = []
+    for j, d, s, e, due, late, pc, rc in placed:
+        job = jobs[j]
+        if d is None:
+            unplaced.append(job.wo)
+            continue
+        plan_days[d].rows.append(PlanRow(
+            wo=job.wo, start=base + timedelta(seconds=s), end=base + timedelta(seconds=e),
+            due=due, late_min=late // 60, program=job.program, rack=job.rack,
+            program_change=pc, rack_change=rc,
+        ))
+
+    return Plan(
+        start=start, days=plan_days, unplaced=unplaced, before=before, after=after,
+        job_count=len(jobs), elapsed=round(_time.monotonic() - t0, 2),
+    )
+
+
+@transaction.atomic
+def apply_plan(assignments, day_range_for) -> list[WorkOrder]:
+    """
+    미리보기에서 확정한 [(wo_id, date), ...] (편성 순서) 를 저장.
+    - 같은 작업지시가 두 번 들어 있으면 ValueError (중복 배치 방지)
+    - 대상이 모두 아직 '대기' 인지 잠금 후 확인 (아니면 ValueError)
+    - 일자별로 고정 작업 종료 뒤(없으면 근무 시작)부터 연속 배치, 첫 라인 sequence 재부여
+      (고정 작업 = 그날 계획된 작업 중 assignments 에 없는 전부 — 대기 상태 포함)
+    - WorkOrder / WorkOrderLine 각 bulk_update 1회
+    """
+    ids = [wo_id for wo_id, _ in assignments]
+    if not ids:
+        return []
+    if len(ids) != len(set(ids)):
+        raise ValueError("편성안에 같은 작업지시가 중복되어 있습니다. 다시 미리보기 하세요.")
+    locked = {
+        wo.id: wo for wo in
+        WorkOrder.objects.select_for_update().select_related("product")
+        .filter(pk__in=ids, status=MOVABLE_STATUS)
+    }
+    if len(locked) != len(ids):
+        raise ValueError("편성 이후 상태가 바뀐 작업지시가 있습니다. 다시 미리보기 하세요.")
+
+    by_day = defaultdict(list)
+    for wo_id, d in assignments:
+        by_day[d].append(locked[wo_id])
+    day_ranges = sorted((d, day_range_for(d)) for d in by_day)
+    fixed_counts, fixed_ends = _fixed_load(day_ranges, exclude_ids=ids, include_movable=True)
+    windows = dict(zip((d for d, _ in day_ranges), _windows(day_ranges, fixed_ends)))
+    lines = first_lines(ids)
+
+    changed, changed_lines = [], []
+    for d, orders in by_day.items():
+        cur = windows[d][0]
+        for seq, wo in enumerate(orders, start=fixed_counts.get(d, 0) + 1):
+            before = (wo.planned_start, wo.planned_end)
+            wo.planned_start = cur
+            wo.planned_end = cur = cur + _duration(lines.get(wo.id), wo.product)
+            if before != (wo.planned_start, wo.planned_end):
+                changed.append(wo)
+            line = lines.get(wo.id)
+            if line and line.sequence != seq:
+                line.sequence = seq
+                changed_lines.append(line)
+
+    if changed:
+        WorkOrder.all_objects.bulk_update(changed, ["planned_start", "planned_end"])
+    if changed_lines:
+        WorkOrderLine.all_objects.bulk_update(changed_lines, ["sequence"])
+    return changed
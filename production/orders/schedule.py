@@ -0,0 +1,109 @@
+# production/orders/schedule.py
+"""
+하루 작업지시 스케줄 계산 엔진 (고정 행거간격 4:30)
+
+- 해당 일자 WorkOrder 1회 + 각 WorkOrder 의 첫 라인 1회(DISTINCT ON) 조회
+- 시작/종료 시각 체인은 메모리에서 계산: 소요 = 첫 라인 hanger_count × HANGER_INTERVAL_SEC
+- 값이 바뀐 행만 bulk_update 1회 → 변경된 WorkOrder 목록 반환 (API 는 이 행만 응답)
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from production.models import WorkOrder, WorkOrderLine
+
+# 설비 고정 행거 간격: 4분 30초 (270초)
+HANGER_INTERVAL_SEC = 4 * 60 + 30
+
+DAY_ORDERING = ("planned_start", "created_at", "id")
+
+
+@dataclass
+class DaySchedule:
+    orders: list                  # 하루 WorkOrder (최종 순서)
+    changed: list                 # planned_start/end 가 바뀐 WorkOrder
+    lines_changed: int = 0        # sequence 가 바뀐 첫 라인 수
+
+
+def first_lines(order_ids) -> dict[int, WorkOrderLine]:
+    """WorkOrder id → 첫 라인(id 최소). 쿼리 1회"""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    qs = (
+        WorkOrderLine.all_objects
+        .filter(work_order_id__in=order_ids)
+        .order_by("work_order_id", "id")
+        .distinct("work_order_id")
+    )
+    return {ln.work_order_id: ln for ln in qs}
+
+
+def line_duration(line) -> timedelta:
+    hcnt = int(getattr(line, "hanger_count", 0) or 0)
+    return timedelta(seconds=hcnt * HANGER_INTERVAL_SEC)
+
+
+def _sort_key(wo):
+    return (wo.planned_start is None, wo.planned_start, wo.created_at, wo.id)
+
+
+def _chain(orders, lines, anchor) -> None:
+    """orders 순서대로 anchor 부터 앞에서 뒤로 누적 (메모리)"""
+    cur = anchor
+    for wo in orders:
+        wo.planned_start = cur
+        wo.planned_end = cur + line_duration(lines.get(wo.id))
+        cur = wo.planned_end
+
+
+@transaction.atomic
+def recalc_day_schedule(base_date: date, order_ids=None, day_range=None) -> DaySchedule:
+    """
+    base_date 하루 스케줄 재계산.
+    - order_ids 가 주어지면(순서 저장) 먼저 그 순서대로 선택 집합의 최소 시작시각부터 배치하고
+      첫 라인 sequence 를 1..n 으로 맞춘 뒤, 하루 전체를 시작시각 순으로 다시 누적
+      (기존 order_reorder → _recalc_day_schedule 2단계와 같은 결과)
+    - day_range: (start_dt, end_dt) — 호출 측 타임존 규칙으로 계산된 하루 구간
+    """
+    start_dt, end_dt = day_range
+    order_ids = [int(x) for x in (order_ids or [])]
+
+    cond = Q(planned_start__gte=start_dt, planned_start__lt=end_dt)
+    if order_ids:
+        cond |= Q(pk__in=order_ids)
+    loaded = list(WorkOrder.all_objects.filter(cond).order_by(*DAY_ORDERING))
+    if not loaded:
+        return DaySchedule(orders=[], changed=[])
+
+    before = {wo.id: (wo.planned_start, wo.planned_end) for wo in loaded}
+    lines = first_lines(before)
+
+    changed_lines = []
+    if order_ids:
+        by_id = {wo.id: wo for wo in loaded}
+        selected = [by_id[i] for i in order_ids if i in by_id]
+        anchor = min((wo.planned_start for wo in selected if wo.planned_start), default=None) or start_dt
+        _chain(selected, lines, anchor)
+        for seq, wo in enumerate(selected, start=1):
+            line = lines.get(wo.id)
+            if line and line.sequence != seq:
+                line.sequence = seq
+                changed_lines.append(line)
+
+    # 하루 전체: 시작시각 순 정렬 후 첫 행 시작시각부터 누적
+    day = sorted(
+        (wo for wo in loaded if wo.planned_start and start_dt <= wo.planned_start < end_dt),
+        key=_sort_key,
+    )
+    if day:
+        _chain(day, lines, day[0].planned_start)
+
+    changed = [wo for wo in loaded if before[wo.id] != (wo.planned_start, wo.planned_end)]
+    if changed:
+        WorkOrder.all_objects.bulk_update(changed, ["planned_start", "planned_end"])
+    if changed_lines:
+        WorkOrderLine.all_objects.bulk_update(changed_lines, ["sequence"])
+    return DaySchedule(orders=day, changed=changed, lines_changed=len(changed_lines))
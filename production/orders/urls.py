@@ -16,4 +16,7 @@ urlpatterns = [
     # ★ 순서 저장
     path("reorder/", views.order_reorder, name="order_reorder"),
     path("last-end/", views.get_last_end, name="last_end"),  # ★ 추가
+    # ★ 자동 편성: 미리보기 / 일괄 적용
+    path("plan/", views.order_plan, name="order_plan"),
+    path("plan/apply/", views.order_plan_apply, name="order_plan_apply"),
 ]
@@ -8,6 +8,7 @@
 # - 수주 검색(AJAX, 기본기간 적용)
 # - 목록 행 인라인 저장(AJAX: 투입행거수/생산량) + 하루 재계산
 # - 순서 저장 + 스케줄 재계산(AJAX)
+# - 자동 편성(유한 용량/전환 고려) 미리보기 + 일괄 적용
 # - 타임존/날짜 유틸 통일(naive/aware 안전 처리)
 # ============================================================================
 
@@ -21,6 +22,7 @@ from django.db import transaction
 from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
 from django.utils.dateparse import parse_date
 from django.views.decorators.http import require_GET, require_POST
@@ -36,6 +38,8 @@ from utils.lot import get_next_lot
 # 현재 앱
 from production.models import WorkOrder, WorkOrderLine
 from ..forms import WorkOrderForm, WorkOrderLineFormSet
+from .planning import apply_plan, build_plan
+from .schedule import HANGER_INTERVAL_SEC, recalc_day_schedule
 
 logger = logging.getLogger(__name__)
 
@@ -43,8 +47,7 @@ logger = logging.getLogger(__name__)
 # 상수 / 타임 유틸
 # ──────────────────────────────────────────────────────────────────────────────
 
-# 설비 고정 행거 간격: 4분 30초 (270초)
-HANGER_INTERVAL_SEC = 4 * 60 + 30
+# 설비 고정 행거 간격(HANGER_INTERVAL_SEC, 4:30)은 스케줄 엔진(schedule.py)에서 가져옴
 
 
 def _ensure_aware(dt: datetime | None) -> datetime | None:
@@ -180,6 +183,18 @@ def _normalize_and_sum(request_post, prefix="lines"):
 # ──────────────────────────────────────────────────────────────────────────────
 # 순서 저장 + 스케줄 재계산 (AJAX)
 # ──────────────────────────────────────────────────────────────────────────────
+def _fmt_dt(dt):
+    if not dt:
+        return ""
+    return (timezone.localtime(dt).strftime("%Y-%m-%d %H:%M")
+            if getattr(settings, "USE_TZ", False) else dt.strftime("%Y-%m-%d %H:%M"))
+
+
+def _times_payload(wos) -> dict:
+    """{id: {start, end}} — 화면 행 갱신용 (변경된 행만 넘긴다)"""
+    return {str(wo.id): {"start": _fmt_dt(wo.planned_start), "end": _fmt_dt(wo.planned_end)} for wo in wos}
+
+
 @require_POST
 @transaction.atomic
 def order_reorder(request):
@@ -187,84 +202,37 @@ def order_reorder(request):
     ids[]=... 순서대로 당일 스케줄을 재배치.
     - 앵커: 선택 집합의 최소 planned_start
     - 소요시간: (라인의 투입행거수 × 4:30)
-    - 완료 후 각 행의 최신 start/end 반환
+    - 완료 후 시작/종료가 바뀐 행의 start/end 만 반환
     """
-    ids = request.POST.getlist("ids[]")
+    try:
+        ids = [int(x) for x in request.POST.getlist("ids[]")]
+    except ValueError:
+        return JsonResponse({"ok": False, "msg": "잘못된 요청입니다."})
     if not ids:
         return JsonResponse({"ok": False, "msg": "변경할 항목이 없습니다."})
 
-    wos = list(WorkOrder.all_objects.filter(pk__in=ids))
-    if len(wos) != len(ids):
+    starts = dict(WorkOrder.all_objects.filter(pk__in=ids).values_list("id", "planned_start"))
+    if len(starts) != len(set(ids)):
         return JsonResponse({"ok": False, "msg": "일부 항목을 찾을 수 없습니다."})
 
-    base_date = _to_local_date(wos[0].planned_start)
-    anchor = min((wo.planned_start for wo in wos if wo.planned_start), default=None)
-    if not anchor:
-        anchor, _ = _day_range_for(base_date)
-
-    wo_map = {wo.id: wo for wo in wos}
-    cur = anchor
-
-    for i, sid in enumerate(ids):
-        wo = wo_map.get(int(sid))
-        if not wo:
-            continue
-        line = (WorkOrderLine.all_objects.filter(work_order=wo).order_by("id").first())
-        hcnt = int(getattr(line, "hanger_count", 0) or 0)
-
-        duration = timedelta(seconds=hcnt * HANGER_INTERVAL_SEC)
-        wo.planned_start = cur
-        wo.planned_end = cur + duration
-        wo.save(update_fields=["planned_start", "planned_end"])
-
-        if line and line.sequence != i + 1:
-            line.sequence = i + 1
-            line.save(update_fields=["sequence"])
-
-        cur = wo.planned_end
-
-    _recalc_day_schedule(base_date)
-
-    def _fmt(dt):
-        if not dt:
-            return ""
-        return (timezone.localtime(dt).strftime("%Y-%m-%d %H:%M")
-                if getattr(settings, "USE_TZ", False) else dt.strftime("%Y-%m-%d %H:%M"))
-
-    refreshed = WorkOrder.all_objects.filter(pk__in=ids)
-    payload = {str(wo.id): {"start": _fmt(wo.planned_start), "end": _fmt(wo.planned_end)} for wo in refreshed}
-    return JsonResponse({"ok": True, "times": payload, "msg": "순서 저장 및 재계산 완료"})
+    result = _recalc_day_schedule(_to_local_date(starts[ids[0]]), order_ids=ids)
+    return JsonResponse({
+        "ok": True,
+        "times": _times_payload(result.changed),
+        "msg": "순서 저장 및 재계산 완료",
+    })
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 하루 스케줄 재계산 (고정 행거간격 4:30)
 # ──────────────────────────────────────────────────────────────────────────────
-@transaction.atomic
-def _recalc_day_schedule(base_date: date):
+def _recalc_day_schedule(base_date: date, order_ids=None):
     """
     base_date의 모든 WorkOrder를 planned_start 오름차순으로 정렬한 뒤,
     WorkOrderLine.hanger_count × 4:30 만큼의 소요 시간을 앞에서 뒤로 누적 반영.
+    (조회 2회 + bulk_update 1회, schedule.recalc_day_schedule 참고)
     """
-    start_dt, end_dt = _day_range_for(base_date)
-    qs = (WorkOrder.all_objects
-          .filter(planned_start__gte=start_dt, planned_start__lt=end_dt)
-          .select_related("product", "customer")
-          .order_by("planned_start", "created_at", "id"))
-
-    if not qs.exists():
-        return
-
-    cur = qs.first().planned_start
-    for wo in qs:
-        line = (WorkOrderLine.all_objects.filter(work_order=wo).order_by("id").first())
-        hcnt = int(getattr(line, "hanger_count", 0) or 0)
-        duration = timedelta(seconds=hcnt * HANGER_INTERVAL_SEC)
-
-        wo.planned_start = cur
-        wo.planned_end = cur + duration
-        wo.save(update_fields=["planned_start", "planned_end"])
-
-        cur = wo.planned_end
+    return recalc_day_schedule(base_date, order_ids=order_ids, day_range=_day_range_for(base_date))
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -300,6 +268,61 @@ def order_list(request):
     return render(request, "production/orders/order_list.html", ctx)
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# 자동 편성 (유한 용량 · 프로그램/렉 전환 최소화) — planning.py
+# ──────────────────────────────────────────────────────────────────────────────
+PLAN_MAX_DAYS = 14
+
+
+def _plan_params(data) -> tuple[date, int]:
+    start = _safe_date((data.get("start") or "").strip()) or _today_localdate()
+    try:
+        days = int(data.get("days") or 7)
+    except ValueError:
+        days = 7
+    return start, min(max(days, 1), PLAN_MAX_DAYS)
+
+
+@require_GET
+def order_plan(request):
+    """
+    자동 편성 미리보기 (DB 변경 없음)
+    - start: 편성 시작일(기본 오늘), days: 기간(기본 7일, 최대 14일)
+    - 대상: 기간 안(또는 계획시각 없는) '대기' 작업지시, 그 외 상태는 고정 작업으로 두고 뒤에 배치
+    """
+    start, days = _plan_params(request.GET)
+    plan = build_plan(start, days, _day_range_for) if request.GET.get("run") else None
+    ctx = {
+        "start": start,
+        "days": days,
+        "plan": plan,
+    }
+    return render(request, "production/orders/order_plan.html", ctx)
+
+
+@require_POST
+def order_plan_apply(request):
+    """미리보기에서 확인한 편성(plan=작업지시id:YYYY-MM-DD, 편성 순서) 일괄 저장"""
+    start, days = _plan_params(request.POST)
+    assignments = []
+    for raw in request.POST.getlist("plan"):
+        wo_id, _, d = raw.partition(":")
+        d = _safe_date(d)
+        if not wo_id.isdigit() or d is None:
+            messages.error(request, "잘못된 편성 데이터입니다.")
+            return redirect(f"{reverse('orders:order_plan')}?start={start:%Y-%m-%d}&days={days}")
+        assignments.append((int(wo_id), d))
+
+    try:
+        changed = apply_plan(assignments, _day_range_for)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect(f"{reverse('orders:order_plan')}?start={start:%Y-%m-%d}&days={days}")
+
+    messages.success(request, f"자동 편성 적용 완료: {len(assignments)}건 중 {len(changed)}건 시간 변경")
+    return redirect(f"{reverse('orders:order_list')}?d={start:%Y-%m-%d}")
+
+
 def get_last_end(request):
     """
     최근 작업지시의 계획 시간과 표시용 요약 정보를 반환.
@@ -756,22 +779,16 @@ def order_row_update(request, pk: int):
     wo.save(update_fields=["order_qty"])
 
     base_date = _to_local_date(wo.planned_start)
-    _recalc_day_schedule(base_date)
-
-    wo = WorkOrder.all_objects.get(pk=wo.pk)
-
-    def _fmt(dt):
-        if not dt:
-            return ""
-        return (timezone.localtime(dt).strftime("%Y-%m-%d %H:%M")
-                if getattr(settings, "USE_TZ", False) else dt.strftime("%Y-%m-%d %H:%M"))
+    result = _recalc_day_schedule(base_date)
+    wo = next((w for w in result.orders if w.id == wo.id), wo)
 
     return JsonResponse({
         "ok": True,
         "work_order_id": wo.id,
         "hanger_count": hcnt,
         "order_qty": calc_qty,
-        "planned_start": _fmt(wo.planned_start),
-        "planned_end": _fmt(wo.planned_end),
+        "planned_start": _fmt_dt(wo.planned_start),
+        "planned_end": _fmt_dt(wo.planned_end),
+        "times": _times_payload(result.changed),   # 연쇄로 바뀐 다른 행 포함
         "msg": "저장 및 하루 스케줄 재계산 완료",
     })
@@ -1,3 +1,134 @@
-from django.test import TestCase
+import time
+from datetime import date, datetime, timedelta
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from production.orders.planning import (
+    W_PROGRAM,
+    W_RACK,
+    W_TARDY_MIN,
+    W_UNPLACED,
+    _Job,
+    _Model,
+)
+
+START = date(2026, 10, 19)
+BASE = datetime(2026, 10, 19)
+HOUR = 3600
+
+
+def _job(program="A", rack="R1", dur=HOUR, tail=0, group=(1, 1)):
+    # 평가/탐색은 WorkOrder 를 읽지 않음 → wo 없이 메모리 작업만
+    return _Job(wo=None, dur=dur, tail=tail, program=program, rack=rack, group=group)
+
+
+def _window(day: int, open_h: float = 8, hours: float = 16):
+    """day 번째 날 근무창 (가용 시작, 종료, 근무 시작) — 고정 작업 없음"""
+    open_dt = BASE + timedelta(days=day, hours=open_h)
+    return open_dt, open_dt + timedelta(hours=hours), open_dt
+
+
+def _model(jobs, windows=None, dues=None):
+    return _Model(jobs, windows or [_window(0)], dues or {}, BASE, START)
+
+
+class PlanEvaluateTests(SimpleTestCase):
+    """_Model.evaluate: 근무창 배치 / 전환 / 납기지연 / 미편성 비용"""
+
+    def test_same_program_back_to_back_costs_nothing(self):
+        m = _model([_job(), _job()])
+        stats, placed = m.evaluate([0, 1], detail=True)
+        self.assertEqual(stats.cost, 0)
+        self.assertEqual(stats.program_changes, 0)
+        # 근무 시작(08:00)부터 연속 배치
+        self.assertEqual([(p[1], p[2], p[3]) for p in placed],
+                         [(0, 8 * HOUR, 9 * HOUR), (0, 9 * HOUR, 10 * HOUR)])
+
+    def test_program_and_rack_changes(self):
+        m = _model([_job("A", "R1"), _job("B", "R1"), _job("B", "R2")])
+        stats = m.evaluate([0, 1, 2], detail=True)[0]
+        self.assertEqual((stats.program_changes, stats.rack_changes), (1, 1))
+        self.assertEqual(stats.cost, W_PROGRAM + W_RACK)
+        self.assertEqual(m.evaluate([0, 1, 2]), stats.cost)
+
+    def test_overflow_moves_to_next_day_then_unplaced(self):
+        jobs = [_job(), _job(), _job()]
+        short = [_window(0, hours=1.5), _window(1, hours=1.5)]
+        stats, placed = _model(jobs, short).evaluate([0, 1, 2], detail=True)
+        self.assertEqual([p[1] for p in placed], [0, 1, None])
+        self.assertEqual(placed[1][2], 86400 + 8 * HOUR)
+        self.assertEqual(stats.unplaced, 1)
+        self.assertEqual(stats.cost, W_UNPLACED)
+
+    def test_job_longer_than_empty_window_still_placed(self):
+        stats, placed = _model([_job(dur=20 * HOUR)]).evaluate([0], detail=True)
+        self.assertEqual(stats.unplaced, 0)
+        self.assertEqual(placed[0][1], 0)
+
+    def test_tardiness_includes_turn_time(self):
+        # 납기 = 출하일 00:00 → 당일 출하분은 08:00 시작 시 이미 지연
+        jobs = [_job(tail=600)]
+        stats, placed = _model(jobs, dues={(1, 1): [START]}).evaluate([0], detail=True)
+        late = 9 * HOUR + 600
+        self.assertEqual(placed[0][5], late)
+        self.assertEqual(placed[0][4], START)
+        self.assertEqual((stats.late_jobs, stats.late_min), (1, late // 60))
+        self.assertEqual(stats.cost, late / 60 * W_TARDY_MIN)
+
+    def test_group_dues_are_taken_in_sequence_order(self):
+        # 같은 (제품, 고객사) 두 건: 편성 순서대로 앞 납기부터
+        jobs = [_job(), _job()]
+        dues = {(1, 1): [START, START + timedelta(days=2)]}
+        m = _model(jobs, dues=dues)
+        for seq in ([0, 1], [1, 0]):
+            placed = m.evaluate(seq, detail=True)[1]
+            self.assertEqual([p[4] for p in placed], [START, START + timedelta(days=2)])
+            self.assertGreater(placed[0][5], 0)
+            self.assertEqual(placed[1][5], 0)
+
+
+class PlanDispatchTests(SimpleTestCase):
+    """_Model.dispatch: ATCS 초기해"""
+
+    def test_returns_permutation(self):
+        jobs = [_job(p) for p in "ABCAB"]
+        seq = _model(jobs).dispatch(list(range(len(jobs))))
+        self.assertEqual(sorted(seq), list(range(len(jobs))))
+        self.assertEqual(_model(jobs).dispatch([]), [])
+
+    def test_urgent_job_first(self):
+        jobs = [_job("A", group=(1, 1)), _job("B", group=(2, 1))]
+        seq = _model(jobs, dues={(2, 1): [START]}).dispatch([0, 1])
+        self.assertEqual(seq, [1, 0])
+
+    def test_groups_same_program_without_dues(self):
+        jobs = [_job(p) for p in "ABAB"]
+        m = _model(jobs)
+        seq = m.dispatch([0, 1, 2, 3])
+        self.assertEqual(seq, [0, 2, 1, 3])
+        self.assertEqual(m.evaluate(seq), W_PROGRAM)
+
+
+class PlanImproveTests(SimpleTestCase):
+    """_Model.improve: 지역탐색은 비용을 늘리지 않음"""
+
+    def test_merges_alternating_programs(self):
+        jobs = [_job(p) for p in "ABAB"]
+        m = _model(jobs)
+        seq = m.improve([0, 1, 2, 3], time.monotonic() + 5)
+        self.assertEqual(sorted(seq), [0, 1, 2, 3])
+        self.assertEqual(m.evaluate(seq), W_PROGRAM)
+
+    def test_never_worse_than_input(self):
+        jobs = [_job(p, r, group=(i, 1)) for i, (p, r) in enumerate(
+            [("A", "R1"), ("B", "R2"), ("A", "R2"), ("C", "R1"), ("B", "R1")])]
+        dues = {(1, 1): [START], (3, 1): [START + timedelta(days=1)]}
+        m = _model(jobs, [_window(0), _window(1)], dues)
+        start_seq = [4, 3, 2, 1, 0]
+        seq = m.improve(list(start_seq), time.monotonic() + 5)
+        self.assertEqual(sorted(seq), sorted(start_seq))
+        self.assertLessEqual(m.evaluate(seq), m.evaluate(start_seq))
+
+    def test_expired_deadline_returns_input(self):
+        jobs = [_job(p) for p in "ABAB"]
+        self.assertEqual(_model(jobs).improve([0, 1, 2, 3], time.monotonic() - 1), [0, 1, 2, 3])
@@ -10,6 +10,7 @@ urlpatterns = [
     path("spares/", include(("production.spares.urls", "spares"), namespace="spares")),
     path("chemadd/", include(("production.chemadd.urls", "chemadd"), namespace="chemadd")),
     path("nfadd/", include(("production.nfadd.urls", "nfadd"), namespace="nfadd")),
+    path("consumption/", include(("production.consumption.urls", "consumption"), namespace="consumption")),
     # 후개발 모듈 연결 예정:
     # path("complete/", include("production.complete.urls")),
     # path("nonferrous/", include("production.nonferrous.urls")),
@@ -0,0 +1,42 @@
+# purchase/exports.py
+"""
+구매 목록 백그라운드 내보내기 등록 (core.exports)
+— 목록 화면과 같은 필터 함수를 그대로 호출한다.
+"""
+from datetime import date
+
+from django.db.models import Subquery
+
+from core.exports import ExportSpec, register_export
+
+from .views.injection import (
+    RECEIPT_EXPORT_HEADER, _build_receipt_order_queryset, _first_item_name, receipt_export_row,
+)
+from .views.unified import (
+    ORDER_EXPORT_HEADER, ORDER_ITEM_ORDERING, _order_item_queryset, order_export_row,
+)
+
+
+@register_export("purchase.inj_receipts", "사출 입고 목록")
+def inj_receipts(params):
+    qs, _filter_ctx = _build_receipt_order_queryset(params, for_export=True)
+    qs = qs.prefetch_related(None).annotate(first_item_name=Subquery(_first_item_name))
+    return ExportSpec(
+        filename=f"injection_receipts_{date.today():%Y%m%d}",
+        header=RECEIPT_EXPORT_HEADER,
+        qs=qs,
+        row_fn=receipt_export_row,
+        widths=[18, 18, 24, 10, 12, 12, 12, 10, 10, 18],
+    )
+
+
+@register_export("purchase.uni_orders", "통합 발주 목록")
+def uni_orders(params):
+    cat, qs = _order_item_queryset(params)
+    return ExportSpec(
+        filename=f"orders_{cat}_{date.today().isoformat()}",
+        header=ORDER_EXPORT_HEADER,
+        qs=qs.order_by(*ORDER_ITEM_ORDERING),
+        row_fn=order_export_row,
+        widths=[18, 18, 12, 24, 10, 10, 12, 12, 10, 10, 18, 18],
+    )
@@ -0,0 +1,12 @@
+# purchase/management/commands/rebuild_injection_lot_index.py
+from django.core.management.base import BaseCommand
+
+from purchase.services import rebuild_injection_lot_index
+
+
+class Command(BaseCommand):
+    help = "사출 입고 라인 기준으로 생산투입 후보 LOT 색인(purchase_injection_lot_index)을 재구성합니다."
+
+    def handle(self, *args, **options):
+        count = rebuild_injection_lot_index()
+        self.stdout.write(self.style.SUCCESS(f"사출 LOT 색인 재구성 완료: {count}건"))
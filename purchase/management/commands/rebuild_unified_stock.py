@@ -0,0 +1,12 @@
+# purchase/management/commands/rebuild_unified_stock.py
+from django.core.management.base import BaseCommand
+
+from purchase.services import rebuild_unified_stock
+
+
+class Command(BaseCommand):
+    help = "통합 입고 전표/서브 LOT 잔량 기준으로 창고별 현재고(purchase_stock_balance)를 재구성합니다."
+
+    def handle(self, *args, **options):
+        count = rebuild_unified_stock()
+        self.stdout.write(self.style.SUCCESS(f"현재고 재구성 완료: {count}건"))
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:01
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('master', '0001_initial'),
+        ('purchase', '0017_unifiedreceipt_certificate_file_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnifiedStockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('CHEM', '약품'), ('NF', '비철'), ('SUP', '부자재')], max_length=8)),
+                ('item_id', models.PositiveBigIntegerField()),
+                ('qty', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item_ct', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='contenttypes.contenttype')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='unified_stock_balances', to='master.warehouse')),
+            ],
+            options={
+                'db_table': 'purchase_stock_balance',
+                'indexes': [models.Index(fields=['category', 'warehouse'], name='purchase_st_categor_7e41da_idx')],
+                'constraints': [models.UniqueConstraint(fields=('category', 'item_ct', 'item_id', 'warehouse'), name='uq_stock_balance_item_wh')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('injection', '0005_moldhistory'),
+        ('master', '0001_initial'),
+        ('purchase', '0018_unifiedstockbalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InjectionLotIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sub_lot', models.CharField(max_length=32)),
+                ('receipt_lot', models.CharField(max_length=20)),
+                ('receipt_date', models.DateField()),
+                ('qty', models.PositiveIntegerField()),
+                ('remaining_qty', models.IntegerField()),
+                ('use_status', models.CharField(max_length=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('injection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_index', to='injection.injection')),
+                ('line', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_index', to='purchase.injectionreceiptline')),
+                ('receipt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_index', to='purchase.injectionreceipt')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='injection_lot_index', to='master.warehouse')),
+            ],
+            options={
+                'db_table': 'purchase_injection_lot_index',
+                'indexes': [models.Index(fields=['injection', 'warehouse', 'receipt_date', 'sub_lot'], name='ix_injlot_fifo')],
+                'constraints': [models.UniqueConstraint(fields=('injection', 'line'), name='uq_injlot_injection_line')],
+            },
+        ),
+    ]
@@ -196,6 +196,36 @@ class InjectionIssue(BaseDoc):
         ]
 
 
+class InjectionLotIndex(models.Model):
+    """
+    생산투입 후보 사출 LOT 색인(사출품 × 창고 × 서브 LOT).
+    - 사출품: 입고 발주의 품목(injection), 창고: 라인 창고 → 없으면 헤더 창고
+    - 입고확정/이동/사용 바인딩이 같은 트랜잭션에서 해당 라인만 다시 계산, 입고취소는 CASCADE
+    - 활성·미삭제 입고만 보관 / 정합성 복구: manage.py rebuild_injection_lot_index
+    """
+    injection = models.ForeignKey("injection.Injection", on_delete=models.CASCADE, related_name="lot_index")
+    line      = models.ForeignKey("InjectionReceiptLine", on_delete=models.CASCADE, related_name="lot_index")
+    receipt   = models.ForeignKey("InjectionReceipt", on_delete=models.CASCADE, related_name="lot_index")
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="injection_lot_index")
+    sub_lot      = models.CharField(max_length=32)
+    receipt_lot  = models.CharField(max_length=20)
+    receipt_date = models.DateField()
+    qty           = models.PositiveIntegerField()
+    remaining_qty = models.IntegerField()
+    use_status    = models.CharField(max_length=10)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "purchase_injection_lot_index"
+        indexes = [
+            # 팝업: 사출품 + 창고 범위 조회 후 입고일(FIFO) 순
+            models.Index(fields=["injection", "warehouse", "receipt_date", "sub_lot"], name="ix_injlot_fifo"),
+        ]
+        constraints = [
+            UniqueConstraint(fields=["injection", "line"], name="uq_injlot_injection_line"),
+        ]
+
+
 # =============================================================================
 # 통합(약품/비철/부자재)
 # =============================================================================
@@ -372,6 +402,33 @@ class UnifiedReturn(BaseDoc):
         ordering = ["-date", "-id"]
 
 
+class UnifiedStockBalance(models.Model):
+    """
+    통합 품목 창고별 현재고(잔량 = qty - used_qty 합계).
+    - 입고/이동/반품/사용 서비스가 같은 트랜잭션 안에서 증감 반영 (purchase.services 참고)
+    - 창고: CHEM 라인은 라인 창고, 없으면 헤더 창고 / NF·SUP 는 헤더 창고
+    - 정합성 복구: manage.py rebuild_unified_stock
+    """
+    category = models.CharField(max_length=8, choices=CATEGORY_CHOICES)
+    item_ct  = models.ForeignKey(ContentType, on_delete=models.PROTECT)
+    item_id  = models.PositiveBigIntegerField()
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, related_name="unified_stock_balances")
+    qty = models.DecimalField(max_digits=18, decimal_places=3, default=Decimal("0.000"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "purchase_stock_balance"
+        indexes = [
+            models.Index(fields=["category", "warehouse"]),
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=["category", "item_ct", "item_id", "warehouse"],
+                name="uq_stock_balance_item_wh",
+            ),
+        ]
+
+
 # =============================================================================
 # 통합 발주(헤더/아이템) — 기존 유지
 # =============================================================================
@@ -4,17 +4,22 @@ from __future__ import annotations
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
 from typing import List, Dict, Optional, Tuple
 
-from django.db import transaction, IntegrityError
-from django.db.models import Sum
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F, Q, Sum
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+from injectionorder.models import InjectionOrderItem
+
 from .models import (
+    InjectionLotIndex,
+    InjectionReceipt,
+    InjectionReceiptLine,
     UnifiedReceipt,
     UnifiedReceiptLine,
+    UnifiedStockBalance,
     UnifiedUsage,
     # 사출(Injection) 관련이 필요해지면 아래 주석 해제
-    # InjectionReceiptLine,
     # InjectionUsage,
 )
 
@@ -174,6 +179,170 @@ def _sync_unified_header_from_lines(receipt_id: int) -> Tuple[Decimal, Decimal,
     return sum_qty, sum_used, receipt.use_status
 
 
+# ======================================================================
+# 창고별 현재고(UnifiedStockBalance) 증감
+#  - 잔량(qty - used_qty)이 바뀌는 모든 처리에서 같은 트랜잭션으로 호출
+#  - 행: (category, item_ct_id, item_id, warehouse_id, delta)
+# ======================================================================
+
+def apply_stock_deltas(rows) -> int:
+    """
+    현재고 증감 일괄 반영(INSERT … ON CONFLICT 1회).
+    - 같은 키는 합산, 0 증감은 생략
+    - 키 순서로 정렬해서 보내므로 동시 처리 간 잠금 순서가 일정(교착 방지)
+    """
+    merged: Dict[tuple, Decimal] = {}
+    for category, item_ct_id, item_id, warehouse_id, delta in rows:
+        if not warehouse_id:
+            continue
+        key = (category, int(item_ct_id), int(item_id), int(warehouse_id))
+        merged[key] = merged.get(key, _ZERO) + _dec(delta)
+    merged = {k: v for k, v in merged.items() if v != _ZERO}
+    if not merged:
+        return 0
+
+    values_sql = ", ".join(["(%s, %s, %s, %s, %s, now())"] * len(merged))
+    params: list = []
+    for key in sorted(merged):
+        params.extend([*key, merged[key].quantize(Decimal("0.001"))])
+
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {UnifiedStockBalance._meta.db_table}
+                (category, item_ct_id, item_id, warehouse_id, qty, updated_at)
+            VALUES {values_sql}
+            ON CONFLICT (category, item_ct_id, item_id, warehouse_id)
+            DO UPDATE SET qty = {UnifiedStockBalance._meta.db_table}.qty + EXCLUDED.qty,
+                          updated_at = now()
+            """,
+            params,
+        )
+    return len(merged)
+
+
+def _line_stock_row(line: UnifiedReceiptLine, receipt: UnifiedReceipt, delta) -> tuple:
+    """CHEM 라인 잔량 증감 행(라인 창고 없으면 헤더 창고)."""
+    return (
+        receipt.category, receipt.item_ct_id, receipt.item_id,
+        line.warehouse_id or receipt.warehouse_id, delta,
+    )
+
+
+def _header_stock_row(receipt: UnifiedReceipt, delta) -> tuple:
+    """NF/SUP 헤더 잔량 증감 행."""
+    return (receipt.category, receipt.item_ct_id, receipt.item_id, receipt.warehouse_id, delta)
+
+
+def receipt_stock_rows(receipt_ids, sign: int = 1) -> List[tuple]:
+    """
+    입고 전표들의 현재 잔량을 창고별 증감 행으로 변환(쿼리 2회).
+    - 라인이 있으면 라인 기준, 없으면 헤더 기준
+    - 삭제/비활성 전표는 재고 0
+    창고를 바꾸는 처리(이동/반품/헤더 수정)는
+    변경 전 sign=-1 행 + 변경 후 sign=+1 행을 함께 apply_stock_deltas() 로 넘긴다.
+    """
+    headers = {
+        rid: (cat, ct_id, item_id, wh_id, qty, used)
+        for rid, cat, ct_id, item_id, wh_id, qty, used in (
+            UnifiedReceipt.objects
+            .filter(id__in=list(receipt_ids), is_active=True, is_deleted=False)
+            .values_list("id", "category", "item_ct_id", "item_id", "warehouse_id", "qty", "used_qty")
+        )
+    }
+    if not headers:
+        return []
+
+    rows: List[tuple] = []
+    with_lines = set()
+    for rid, wh_id, qty, used in (
+        UnifiedReceiptLine.objects
+        .filter(receipt_id__in=list(headers))
+        .values_list("receipt_id", "warehouse_id", "qty", "used_qty")
+    ):
+        cat, ct_id, item_id, hdr_wh_id, _q, _u = headers[rid]
+        with_lines.add(rid)
+        rows.append((cat, ct_id, item_id, wh_id or hdr_wh_id, (_dec(qty) - _dec(used)) * sign))
+
+    for rid, (cat, ct_id, item_id, wh_id, qty, used) in headers.items():
+        if rid not in with_lines:
+            rows.append((cat, ct_id, item_id, wh_id, (_dec(qty) - _dec(used)) * sign))
+    return rows
+
+
+@transaction.atomic
+def rebuild_unified_stock(chunk_size: int = 1000) -> int:
+    """입고 전표/라인 기준으로 현재고 테이블을 비우고 다시 채운다. 반환: 잔량 행 수"""
+    UnifiedStockBalance.objects.all().delete()
+    ids = list(
+        UnifiedReceipt.objects
+        .filter(is_active=True, is_deleted=False)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    for i in range(0, len(ids), chunk_size):
+        apply_stock_deltas(receipt_stock_rows(ids[i:i + chunk_size]))
+    return UnifiedStockBalance.objects.count()
+
+
+# ======================================================================
+# 사출 LOT 색인(InjectionLotIndex) — 생산투입 후보 팝업용
+#  - 입고확정 / 이동 / 사용 바인딩이 같은 트랜잭션에서 바뀐 라인(또는 전표)만 다시 계산
+#  - 입고취소(라인 삭제)는 FK CASCADE 로 함께 삭제
+# ======================================================================
+
+_LOT_INDEX_T = InjectionLotIndex._meta.db_table
+
+_LOT_INDEX_SQL = f"""
+INSERT INTO {_LOT_INDEX_T}
+    (injection_id, line_id, receipt_id, warehouse_id, sub_lot, receipt_lot, receipt_date,
+     qty, remaining_qty, use_status, updated_at)
+SELECT DISTINCT oi.injection_id, l.id, r.id, COALESCE(l.warehouse_id, r.warehouse_id),
+       l.sub_lot, r.receipt_lot, r.date, l.qty, l.qty - l.used_qty, l.use_status, now()
+  FROM {InjectionReceiptLine._meta.db_table} l
+  JOIN {InjectionReceipt._meta.db_table} r ON r.id = l.receipt_id
+  JOIN {InjectionOrderItem._meta.db_table} oi ON oi.order_id = r.order_id
+ WHERE r.is_active AND NOT r.is_deleted
+   AND COALESCE(l.warehouse_id, r.warehouse_id) IS NOT NULL {{scope}}
+"""
+
+
+def refresh_injection_lot_index(*, line_ids=None, receipt_ids=None) -> int:
+    """
+    지정 라인/전표의 색인 행을 DELETE → INSERT ... SELECT 로 다시 계산(각 1문장).
+    반환: 새로 채운 행 수
+    """
+    line_ids = sorted({int(x) for x in (line_ids or ())})
+    receipt_ids = sorted({int(x) for x in (receipt_ids or ())})
+    if not line_ids and not receipt_ids:
+        return 0
+
+    cond, scope, params = Q(), [], {}
+    if line_ids:
+        cond |= Q(line_id__in=line_ids)
+        scope.append("l.id = ANY(%(line_ids)s)")
+        params["line_ids"] = line_ids
+    if receipt_ids:
+        cond |= Q(receipt_id__in=receipt_ids)
+        scope.append("l.receipt_id = ANY(%(receipt_ids)s)")
+        params["receipt_ids"] = receipt_ids
+
+    with transaction.atomic():
+        InjectionLotIndex.objects.filter(cond).delete()
+        with connection.cursor() as cur:
+            cur.execute(_LOT_INDEX_SQL.format(scope=f"AND ({' OR '.join(scope)})"), params)
+            return cur.rowcount
+
+
+@transaction.atomic
+def rebuild_injection_lot_index() -> int:
+    """색인 테이블을 비우고 입고 라인 전체로 다시 채운다. 반환: 행 수"""
+    with connection.cursor() as cur:
+        cur.execute(f"TRUNCATE {_LOT_INDEX_T}")
+        cur.execute(_LOT_INDEX_SQL.format(scope=""))
+        return cur.rowcount
+
+
 # ======================================================================
 # CHEM: 라인 단위 사용/반납/조정
 # ======================================================================
@@ -221,6 +390,7 @@ def consume_chem_line(
     # 라인 반영
     line.used_qty = (cur_used + qty).quantize(Decimal("0.001"))
     line.save(update_fields=["used_qty", "use_status"])
+    apply_stock_deltas([_line_stock_row(line, receipt, -qty)])
 
     # 헤더 동기화
     sum_qty, sum_used, hdr_status = _sync_unified_header_from_lines(receipt.id)
@@ -281,6 +451,7 @@ def return_chem_line(
     if line.used_qty < _ZERO:
         line.used_qty = _ZERO
     line.save(update_fields=["used_qty", "use_status"])
+    apply_stock_deltas([_line_stock_row(line, receipt, cur_used - line.used_qty)])
 
     # 헤더 동기화
     sum_qty, sum_used, hdr_status = _sync_unified_header_from_lines(receipt.id)
@@ -339,6 +510,7 @@ def adjust_chem_line(
     # 라인 반영
     line.used_qty = new_used
     line.save(update_fields=["used_qty", "use_status"])
+    apply_stock_deltas([_line_stock_row(line, receipt, -delta)])
 
     # 헤더 동기화
     sum_qty, sum_used, hdr_status = _sync_unified_header_from_lines(receipt.id)
@@ -393,6 +565,7 @@ def consume_chem_fifo(
 
     remain = qty_total
     moved: List[Tuple[int, Decimal]] = []
+    stock_rows: List[tuple] = []
     idx = 0
 
     for line in lines:
@@ -429,10 +602,13 @@ def consume_chem_fifo(
         # 라인 반영
         line.used_qty = (_dec(line.used_qty) + take).quantize(Decimal("0.001"))
         line.save(update_fields=["used_qty", "use_status"])
+        stock_rows.append(_line_stock_row(line, receipt, -take))
 
         remain -= take
         moved.append((line.id, take))
 
+    apply_stock_deltas(stock_rows)
+
     # 헤더 동기화
     sum_qty, sum_used, hdr_status = _sync_unified_header_from_lines(receipt.id)
 
@@ -447,6 +623,174 @@ def consume_chem_fifo(
     }
 
 
+# ======================================================================
+# CHEM: 품목 단위 FEFO 소비(여러 입고 전표/서브 LOT 에 걸친 총량 소비)
+# ======================================================================
+
+def _sync_unified_headers_bulk(receipt_ids) -> Dict[int, Tuple[Decimal, Decimal, str]]:
+    """
+    여러 CHEM 헤더를 라인 합계로 한 번에 동기화.
+    - 헤더 잠금(id 순) 1회 + 그룹 집계 1회 + bulk_update 1회
+    - 반환: {receipt_id: (sum_qty, sum_used, use_status)}
+    """
+    receipt_ids = sorted(set(receipt_ids))
+    if not receipt_ids:
+        return {}
+    headers = list(
+        UnifiedReceipt.objects
+        .select_for_update()
+        .filter(id__in=receipt_ids)
+        .order_by("id")
+    )
+    agg = {
+        row["receipt_id"]: row
+        for row in (
+            UnifiedReceiptLine.objects
+            .filter(receipt_id__in=receipt_ids)
+            .values("receipt_id")
+            .annotate(sum_qty=Sum("qty"), sum_used=Sum("used_qty"))
+        )
+    }
+    result: Dict[int, Tuple[Decimal, Decimal, str]] = {}
+    for rc in headers:
+        row = agg.get(rc.id, {})
+        sum_qty = _dec(row.get("sum_qty"))
+        sum_used = min(max(_dec(row.get("sum_used")), _ZERO), sum_qty)
+        rc.qty = sum_qty
+        rc.used_qty = sum_used
+        rc._refresh_use_status()
+        result[rc.id] = (sum_qty, sum_used, rc.use_status)
+    UnifiedReceipt.objects.bulk_update(headers, ["qty", "used_qty", "use_status"])
+    return result
+
+
+# 자동 소비 멱등키: 라인별 이력 transaction_uid = {base}:{n} (컬럼 max_length 안에 들어가야 함)
+CONSUME_MAX_LINES = 9999
+CONSUME_UID_MAX_LEN = (
+    UnifiedUsage._meta.get_field("transaction_uid").max_length - len(f":{CONSUME_MAX_LINES}")
+)
+
+
+@transaction.atomic
+def consume_chem_item(
+    item_ct_id: int,
+    item_id: int,
+    warehouse_id: int,
+    qty_total,
+    *,
+    user,
+    base_transaction_uid: str,
+    ref_type: str = "",
+    ref_id: str = "",
+    note: str = "",
+) -> Dict:
+    """
+    CHEM: 품목 + 창고 기준 자동 소비(FEFO)
+    - 후보: 해당 품목의 미완료 서브 LOT 중 현재 창고(라인 창고, 없으면 헤더 창고)가 warehouse_id 인 것
+    - 순서: 유효기간 빠른 순(없으면 맨 뒤) → 입고일 → 전표 → sub_seq
+    - 후보 라인은 SELECT … FOR UPDATE SKIP LOCKED 1회로 잠금(다른 작업이 잡고 있는 라인은 건너뜀)
+    - 사용 이력 bulk_create, 라인 bulk_update, 헤더는 그룹 집계 1회로 동기화
+    - txid는 base_transaction_uid:{증분}, 같은 base 로 재요청하면 거부
+      (성공한 요청은 항상 :1 을 남기므로 그 키 하나만 정확히 조회)
+    - 잔여가 모자라도 다른 작업이 잠근 라인까지 치면 충분하면 code="busy" (잠시 후 재시도)
+    """
+    qty_total = _coerce_qty(qty_total)
+    if len(base_transaction_uid) > CONSUME_UID_MAX_LEN:
+        raise ValidationError(f"transaction_uid 는 {CONSUME_UID_MAX_LEN}자 이하여야 합니다.")
+
+    if UnifiedUsage.objects.filter(transaction_uid=f"{base_transaction_uid}:1").exists():
+        raise ValidationError("이미 처리된 요청입니다(transaction_uid 중복).")
+
+    candidates = (
+        UnifiedReceiptLine.objects
+        .filter(
+            receipt__category="CHEM",
+            receipt__item_ct_id=item_ct_id,
+            receipt__item_id=item_id,
+            receipt__is_active=True,
+            receipt__is_deleted=False,
+            used_qty__lt=F("qty"),
+        )
+        .filter(
+            Q(warehouse_id=warehouse_id)
+            | Q(warehouse__isnull=True, receipt__warehouse_id=warehouse_id)
+        )
+        .order_by(
+            F("expiry_date").asc(nulls_last=True),
+            "receipt__date", "receipt_id", "sub_seq", "id",
+        )
+    )
+    lines = list(
+        candidates
+        .select_for_update(skip_locked=True, of=("self",))
+        .select_related("receipt")
+    )
+    total_avail = sum((_dec(l.qty) - _dec(l.used_qty) for l in lines), _ZERO)
+    if qty_total > total_avail:
+        # SKIP LOCKED 로 빠진 라인 포함(잠금 없이) 잔여 — 충분하면 재고 부족이 아니라 잠금 경합
+        all_avail = _dec(candidates.order_by().aggregate(s=Sum(F("qty") - F("used_qty")))["s"])
+        if qty_total <= all_avail:
+            raise ValidationError(
+                "다른 작업이 같은 재고를 처리 중입니다. 잠시 후 다시 시도해 주세요.", code="busy",
+            )
+        raise ValidationError(f"요청 수량({qty_total})이 창고 잔여({total_avail})를 초과합니다.")
+
+    remain = qty_total
+    now = timezone.now()
+    usages: List[UnifiedUsage] = []
+    touched: List[UnifiedReceiptLine] = []
+    stock_rows: List[tuple] = []
+
+    for line in lines:
+        if remain <= _ZERO:
+            break
+        if len(usages) >= CONSUME_MAX_LINES:
+            raise ValidationError(f"한 번에 최대 {CONSUME_MAX_LINES}개 서브 LOT 까지 소비할 수 있습니다.")
+        take = min(_dec(line.qty) - _dec(line.used_qty), remain)
+
+        usages.append(UnifiedUsage(
+            receipt_id=line.receipt_id,
+            line=line,
+            action=UnifiedUsage.Action.CONSUME,
+            qty_change=take,
+            occurred_at=now,
+            recorded_by=user,
+            ref_type=ref_type or "",
+            ref_id=ref_id or "",
+            note=note or "",
+            transaction_uid=f"{base_transaction_uid}:{len(usages) + 1}",
+        ))
+        line.used_qty = (_dec(line.used_qty) + take).quantize(Decimal("0.001"))
+        line.use_status = _status_by(_dec(line.qty), line.used_qty)
+        touched.append(line)
+        stock_rows.append(_line_stock_row(line, line.receipt, -take))
+        remain -= take
+
+    try:
+        UnifiedUsage.objects.bulk_create(usages)
+    except IntegrityError:
+        raise ValidationError("이미 처리된 요청입니다(transaction_uid 중복).")
+    UnifiedReceiptLine.objects.bulk_update(touched, ["used_qty", "use_status"])
+    apply_stock_deltas(stock_rows)
+
+    headers = _sync_unified_headers_bulk(l.receipt_id for l in touched)
+
+    return {
+        "ok": True,
+        "filled": [(l.id, l.sub_lot, str(u.qty_change)) for l, u in zip(touched, usages)],
+        "receipts": [
+            {
+                "receipt_id": rid,
+                "receipt_qty": str(q),
+                "receipt_used_qty": str(u),
+                "receipt_status": st,
+            }
+            for rid, (q, u, st) in headers.items()
+        ],
+        "remain": str(remain),
+    }
+
+
 # ======================================================================
 # NF/SUP: 헤더 단위 사용/반납/조정
 #  - 라인 개념 없음. UnifiedReceipt 자체 used_qty만 관리
@@ -494,6 +838,7 @@ def consume_unified_header(
 
     rc.used_qty = (cur_used + qty).quantize(Decimal("0.001"))
     rc.save(update_fields=["used_qty", "use_status"])
+    apply_stock_deltas([_header_stock_row(rc, -qty)])
 
     return {
         "ok": True,
@@ -540,6 +885,7 @@ def return_unified_header(
     if rc.used_qty < _ZERO:
         rc.used_qty = _ZERO
     rc.save(update_fields=["used_qty", "use_status"])
+    apply_stock_deltas([_header_stock_row(rc, cur_used - rc.used_qty)])
 
     return {
         "ok": True,
@@ -585,6 +931,7 @@ def adjust_unified_header(
 
     rc.used_qty = new_used
     rc.save(update_fields=["used_qty", "use_status"])
+    apply_stock_deltas([_header_stock_row(rc, -delta)])
 
     return {
         "ok": True,
@@ -594,6 +941,210 @@ def adjust_unified_header(
         "receipt_status": rc.use_status,
     }
 
+# ======================================================================
+# 일괄 사용 이력 반영(교대 마감 일괄 입력 등)
+#  - 멱등키 IN 조회 1회, 라인/헤더 잠금 id 순 1회씩, 이력 bulk_create 1회
+#  - 작업별 결과를 돌려주며, 검증 실패한 작업만 건너뛰고 나머지는 반영
+# ======================================================================
+
+USAGE_BATCH_MAX = 500
+
+_BATCH_ACTIONS = {
+    "use": UnifiedUsage.Action.CONSUME,
+    "consume": UnifiedUsage.Action.CONSUME,
+    "return": UnifiedUsage.Action.RETURN,
+    "adjust": UnifiedUsage.Action.ADJUST,
+}
+
+
+def _parse_batch_op(op: Dict) -> Dict:
+    """작업 1건 정규화. line_id(CHEM) 또는 receipt_id(NF/SUP) 중 하나."""
+    txid = str(op.get("transaction_uid") or "").strip()
+    if not txid:
+        raise ValidationError("transaction_uid 는 필수입니다.")
+    action = _BATCH_ACTIONS.get(str(op.get("action") or "").strip().lower())
+    if action is None:
+        raise ValidationError("action 은 use/return/adjust 중 하나여야 합니다.")
+    if action == UnifiedUsage.Action.ADJUST:
+        qty = _coerce_delta(op.get("qty"))
+    else:
+        qty = _coerce_qty(op.get("qty"))
+
+    line_id = op.get("line_id")
+    receipt_id = op.get("receipt_id")
+    if line_id not in (None, ""):
+        target = ("line", int(line_id))
+    elif receipt_id not in (None, ""):
+        target = ("receipt", int(receipt_id))
+    else:
+        raise ValidationError("line_id 또는 receipt_id 가 필요합니다.")
+
+    return {
+        "txid": txid,
+        "action": action,
+        "qty": qty,
+        "target": target,
+        "ref_type": str(op.get("ref_type") or ""),
+        "ref_id": str(op.get("ref_id") or ""),
+        "note": str(op.get("note") or ""),
+    }
+
+
+def _used_after(action: str, cur_used: Decimal, qty: Decimal, cap: Decimal) -> Tuple[Decimal, Decimal]:
+    """(새 used_qty, 이력 qty_change) — 단건 서비스와 같은 범위 검증."""
+    if action == UnifiedUsage.Action.CONSUME:
+        if qty > cap - cur_used:
+            raise ValidationError(f"요청 수량({qty})이 잔여 가능({cap - cur_used})을 초과합니다.")
+        return (cur_used + qty).quantize(Decimal("0.001")), qty
+    if action == UnifiedUsage.Action.RETURN:
+        if qty > cur_used:
+            raise ValidationError(f"반납 수량({qty})이 현재 사용량({cur_used})을 초과합니다.")
+        return (cur_used - qty).quantize(Decimal("0.001")), qty * Decimal("-1")
+    new_used = (cur_used + qty).quantize(Decimal("0.001"))
+    if new_used < _ZERO or new_used > cap:
+        raise ValidationError("조정 결과가 허용 범위를 벗어납니다.")
+    return new_used, qty
+
+
+@transaction.atomic
+def apply_usage_batch(operations: List[Dict], *, user) -> Dict:
+    """
+    사용/반납/조정 여러 건을 한 번에 반영.
+    operations: [{line_id | receipt_id, action, qty, transaction_uid, ref_type?, ref_id?, note?}, ...]
+    - 같은 라인/헤더에 대한 작업은 입력 순서대로 누적 적용
+    - results[i].status: applied | duplicate(이미 처리된 멱등키) | error
+    """
+    if len(operations) > USAGE_BATCH_MAX:
+        raise ValidationError(f"한 번에 최대 {USAGE_BATCH_MAX}건까지 처리할 수 있습니다.")
+
+    results: List[Dict] = [{"index": i, "ok": False} for i in range(len(operations))]
+    parsed: Dict[int, Dict] = {}
+    for i, op in enumerate(operations):
+        results[i]["transaction_uid"] = str((op or {}).get("transaction_uid") or "")
+        try:
+            parsed[i] = _parse_batch_op(op or {})
+        except (ValidationError, TypeError, ValueError) as e:
+            msgs = getattr(e, "messages", None) or [str(e)]
+            results[i].update(status="error", msg="; ".join(msgs))
+
+    # 1) 멱등키: 기존 이력 IN 조회 1회 + 배치 내 중복
+    existing = set(
+        UnifiedUsage.objects
+        .filter(transaction_uid__in=[p["txid"] for p in parsed.values()])
+        .values_list("transaction_uid", flat=True)
+    )
+    seen = set()
+    for i in list(parsed):
+        txid = parsed[i]["txid"]
+        if txid in existing or txid in seen:
+            results[i].update(status="duplicate", msg="이미 처리된 요청입니다(transaction_uid 중복).")
+            del parsed[i]
+        else:
+            seen.add(txid)
+
+    # 2) 잠금: 라인 → 헤더, 각각 id 순 1회
+    line_ids = sorted({p["target"][1] for p in parsed.values() if p["target"][0] == "line"})
+    header_ids = sorted({p["target"][1] for p in parsed.values() if p["target"][0] == "receipt"})
+    lines = {
+        ln.id: ln
+        for ln in (
+            UnifiedReceiptLine.objects
+            .select_for_update(of=("self",))
+            .select_related("receipt")
+            .filter(id__in=line_ids)
+            .order_by("id")
+        )
+    }
+    headers = {
+        rc.id: rc
+        for rc in UnifiedReceipt.objects.select_for_update().filter(id__in=header_ids).order_by("id")
+    }
+
+    # 3) 메모리에서 순서대로 적용
+    now = timezone.now()
+    usages: List[UnifiedUsage] = []
+    stock_rows: List[tuple] = []
+    dirty_lines: Dict[int, UnifiedReceiptLine] = {}
+    dirty_headers: Dict[int, UnifiedReceipt] = {}
+
+    for i in sorted(parsed):
+        p = parsed[i]
+        kind, target_id = p["target"]
+        try:
+            if kind == "line":
+                line = lines.get(target_id)
+                if line is None or line.receipt.is_deleted:
+                    raise ValidationError("서브 LOT 을 찾을 수 없습니다.")
+                receipt = line.receipt
+                if receipt.category != "CHEM":
+                    raise ValidationError("CHEM 항목만 라인 단위 처리가 가능합니다.")
+            else:
+                line = None
+                receipt = headers.get(target_id)
+                if receipt is None or receipt.is_deleted:
+                    raise ValidationError("입고 전표를 찾을 수 없습니다.")
+                if receipt.category not in ("NF", "SUP"):
+                    raise ValidationError("NF/SUP 항목만 헤더 단위 처리가 가능합니다.")
+            if not ensure_vendor_scope(user, receipt.vendor_id):
+                raise ValidationError("권한 없음")
+
+            obj = line or receipt
+            cur_used = _dec(obj.used_qty)
+            new_used, qty_change = _used_after(p["action"], cur_used, p["qty"], _dec(obj.qty))
+        except ValidationError as e:
+            results[i].update(status="error", msg="; ".join(e.messages))
+            continue
+
+        obj.used_qty = new_used
+        obj._refresh_use_status()
+        if line is not None:
+            dirty_lines[line.id] = line
+            stock_rows.append(_line_stock_row(line, receipt, cur_used - new_used))
+        else:
+            dirty_headers[receipt.id] = receipt
+            stock_rows.append(_header_stock_row(receipt, cur_used - new_used))
+
+        usages.append(UnifiedUsage(
+            receipt=receipt,
+            line=line,
+            action=p["action"],
+            qty_change=qty_change,
+            occurred_at=now,
+            recorded_by=user,
+            ref_type=p["ref_type"],
+            ref_id=p["ref_id"],
+            note=p["note"],
+            transaction_uid=p["txid"],
+        ))
+        results[i].update(
+            ok=True,
+            status="applied",
+            line_id=line.id if line else None,
+            receipt_id=receipt.id,
+            used_qty=str(new_used),
+            use_status=obj.use_status,
+        )
+
+    # 4) 일괄 쓰기
+    try:
+        UnifiedUsage.objects.bulk_create(usages)
+    except IntegrityError:
+        # 잠금 이후 다른 요청이 같은 멱등키로 먼저 커밋한 경우
+        raise ValidationError("이미 처리된 요청이 포함되어 있습니다(transaction_uid 중복).")
+    if dirty_lines:
+        UnifiedReceiptLine.objects.bulk_update(list(dirty_lines.values()), ["used_qty", "use_status"])
+    if dirty_headers:
+        UnifiedReceipt.objects.bulk_update(list(dirty_headers.values()), ["used_qty", "use_status"])
+    apply_stock_deltas(stock_rows)
+    _sync_unified_headers_bulk(ln.receipt_id for ln in dirty_lines.values())
+
+    return {
+        "ok": True,
+        "applied": len(usages),
+        "results": results,
+    }
+
+
 # ======================================================================
 # (선택) 이동/창고 변경 보조 함수가 필요하면 아래에 추가
 #  - CHEM 라인 이동: line.warehouse 변경 + 헤더 동기화
@@ -88,6 +88,9 @@ urlpatterns = [
     path("returns/", uni.return_list, name="uni_return_list"),
     path("returns/add", uni.return_add, name="uni_return_add"),
 
+    # 창고별 현재고 API
+    path("stock/api/", uni.stock_api, name="uni_stock_api"),
+
     # 사출 화면 조각
     path(
         "injection/issues/<int:receipt_id>/fragment/",
@@ -101,6 +104,8 @@ urlpatterns = [
     # 사용 처리 API
     path("receipts/usage/line/",    uni.usage_line_apply,    name="uni_usage_line_apply"),
     path("receipts/usage/receipt/", uni.usage_receipt_apply, name="uni_usage_receipt_apply"),
+    path("receipts/usage/item/",    uni.usage_item_consume,  name="uni_usage_item_consume"),
+    path("receipts/usage/batch/",   uni.usage_batch_apply,   name="uni_usage_batch_apply"),
 
     path(
         "receipts/lines/<int:line_id>/edit/", uni.receipt_line_edit, name="uni_receipt_line_edit",
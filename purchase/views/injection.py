@@ -1,11 +1,9 @@
 from __future__ import annotations
 
 # ── Standard Library ─────────────────────────────────────────────────────────
-import csv
 import json
 import logging
 from datetime import date, datetime, timedelta
-from io import StringIO
 from typing import Dict, Optional
 from uuid import uuid4
 from urllib.parse import urlencode
@@ -19,7 +17,7 @@ from django.db import transaction, IntegrityError
 from django.db.models import Sum, Max, OuterRef, Subquery, Case, When, Value, CharField, Exists, Q
 from django.db.models.functions import TruncDate
 from django.http import (
-    HttpResponse, JsonResponse, HttpResponseBadRequest,
+    JsonResponse, HttpResponseBadRequest,
     HttpResponseForbidden, HttpResponseRedirect,
 )
 from django.shortcuts import get_object_or_404, redirect, render
@@ -30,9 +28,14 @@ from django.views.decorators.http import require_GET, require_http_methods, requ
 
 # ── Domain Models (Apps) ─────────────────────────────────────────────────────
 from master.models import Warehouse
-from injectionorder.models import InjectionOrder, FlowStatus
+from injectionorder.models import InjectionOrder, InjectionOrderItem, FlowStatus
 from partnerorder.models import PartnerShipmentGroup, PartnerShipmentLine
 from purchase.models import InjectionReceipt, InjectionIssue, InjectionReceiptLine
+from purchase.services import refresh_injection_lot_index
+from utils.export import stream_queryset_csv
+from utils.lot import next_lot, reserve_lot_tree, reserve_lots, sub_lot_code
+from mis.lineage import receipt_edges, remove_edges, set_edges
+from mis.models import LotType
 from quality.inspections.models import (
     IncomingInspection, IncomingInspectionDetail, QCStatus,
 )
@@ -110,20 +113,8 @@ def _parse_payload(request) -> Dict:
 
 
 def _next_receipt_lot(d: date) -> str:
-    """헤더 LOT: IN + YYYYMMDD + 3자리"""
-    prefix = d.strftime("IN%Y%m%d")
-    last = (
-        InjectionReceipt.objects
-        .filter(receipt_lot__startswith=prefix)
-        .order_by("-id")
-        .values_list("receipt_lot", flat=True)
-        .first()
-    )
-    if last and len(last) > len(prefix) and last[len(prefix):].isdigit():
-        seq = int(last[len(prefix):]) + 1
-    else:
-        seq = 1
-    return f"{prefix}{seq:03d}"
+    """헤더 LOT: IN + YYYYMMDD + 3자리 (카운터 블록 발급)"""
+    return next_lot("IN", d)
 
 
 def _get_default_wh() -> Optional[Warehouse]:
@@ -153,18 +144,16 @@ def _create_issue_and_number(
     receipt, remark="", receipt_line=None, batch_id=None
 ):
     """
-    1) 임시번호로 INSERT (UNIQUE 회피)
-    2) 최종번호로 UPDATE (중복 시 -01, -02 ... 접미사 부여)
+    이동 전표 생성. 번호는 카운터 블록에서 발급(ISYYYYMMDD + 6자리)하므로
+    임시번호 INSERT / 중복 탐색 없이 한 번에 저장한다.
     """
     if not from_wh or not to_wh:
         raise ValueError("from_warehouse, to_warehouse는 필수입니다.")
     if getattr(from_wh, "id", None) == getattr(to_wh, "id", None):
         raise ValueError("같은 창고로는 이동할 수 없습니다.")
 
-    # 1) INSERT with TMP번호 (정확히 20자)
-    tmp_no = "TMP" + uuid4().hex[:17]  # 3 + 17 = 20
-    issue = InjectionIssue.objects.create(
-        receipt_lot=tmp_no,
+    return InjectionIssue.objects.create(
+        receipt_lot=_next_issue_lot(move_date),
         date=move_date,
         qty=qty,
         remark=remark,
@@ -177,62 +166,10 @@ def _create_issue_and_number(
         is_used_at_issue=False,
     )
 
-    # 2) 최종번호 산출: ISYYYYMMDD + 6자리 receipt.id
-    base_no = f"IS{move_date.strftime('%Y%m%d')}{receipt.id:06d}"  # 16자
-    final_no = base_no
-
-    # 이미 같은 번호가 있으면 -01, -02 ...로 붙여서 20자 내 보장
-    if InjectionIssue.objects.filter(receipt_lot=final_no).exclude(id=issue.id).exists():
-        # 기존 suffix 확인
-        siblings = (
-            InjectionIssue.objects
-            .filter(receipt_lot__startswith=base_no)
-            .exclude(id=issue.id)
-            .values_list("receipt_lot", flat=True)
-        )
-        # 존재하는 suffix 수집
-        used = set()
-        for s in siblings:
-            if len(s) > len(base_no) and s.startswith(base_no + "-"):
-                suf = s[len(base_no) + 1:]  # '-' 뒤
-                if suf.isdigit():
-                    used.add(int(suf))
-        # 다음 번호 찾기 (01부터)
-        n = 1
-        while True:
-            cand = f"{base_no}-{n:02d}"  # 18~19자
-            if len(cand) > 20:
-                # 100 이상이면 3자리 시도(최대 20자까지 허용)
-                cand = f"{base_no}-{n}"
-                if len(cand) > 20:
-                    raise ValueError("이슈 번호가 20자를 초과합니다.")
-            if n not in used and not InjectionIssue.objects.filter(receipt_lot=cand).exclude(id=issue.id).exists():
-                final_no = cand
-                break
-            n += 1
-
-    # UPDATE 최종번호
-    issue.receipt_lot = final_no
-    issue.save(update_fields=["receipt_lot"])
-    return issue
 
 def _next_issue_lot(move_date):
-    """
-    (예비) ISYYYYMMDD + 6자리 시퀀스.
-    같은 날짜 prefix의 최댓값을 잡고 +1. (트랜잭션 내 select_for_update로 충돌 완화)
-    """
-    prefix = f"IS{move_date.strftime('%Y%m%d')}"
-    with transaction.atomic():
-        last = (
-            InjectionIssue.objects
-            .select_for_update()
-            .filter(receipt_lot__startswith=prefix)
-            .order_by('-receipt_lot')
-            .values_list('receipt_lot', flat=True)
-            .first()
-        )
-        seq = int(last[-6:]) + 1 if last else 1
-    return f"{prefix}{seq:06d}"
+    """이동 LOT: IS + YYYYMMDD + 6자리 (카운터 블록 발급)"""
+    return next_lot("IS", move_date)
 
 
 def _sync_receipt_header_warehouse(receipt: InjectionReceipt):
@@ -356,13 +293,41 @@ _latest_receipt_lot = (
     .values("receipt_lot")[:1]
 )
 
+# 대표 품명(첫 품목) — 엑셀/백그라운드 내보내기용
+_first_item_name = (
+    InjectionOrderItem.objects
+    .filter(order=OuterRef("pk"))
+    .order_by("id")
+    .values("injection__name")[:1]
+)
+
+RECEIPT_EXPORT_HEADER = [
+    "발주LOT", "발주처", "품명", "수량", "발주일", "배송일", "검사일", "검사결과", "상태", "입고헤더LOT",
+]
+
+
+def receipt_export_row(o):
+    """first_item_name 이 annotate 된 주문 → 엑셀 1행"""
+    return [
+        o.order_lot or "",
+        getattr(o.vendor, "name", "") or "",
+        o.first_item_name or "-",
+        (o.qty_sum or 0),
+        o.order_date.strftime("%Y-%m-%d") if o.order_date else "",
+        o.shipping_date.strftime("%Y-%m-%d") if o.shipping_date else "",
+        o.latest_insp_date.strftime("%Y-%m-%d") if o.latest_insp_date else "",
+        o.insp_status_display or "-",
+        o.status_display or "-",
+        o.latest_receipt_lot or "",
+    ]
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 공통: 주문 리스트 쿼리 + 필터 + 기본 날짜(오늘-7 ~ 오늘)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _build_receipt_order_queryset(request, for_export: bool = False):
+def _build_receipt_order_queryset(params, for_export: bool = False):
     """
-    리스트/엑셀 공통 쿼리 구성.
+    리스트/엑셀/백그라운드 내보내기 공통 쿼리 구성. params: request.GET 또는 저장된 QueryDict
     - 기본 필터: 진행상태 PRT/RCV & dlt_yn='N'
     - 검색 파라미터 적용
     - 날짜 필터 기본값: 제공 안 되었을 때 '오늘-7일 ~ 오늘'
@@ -400,13 +365,13 @@ def _build_receipt_order_queryset(request, for_export: bool = False):
     )
 
     # 파라미터
-    vendor          = (request.GET.get("vendor") or "").strip()
-    product         = (request.GET.get("product") or "").strip()
-    order_date_from = (request.GET.get("order_date_from") or "").strip()
-    order_date_to   = (request.GET.get("order_date_to") or "").strip()
-    insp_date_from  = (request.GET.get("insp_date_from") or "").strip()
-    insp_date_to    = (request.GET.get("insp_date_to") or "").strip()
-    status          = (request.GET.get("status") or "").strip()
+    vendor          = (params.get("vendor") or "").strip()
+    product         = (params.get("product") or "").strip()
+    order_date_from = (params.get("order_date_from") or "").strip()
+    order_date_to   = (params.get("order_date_to") or "").strip()
+    insp_date_from  = (params.get("insp_date_from") or "").strip()
+    insp_date_to    = (params.get("insp_date_to") or "").strip()
+    status          = (params.get("status") or "").strip()
 
     # 기본 날짜(오늘-7 ~ 오늘) 적용: 사용자가 아무것도 안 준 경우만
     odf_default, odt_default = _date_7days_window()
@@ -461,7 +426,7 @@ def receipt_list(request):
     사출 입고 목록(주문단위)
     - 기존 로직 유지 + 페이징 + 기본 날짜 필터(오늘-7 ~ 오늘)
     """
-    qs, filter_ctx = _build_receipt_order_queryset(request)
+    qs, filter_ctx = _build_receipt_order_queryset(request.GET)
 
     paginator = Paginator(qs, PAGE_SIZE)
     page_number = request.GET.get("page") or 1
@@ -497,9 +462,9 @@ inj_receipt_list = receipt_list
 @require_GET
 def inj_receipt_export(request):
     """
-    사출 입고 목록 CSV 내보내기
+    사출 입고 목록 CSV 내보내기(스트리밍)
     - 인코딩: UTF-8 with BOM (Excel 한글 깨짐 방지)
-    - prefetch_related() 이후 iterator() 사용 시 chunk_size 필수
+    - 대표 품명은 서브쿼리 annotate(행당 추가 쿼리 없음)
     """
     has_receipt = Exists(
         InjectionReceipt.objects.filter(order=OuterRef("pk"), is_deleted=False)
@@ -509,9 +474,9 @@ def inj_receipt_export(request):
         InjectionOrder.objects
         .filter(flow_status__in=[FlowStatus.PRT, FlowStatus.RCV], dlt_yn="N")
         .select_related("vendor")
-        .prefetch_related("items")
         .annotate(
             qty_sum=Sum("items__quantity"),
+            first_item_name=Subquery(_first_item_name),
             latest_insp_status=Subquery(_latest_insp_status),
             latest_insp_date=Subquery(_latest_insp_date),
             latest_receipt_lot=Subquery(_latest_receipt_lot),
@@ -557,46 +522,12 @@ def inj_receipt_export(request):
     if status in ("입고대기", "입고완료"):
         qs = qs.filter(status_display=status)
 
-    # CSV 작성 (UTF-8 with BOM)
-    buffer = StringIO(newline="")
-    writer = csv.writer(buffer)
-    writer.writerow(["발주LOT", "발주처", "품명", "수량", "발주일", "배송일", "검사일", "검사결과", "상태", "입고헤더LOT"])
-
-    for o in qs.iterator(chunk_size=1000):
-        first = getattr(o, "items", None)
-        first = first.first() if first is not None else None
-        item_name = (
-            (getattr(getattr(first, "injection", None), "name", None) if first else None)
-            or getattr(getattr(o, "product", None), "name", None)
-            or getattr(o, "product_name", None)
-            or getattr(o, "item_name", None)
-            or "-"
-        )
-
-        writer.writerow([
-            o.order_lot or "",
-            getattr(o.vendor, "name", "") or "",
-            item_name,
-            (o.qty_sum or 0),
-            o.order_date.strftime("%Y-%m-%d") if o.order_date else "",
-            o.shipping_date.strftime("%Y-%m-%d") if o.shipping_date else "",
-            o.latest_insp_date.strftime("%Y-%m-%d") if o.latest_insp_date else "",
-            o.insp_status_display or "-",
-            o.status_display or "-",
-            o.latest_receipt_lot or "",
-        ])
-
-    csv_data = buffer.getvalue()
-    buffer.close()
-
-    bom = "\ufeff"  # BOM
-    filename = f"injection_receipts_{_today_local().strftime('%Y%m%d')}.csv"
-    resp = HttpResponse(
-        (bom + csv_data),
-        content_type="text/csv; charset=utf-8",
+    return stream_queryset_csv(
+        qs,
+        f"injection_receipts_{_today_local().strftime('%Y%m%d')}.csv",
+        RECEIPT_EXPORT_HEADER,
+        receipt_export_row,
     )
-    resp["Content-Disposition"] = f'attachment; filename="{filename}"; filename*=UTF-8\'\'{filename}'
-    return resp
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 입고 저장 (주문 단위 일괄)
@@ -654,7 +585,7 @@ def receipt_add(request, order_id: int | None = None):
         lot = _next_receipt_lot(rec_date)
 
         try:
-            InjectionReceipt.objects.create(
+            receipt = InjectionReceipt.objects.create(
                 order=order,
                 warehouse=wh,
                 receipt_lot=lot,
@@ -666,6 +597,7 @@ def receipt_add(request, order_id: int | None = None):
                 is_deleted=False,
                 order_lot_snapshot=order.order_lot,
             )
+            set_edges(receipt_edges(receipt))
             success += 1
         except Exception as e:
             logger.exception("입고 저장 실패 (order_id=%s, lot=%s) : %s", order.pk, lot, e)
@@ -905,6 +837,7 @@ def issue_add(request, receipt_id: int):
             if all_to_dest and receipt.warehouse_id != dest.id:
                 receipt.warehouse = dest
                 receipt.save(update_fields=["warehouse"])
+            refresh_injection_lot_index(line_ids=moved_ids)
 
             return JsonResponse({
                 "ok": True,
@@ -940,6 +873,7 @@ def issue_add(request, receipt_id: int):
         if receipt.warehouse_id != dest.id:
             receipt.warehouse = dest
             receipt.save(update_fields=["warehouse"])
+        refresh_injection_lot_index(receipt_ids=[receipt.id])
 
         total_qty = lines_qs.aggregate(total=Sum("qty"))["total"] or 0
 
@@ -959,6 +893,11 @@ def issue_add(request, receipt_id: int):
 
 @require_POST
 def issue_add_bulk(request):
+    """
+    선택한 입고 헤더 전체를 목적 창고로 일괄 이동(집합 처리)
+    - 헤더+라인 잠금 1문장 → 라인 UPDATE 1회 → 헤더 UPDATE 1회
+    - 이동 번호(IS)는 카운터에서 한 번에 확보, 전표는 같은 batch_id 로 bulk_create
+    """
     if not request.user.is_authenticated:
         return HttpResponseForbidden("로그인이 필요합니다.")
 
@@ -973,62 +912,97 @@ def issue_add_bulk(request):
     if not dest_wh_id:
         return HttpResponseBadRequest("이동할 창고를 선택하세요.")
 
+    try:
+        receipt_ids = list(dict.fromkeys(int(x) for x in ids))
+    except (TypeError, ValueError):
+        return HttpResponseBadRequest("이동 대상 id 형식이 올바르지 않습니다.")
+
     dest = Warehouse.objects.filter(id=dest_wh_id, is_deleted="N").first()
     if not dest:
         return HttpResponseBadRequest("이동할 창고가 존재하지 않습니다.")
 
-    results = []
     batch_id = _new_issue_batch_id()
 
-    for rid in ids:
-        with transaction.atomic():
-            receipt = (
-                InjectionReceipt.objects
-                .select_for_update()
-                .select_related("warehouse")
-                .filter(id=rid, is_active=True, is_deleted=False, is_used=False)
-                .first()
+    with transaction.atomic():
+        # 1) 헤더 + 라인 잠금(1문장, 헤더/라인 id 순)
+        rows = list(
+            InjectionReceiptLine.objects
+            .select_for_update(of=("self", "receipt"))
+            .filter(
+                receipt_id__in=receipt_ids,
+                receipt__is_active=True, receipt__is_deleted=False, receipt__is_used=False,
             )
-            if not receipt:
+            .order_by("receipt_id", "id")
+            .values_list("receipt_id", "warehouse_id", "qty", "receipt__warehouse_id")
+        )
+        by_receipt: dict[int, dict] = {}
+        for rid, wh_id, qty, hdr_wh_id in rows:
+            g = by_receipt.setdefault(rid, {"hdr_wh": hdr_wh_id, "qty": 0, "moved": 0, "src": set()})
+            g["qty"] += qty or 0
+            if wh_id != dest.id:
+                g["moved"] += 1
+                g["src"].add(wh_id or hdr_wh_id)
+
+        # 2) 결과/출발 창고 결정(메모리)
+        results = []
+        plans = []   # (receipt_id, from_wh_id, total_qty)
+        for rid in receipt_ids:
+            g = by_receipt.get(rid)
+            if g is None:
                 results.append({"id": rid, "ok": False, "msg": "입고 데이터 없음/사용불가"})
                 continue
-
-            lines_qs = InjectionReceiptLine.objects.select_for_update().filter(receipt_id=receipt.id)
-            movable_qs = lines_qs.exclude(warehouse_id=dest.id)
-            movable_cnt = movable_qs.count()
-            if movable_cnt == 0:
+            if g["moved"] == 0:
                 results.append({"id": rid, "ok": False, "msg": "이미 목적지"})
                 continue
-
-            # 출발 창고(from_wh) 결정
-            src_ids = set(lines_qs.values_list("warehouse_id", flat=True))
-            if len(src_ids) == 1:
-                only_src_id = next(iter(src_ids))
-                from_wh_for_issue = Warehouse.objects.filter(id=only_src_id).first() or receipt.warehouse
+            src = g["src"] - {None, dest.id}
+            if len(src) == 1:
+                from_wh_id = next(iter(src))
+            elif g["hdr_wh"] and g["hdr_wh"] != dest.id:
+                from_wh_id = g["hdr_wh"]
             else:
-                from_wh_for_issue = receipt.warehouse
+                from_wh_id = min(src) if src else None
+            if not from_wh_id:
+                results.append({"id": rid, "ok": False, "msg": "출발 창고를 확인할 수 없음"})
+                continue
+            plans.append((rid, from_wh_id, g["qty"]))
+            results.append({"id": rid, "ok": True, "moved": g["moved"]})
 
-            # 라인 이동
-            movable_qs.update(warehouse=dest)
+        if plans:
+            moved_rids = [rid for rid, _f, _q in plans]
 
-            # 헤더 동기화
-            if receipt.warehouse_id != dest.id:
-                receipt.warehouse = dest
-                receipt.save(update_fields=["warehouse"])
-
-            total_qty = lines_qs.aggregate(total=Sum("qty"))["total"] or 0
-            _create_issue_and_number(
-                receipt=receipt,
-                move_date=move_date,
-                qty=total_qty,
-                remark=remark,
-                from_wh=from_wh_for_issue,   # ✅ 보장
-                to_wh=dest,
-                user=request.user,
-                receipt_line=None,
-                batch_id=batch_id,
+            # 3) 라인/헤더 이동(UPDATE 각 1회)
+            (
+                InjectionReceiptLine.objects
+                .filter(receipt_id__in=moved_rids)
+                .exclude(warehouse_id=dest.id)
+                .update(warehouse=dest)
+            )
+            (
+                InjectionReceipt.objects
+                .filter(id__in=moved_rids)
+                .exclude(warehouse_id=dest.id)
+                .update(warehouse=dest)
             )
-            results.append({"id": rid, "ok": True, "moved": movable_cnt})
+            refresh_injection_lot_index(receipt_ids=moved_rids)
+
+            # 4) 이동 전표: 번호 일괄 확보 + bulk_create
+            issue_lots = reserve_lots("IS", len(plans), move_date)
+            InjectionIssue.objects.bulk_create([
+                InjectionIssue(
+                    receipt_lot=lot,
+                    date=move_date,
+                    qty=total_qty,
+                    remark=remark,
+                    created_by=request.user,
+                    receipt_id=rid,
+                    from_warehouse_id=from_wh_id,
+                    to_warehouse=dest,
+                    receipt_line=None,
+                    batch_id=batch_id,
+                    is_used_at_issue=False,
+                )
+                for lot, (rid, from_wh_id, total_qty) in zip(issue_lots, plans)
+            ])
 
     moved_total = sum(r.get("moved", 0) for r in results if r.get("ok"))
     return JsonResponse({"ok": True, "batch_id": batch_id, "moved_total": moved_total, "results": results})
@@ -1226,103 +1200,108 @@ def receipt_commit(request, order_id):
         messages.warning(request, "입고 가능한 PASS 라인이 없습니다.")
         return HttpResponseRedirect(reverse("purchase:inj_receipt_candidates", args=[order_id]))
 
-    created_headers = 0
-    reused_headers = 0
-    created_lines = 0
-    total_qty_all = 0
-    created_receipt_lots = []
-
+    # 이미 입고된 검사 라인 제외 (1쿼리)
+    existing_detail_ids = set(
+        InjectionReceiptLine.objects
+        .filter(detail_id__in=[d.id for dlist in groups.values() for d in dlist])
+        .values_list("detail_id", flat=True)
+    )
+    pending = {}
     for grp_id, dlist in groups.items():
-        grp_total = sum(int(d.qty) for d in dlist if d.qty and d.qty > 0)
-        if grp_total <= 0:
-            continue
-
-        # 헤더 재사용 시도
-        header = (
+        new_details = [d for d in dlist if d.id not in existing_detail_ids and d.qty and d.qty > 0]
+        if new_details:
+            pending[grp_id] = new_details
+
+    # 재사용 헤더 일괄 잠금 (1쿼리) — 그룹별 가장 먼저 만든 헤더
+    headers = {}
+    if pending:
+        reusable = (
             InjectionReceipt.objects
             .select_for_update(skip_locked=True)
             .filter(
                 order=order,
                 warehouse=target_wh,
                 date=receipt_date,
-                shipment_group_id=grp_id,
+                shipment_group_id__in=list(pending.keys()),
                 is_deleted=False,
             )
-            .first()
+            .order_by("id")
         )
+        for h in reusable:
+            headers.setdefault(h.shipment_group_id, h)
+    reused_headers = len(headers)
 
-        header_created = False
-        if header is None:
-            lot_date = receipt_date
-            receipt_lot = _next_receipt_lot(lot_date)
-
-            header = InjectionReceipt.objects.create(
-                order=order,
-                warehouse=target_wh,
-                date=receipt_date,
-                receipt_lot=receipt_lot,
-                qty=grp_total,
-                remark=remark,
-                shipment_group_id=grp_id,
-                created_by=user,
-            )
-            header_created = True
-            created_headers += 1
-            created_receipt_lots.append(receipt_lot)
-        else:
-            reused_headers += 1
-
-        existing_detail_ids = set(
+    # 재사용 헤더의 마지막 sub_seq (1쿼리)
+    last_seq = dict(
+        InjectionReceiptLine.objects
+        .filter(receipt_id__in=[h.pk for h in headers.values()])
+        .values("receipt_id")
+        .annotate(m=Max("sub_seq"))
+        .values_list("receipt_id", "m")
+    ) if headers else {}
+
+    # 신규 헤더 LOT + 서브 LOT 일괄 확보 (카운터 1회) → 헤더 bulk_create
+    new_grp_ids = [g for g in pending if g not in headers]
+    reserved = reserve_lot_tree("IN", [len(pending[g]) for g in new_grp_ids], receipt_date)
+    new_headers = [
+        InjectionReceipt(
+            order=order,
+            warehouse=target_wh,
+            date=receipt_date,
+            receipt_lot=header_lot,
+            qty=sum(int(d.qty) for d in pending[grp_id]),
+            remark=remark,
+            shipment_group_id=grp_id,
+            created_by=user,
+        )
+        for grp_id, (header_lot, _subs) in zip(new_grp_ids, reserved)
+    ]
+    if new_headers:
+        InjectionReceipt.objects.bulk_create(new_headers)
+    created_headers = len(new_headers)
+    created_receipt_lots = [h.receipt_lot for h in new_headers]
+
+    # 서브 LOT 라인 메모리 구성 → bulk_create (1쿼리)
+    new_lines = []
+    for grp_id, header, (_lot, subs) in zip(new_grp_ids, new_headers, reserved):
+        for d, (sub_seq, sub_lot) in zip(pending[grp_id], subs):
+            new_lines.append(InjectionReceiptLine(
+                receipt=header, sub_seq=sub_seq, sub_lot=sub_lot, qty=d.qty, detail=d,
+            ))
+    for grp_id, header in headers.items():
+        start = (last_seq.get(header.pk) or 0) + 1
+        for sub_seq, d in enumerate(pending[grp_id], start=start):
+            new_lines.append(InjectionReceiptLine(
+                receipt=header, sub_seq=sub_seq, sub_lot=sub_lot_code(header.receipt_lot, sub_seq),
+                qty=d.qty, detail=d,
+            ))
+    if new_lines:
+        InjectionReceiptLine.objects.bulk_create(new_lines)
+        refresh_injection_lot_index(line_ids=[ln.pk for ln in new_lines])
+    created_lines = len(new_lines)
+
+    # 재사용 헤더 qty 재계산 (UPDATE 1회)
+    if headers:
+        line_sum = (
             InjectionReceiptLine.objects
-            .filter(detail_id__in=[d.id for d in dlist])
-            .values_list("detail_id", flat=True)
+            .filter(receipt_id=OuterRef("pk"))
+            .values("receipt_id")
+            .annotate(s=Sum("qty"))
+            .values("s")
+        )
+        InjectionReceipt.objects.filter(pk__in=[h.pk for h in headers.values()]).update(
+            qty=Subquery(line_sum)
         )
 
-        # 서브 LOT 생성
-        for d in dlist:
-            if d.id in existing_detail_ids:
-                continue
-            if not d.qty or d.qty <= 0:
-                continue
-
-            header = (
-                InjectionReceipt.objects
-                .select_for_update(skip_locked=True)
-                .get(pk=header.pk)
-            )
-            max_seq = (
-                InjectionReceiptLine.objects
-                .filter(receipt=header)
-                .aggregate(m=Max("sub_seq"))["m"]
-            ) or 0
-            sub_seq = max_seq + 1
-            sub_lot = f"{header.receipt_lot}-{sub_seq:02d}"
-
-            InjectionReceiptLine.objects.create(
-                receipt=header,
-                sub_seq=sub_seq,
-                sub_lot=sub_lot,
-                qty=d.qty,
-                detail=d,
-            )
-            created_lines += 1
-
-        # 헤더 qty 재계산
-        new_total = (
-            InjectionReceiptLine.objects
-            .filter(receipt=header)
-            .aggregate(s=Sum("qty"))["s"]
-        ) or 0
-
-        if new_total <= 0:
-            if header_created:
-                header.delete()
-                created_headers -= 1
-                if header.receipt_lot in created_receipt_lots:
-                    created_receipt_lots.remove(header.receipt_lot)
-        else:
-            InjectionReceipt.objects.filter(pk=header.pk).update(qty=new_total)
-            total_qty_all += int(new_total)
+    # LOT 계보: OR → IN(헤더 수량), IN → IN-SS
+    edge_rows = []
+    for header in new_headers:
+        edge_rows += receipt_edges(header, [ln for ln in new_lines if ln.receipt is header])
+    for header in headers.values():
+        hlines = [ln for ln in new_lines if ln.receipt is header]
+        header.qty = (header.qty or 0) + sum(int(ln.qty) for ln in hlines)
+        edge_rows += receipt_edges(header, hlines)
+    set_edges(edge_rows)
 
     if created_headers or created_lines:
         msg = (
@@ -1373,23 +1352,36 @@ def receipt_revert(request, order_id):
         return redirect("purchase:inj_receipt_candidates", order_id=order_id)
 
     affected = {}
+    removed_edges = []
     count = 0
     for rl in lines:
         rid = rl.receipt_id
         affected.setdefault(rid, 0)
         affected[rid] += int(rl.qty or 0)
+        removed_edges.append(
+            (LotType.RECEIPT_HEADER, rl.receipt.receipt_lot, LotType.RECEIPT_LINE, rl.sub_lot)
+        )
         rl.delete()
         count += 1
 
     # 헤더 정리
+    kept_edges = []
     for rid in list(affected.keys()):
+        receipt = InjectionReceipt.objects.select_related("order").get(id=rid)
         remain = (InjectionReceiptLine.objects
                   .filter(receipt_id=rid)
                   .aggregate(s=Sum("qty"))["s"]) or 0
         if remain == 0:
-            InjectionReceipt.objects.filter(id=rid).delete()
+            removed_edges.append(receipt_edges(receipt)[0][:4])
+            receipt.delete()
         else:
             InjectionReceipt.objects.filter(id=rid).update(qty=remain)
+            receipt.qty = remain
+            kept_edges += receipt_edges(receipt)
+
+    # LOT 계보 정리
+    remove_edges(removed_edges)
+    set_edges(kept_edges)
 
     messages.success(request, f"입고취소 완료 · {count} 라인")
     return redirect("purchase:inj_receipt_candidates", order_id=order_id)
@@ -11,6 +11,7 @@ from django.templatetags.static import static
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.db import connection, transaction
 from django.db.models import (
@@ -19,7 +20,7 @@ from django.db.models import (
 from types import SimpleNamespace
 from django.db.models.functions import Coalesce
 from django.http import (
-    HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse,
+    HttpResponseBadRequest, HttpResponseForbidden, JsonResponse,
 )
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
@@ -40,6 +41,12 @@ from purchase.models import (
     UnifiedReturn,
     # 선택: 존재하는 경우에만 서브 LOT 지원
     UnifiedReceiptLine,
+    UnifiedStockBalance,
+)
+from utils.export import stream_queryset_csv
+from purchase.services import (
+    CONSUME_UID_MAX_LEN, USAGE_BATCH_MAX, apply_stock_deltas, apply_usage_batch, consume_chem_item,
+    receipt_stock_rows,
 )
 
 
@@ -212,21 +219,23 @@ def _cancel_code():
 # ╔══════════════════════════════════════════════════════════════════════════╗
 # ║                              발주 목록                                   ║
 # ╚══════════════════════════════════════════════════════════════════════════╝
-@require_http_methods(["GET"])
-def order_list(request):
-    cat = (request.GET.get("cat") or "CHEM").upper()
+def _order_item_queryset(params):
+    """
+    발주 목록/엑셀/백그라운드 내보내기 공통 필터 (params: request.GET 또는 저장된 QueryDict)
+    반환: (cat, 정렬 전 UnifiedOrderItem 쿼리셋)
+    """
+    cat = (params.get("cat") or "CHEM").upper()
 
-    today = date.today()
-    def_start, def_end = _month_defaults(today)
-    order_date_start = request.GET.get("order_date_start") or def_start
-    order_date_end = request.GET.get("order_date_end") or def_end
-    expected_date_start = request.GET.get("expected_date_start") or ""
-    expected_date_end = request.GET.get("expected_date_end") or ""
+    def_start, def_end = _month_defaults(date.today())
+    order_date_start = params.get("order_date_start") or def_start
+    order_date_end = params.get("order_date_end") or def_end
+    expected_date_start = params.get("expected_date_start") or ""
+    expected_date_end = params.get("expected_date_end") or ""
 
-    vendor_kw = (request.GET.get("vendor") or "").strip()
-    product_kw = (request.GET.get("product") or "").strip()
-    order_status_kw = (request.GET.get("order_status") or "").strip()
-    flow_status_kw = (request.GET.get("flow_status") or "").strip()
+    vendor_kw = (params.get("vendor") or "").strip()
+    product_kw = (params.get("product") or "").strip()
+    order_status_kw = (params.get("order_status") or "").strip()
+    flow_status_kw = (params.get("flow_status") or "").strip()
 
     qs = (
         UnifiedOrderItem.objects.select_related("order", "order__vendor")
@@ -248,10 +257,20 @@ def order_list(request):
         qs = qs.filter(order__order_status=order_status_kw)
     if flow_status_kw:
         qs = qs.filter(order__flow_status=flow_status_kw)
+    return cat, qs
+
+
+ORDER_ITEM_ORDERING = ("-order__order_date", "-order_id", "id")
+
+
+@require_http_methods(["GET"])
+def order_list(request):
+    cat, qs = _order_item_queryset(request.GET)
+    def_start, def_end = _month_defaults(date.today())
 
     qs = qs.annotate(total_price=F("amount"))
 
-    paginator = Paginator(qs.order_by("-order__order_date", "-order_id", "id"), 20)
+    paginator = Paginator(qs.order_by(*ORDER_ITEM_ORDERING), 20)
     page_obj = paginator.get_page(request.GET.get("page"))
 
     preserved = [
@@ -466,6 +485,7 @@ def receipt_add(request):
         spec_snapshot=item_spec,
         extra={},
     )
+    apply_stock_deltas([(cat, item_ct.id, item_id, wh.id, qty)])
 
     messages.success(request, f"[{cat}] 입고 등록 완료 · LOT={lot}")
     return redirect(f"{request.path}?cat={cat}")
@@ -474,6 +494,22 @@ def receipt_add(request):
 # ╔══════════════════════════════════════════════════════════════════════════╗
 # ║                           출고(창고이동) 목록 / 등록                      ║
 # ╚══════════════════════════════════════════════════════════════════════════╝
+ISSUE_PAGE_SIZE = 20
+
+
+def _parse_keyset_cursor(raw: str):
+    """'YYYY-MM-DD.id' → (date, id) / 형식 오류면 None"""
+    try:
+        d_str, id_str = (raw or "").split(".", 1)
+        return date.fromisoformat(d_str), int(id_str)
+    except ValueError:
+        return None
+
+
+def _keyset_cursor(h) -> str:
+    return f"{h.date.isoformat()}.{h.id}"
+
+
 @require_http_methods(["GET"])
 def issue_list(request):
     """
@@ -482,6 +518,10 @@ def issue_list(request):
     - NF/SUP: 헤더 LOT 단일 관리 → 서브라인이 없으면 헤더를 '가상 라인' 1개로 만들어 내려줌
     기본 현재창고:
       CHEM/NF -> sk_wh_6,  SUP -> sk_wh_3
+    조회:
+      - 품명/현재창고/사용상태/'CHEM 은 라인 필수' 조건은 모두 SQL(EXISTS)로 처리
+      - (date, id) 키셋 페이징: after=다음 페이지, before=이전 페이지 커서
+      - 서브라인은 현재 페이지 헤더 것만 조회
     """
     cat = _get_cat(request)
 
@@ -515,6 +555,17 @@ def issue_list(request):
         default_wh_code = ""
     effective_wh = wh_code_in or default_wh_code
 
+    # 서브라인 조건: 현재창고(라인 창고, 없으면 헤더 창고) + 사용상태
+    line_cond = Q()
+    if effective_wh:
+        line_cond &= (
+            Q(warehouse__warehouse_id=effective_wh) |
+            Q(warehouse__isnull=True, receipt__warehouse__warehouse_id=effective_wh)
+        )
+    if use_status in allowed_status:
+        line_cond &= Q(use_status=use_status)
+    matching_lines = UnifiedReceiptLine.objects.filter(line_cond, receipt_id=OuterRef("pk"))
+
     # 헤더 조회
     header_qs = (
         UnifiedReceipt.objects
@@ -523,79 +574,80 @@ def issue_list(request):
             category=cat, is_active=True, is_deleted=False,
             date__gte=date_from, date__lte=date_to,
         )
-        .order_by("-date", "-id")
     )
     # 외부사용자 벤더 제한
     if not getattr(request.user, "is_internal", False):
         vendor_id = getattr(getattr(request.user, "vendor", None), "id", None)
         header_qs = header_qs.filter(vendor_id=vendor_id) if vendor_id else header_qs.none()
 
-    headers = list(header_qs)
-    receipt_ids = [h.id for h in headers] or [0]
+    # 품명 검색
+    if q:
+        header_qs = header_qs.filter(item_name_snapshot__icontains=q)
+
+    if cat == "CHEM":
+        # 약품은 조건에 맞는 서브라인이 있어야 출력
+        header_qs = header_qs.filter(Exists(matching_lines))
+    elif effective_wh:
+        # NF/SUP: 맞는 서브라인이 있거나, 헤더가 현재창고에 있으면 가상 라인으로 출력
+        header_qs = header_qs.filter(
+            Q(Exists(matching_lines)) | Q(warehouse__warehouse_id=effective_wh)
+        )
+    else:
+        header_qs = header_qs.filter(Exists(matching_lines))
+
+    # 키셋 페이징 (date DESC, id DESC)
+    after = _parse_keyset_cursor(request.GET.get("after"))
+    before = None if after else _parse_keyset_cursor(request.GET.get("before"))
+    if after:
+        a_date, a_id = after
+        page_qs = header_qs.filter(Q(date__lt=a_date) | Q(date=a_date, id__lt=a_id)).order_by("-date", "-id")
+    elif before:
+        b_date, b_id = before
+        page_qs = header_qs.filter(Q(date__gt=b_date) | Q(date=b_date, id__gt=b_id)).order_by("date", "id")
+    else:
+        page_qs = header_qs.order_by("-date", "-id")
+
+    headers = list(page_qs[:ISSUE_PAGE_SIZE + 1])
+    has_more = len(headers) > ISSUE_PAGE_SIZE
+    headers = headers[:ISSUE_PAGE_SIZE]
+    if before:
+        headers.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(after)
 
-    # 서브라인 조회(있을 때)
+    # 현재 페이지 헤더의 서브라인만 조회
     lines_by_receipt: dict[int, list[UnifiedReceiptLine]] = {}
-    if receipt_ids:
-        line_qs = (
+    if headers:
+        for ln in (
             UnifiedReceiptLine.objects
-            .select_related("warehouse", "receipt", "receipt__warehouse")
-            .filter(receipt_id__in=receipt_ids)
+            .select_related("warehouse")
+            .filter(line_cond, receipt_id__in=[h.id for h in headers])
             .order_by("sub_seq", "id")
-        )
-        # 현재창고 필터: 라인 창고가 있으면 그 창고, 없으면 헤더 창고
-        if effective_wh:
-            line_qs = line_qs.filter(
-                Q(warehouse__warehouse_id=effective_wh) |
-                Q(warehouse__isnull=True, receipt__warehouse__warehouse_id=effective_wh)
-            )
-        if use_status in allowed_status:
-            line_qs = line_qs.filter(use_status=use_status)
-
-        for ln in line_qs:
+        ):
             lines_by_receipt.setdefault(ln.receipt_id, []).append(ln)
 
     # 화면 아이템 구성
     items = []
-    q_lower = q.lower()
     for h in headers:
         h.product_display = h.item_name_snapshot or "-"
         sub_lines = lines_by_receipt.get(h.id)
-
-        if cat == "CHEM":
-            # 약품은 서브라인 반드시 있어야 출력
-            if not sub_lines:
-                continue
-        else:
-            # NF/SUP: 서브라인 없으면 헤더 기준으로 '가상 라인' 1개 생성
-            if not sub_lines:
-                # 헤더 창고가 현재창고와 다르면 스킵
-                header_is_in_wh = (h.warehouse and h.warehouse.warehouse_id == effective_wh)
-                if not header_is_in_wh:
-                    continue
-                # 가상 라인(템플릿 호환용). id=0 → 이동 버튼은 당장 비활성 쪽으로 처리됨(다음 단계에 header move 지원)
-                pseudo = SimpleNamespace(
-                    id=0,
-                    sub_lot=h.receipt_lot,
-                    qty=h.qty,
-                    use_status="미사용",
-                    warehouse=None,   # 템플릿에서 없으면 헤더창고를 표시
-                )
-                sub_lines = [pseudo]
-
-        # 품명 검색
-        if q and q_lower not in h.product_display.lower():
-            continue
-
+        if not sub_lines:
+            # NF/SUP 가상 라인(템플릿 호환용). id=0 → 이동 버튼은 당장 비활성 쪽으로 처리됨(다음 단계에 header move 지원)
+            sub_lines = [SimpleNamespace(
+                id=0,
+                sub_lot=h.receipt_lot,
+                qty=h.qty,
+                use_status="미사용",
+                warehouse=None,   # 템플릿에서 없으면 헤더창고를 표시
+            )]
         h.sub_lines = sub_lines
         items.append(h)
 
-    # 페이징
-    paginator = Paginator(items, 20)
-    page_obj = paginator.get_page(request.GET.get("page") or 1)
-
-    # page 제외 쿼리스트링
+    # 커서 제외 쿼리스트링
     qd = request.GET.copy()
-    qd.pop("page", None)
+    for key in ("page", "after", "before"):
+        qd.pop(key, None)
     querystring = qd.urlencode()
 
     # 창고 목록 + 목적지 기본값
@@ -611,8 +663,13 @@ def issue_list(request):
 
     context = {
         "cat": cat,
-        "items": page_obj.object_list,
-        "page_obj": page_obj,
+        "items": items,
+        "page": {
+            "has_prev": has_prev,
+            "has_next": has_next,
+            "prev_cursor": _keyset_cursor(items[0]) if items else "",
+            "next_cursor": _keyset_cursor(items[-1]) if items else "",
+        },
         "querystring": querystring,
         "warehouses": warehouses,
         "default_dest_id": default_dest_id,
@@ -678,8 +735,10 @@ def issue_add(request):
         is_used_at_issue=bool(request.POST.get("is_used_at_issue")),
     )
 
+    stock_before = receipt_stock_rows([receipt.id], sign=-1)
     receipt.warehouse_id = to_wh.id
     receipt.save(update_fields=["warehouse"])
+    apply_stock_deltas(stock_before + receipt_stock_rows([receipt.id]))
 
     messages.success(request, f"[{cat}] 창고이동 등록 완료 · LOT={lot}")
     return redirect(f"{request.path}?cat={cat}")
@@ -770,6 +829,8 @@ def return_add(request):
         reason_code=(request.POST.get("reason_code") or "").strip(),
     )
 
+    # 반품 전표 잔량 전체 차감
+    apply_stock_deltas(receipt_stock_rows([receipt.id], sign=-1))
     receipt.is_active = False
     receipt.is_deleted = True
     receipt.save(update_fields=["is_active", "is_deleted"])
@@ -778,6 +839,74 @@ def return_add(request):
     return redirect(f"{request.path}?cat={cat}")
 
 
+# ╔══════════════════════════════════════════════════════════════════════════╗
+# ║                         창고별 현재고 조회 API                            ║
+# ╚══════════════════════════════════════════════════════════════════════════╝
+@require_http_methods(["GET"])
+@login_required
+def stock_api(request):
+    """
+    UnifiedStockBalance 조회(키 조회 — 입고 전표 스캔 없음)
+    GET:
+      cat (CHEM|NF|SUP)
+      item_app + item_model (또는 item_ct_id), item_id   ← 선택: 없으면 카테고리 전체
+      warehouse_id(pk) 또는 wh(창고코드 sk_wh_N)          ← 선택
+      include_zero=1                                      ← 선택: 잔량 0 행 포함
+    """
+    # 여러 협력사 입고가 합산된 값이므로 내부 사용자만
+    if not getattr(request.user, "is_internal", False):
+        return JsonResponse({"ok": False, "msg": "권한 없음"}, status=403)
+
+    cat = _get_cat(request)
+    qs = UnifiedStockBalance.objects.filter(category=cat)
+
+    try:
+        item_app = (request.GET.get("item_app") or "").strip()
+        item_model = (request.GET.get("item_model") or "").strip()
+        item_ct_id = (request.GET.get("item_ct_id") or "").strip()
+        item_id = (request.GET.get("item_id") or "").strip()
+        if item_app and item_model:
+            qs = qs.filter(item_ct=_ct_for(item_app, item_model))
+        elif item_ct_id:
+            qs = qs.filter(item_ct_id=int(item_ct_id))
+        if item_id:
+            qs = qs.filter(item_id=int(item_id))
+
+        warehouse_id = (request.GET.get("warehouse_id") or "").strip()
+        wh_code = (request.GET.get("wh") or "").strip()
+        if warehouse_id:
+            qs = qs.filter(warehouse_id=int(warehouse_id))
+        elif wh_code:
+            qs = qs.filter(warehouse__warehouse_id=wh_code)
+    except (ValueError, ContentType.DoesNotExist) as e:
+        return JsonResponse({"ok": False, "msg": f"잘못된 요청: {e}"}, status=400)
+
+    if request.GET.get("include_zero") != "1":
+        qs = qs.exclude(qty=0)
+
+    rows = []
+    total = Decimal("0")
+    for ct_id, it_id, wh_pk, wh_code_v, wh_name, qty, updated_at in (
+        qs.order_by("item_ct_id", "item_id", "warehouse__warehouse_id")
+        .values_list(
+            "item_ct_id", "item_id", "warehouse_id",
+            "warehouse__warehouse_id", "warehouse__name", "qty", "updated_at",
+        )
+    ):
+        total += qty
+        rows.append({
+            "item_ct_id": ct_id,
+            "item_id": it_id,
+            "warehouse_id": wh_pk,
+            "warehouse_code": wh_code_v,
+            "warehouse_name": wh_name,
+            "qty": str(qty),
+            "updated_at": updated_at.isoformat() if updated_at else None,
+        })
+
+    return JsonResponse({"ok": True, "cat": cat, "total": str(total), "rows": rows})
+
+
 # ╔══════════════════════════════════════════════════════════════════════════╗
 # ║                    발주 등록(폼/저장) & 품목 AJAX 로드                    ║
 # ╚══════════════════════════════════════════════════════════════════════════╝
@@ -1015,59 +1144,37 @@ def order_cancel(request, order_id: int):
     return redirect(f"{reverse('purchase:uni_order_list')}?cat={cat}")
 
 
+ORDER_EXPORT_HEADER = [
+    "LOT", "발주처", "발주일", "품명", "수량", "단가", "금액",
+    "입고예정일", "발주상태", "진행상태", "등록일시", "수정일시",
+]
+
+
+def order_export_row(it):
+    o = it.order
+    return [
+        o.order_lot, getattr(o.vendor, "name", "-"),
+        o.order_date, it.item_name_snapshot, it.qty,
+        it.unit_price, it.amount, it.expected_date,
+        o.get_order_status_display(), o.get_flow_status_display(),
+        o.created_at, o.updated_at,
+    ]
+
+
 # ── (옵션) 엑셀/CSV 다운로드 ────────────────────────────────────────────────
 @require_http_methods(["GET"])
 def order_export(request):
     """
-    현재 필터 조건 그대로 CSV로 내려줌.
+    현재 필터 조건 그대로 CSV로 내려줌. (목록과 같은 _order_item_queryset 사용)
     """
-    cat = (request.GET.get("cat") or "CHEM").upper()
-    request.GET = request.GET.copy()
-    request.GET["cat"] = cat
-    # 목록과 동일하게 데이터 구성
-    today = date.today()
-    def_start, def_end = _month_defaults(today)
-
-    qs = (
-        UnifiedOrderItem.objects.select_related("order", "order__vendor")
-        .filter(order__category=cat, order__is_deleted=False)
+    cat, qs = _order_item_queryset(request.GET)
+    return stream_queryset_csv(
+        qs.order_by(*ORDER_ITEM_ORDERING),
+        f"orders_{cat}_{date.today().isoformat()}.csv",
+        ORDER_EXPORT_HEADER,
+        order_export_row,
     )
 
-    if request.GET.get("order_date_start") or def_start:
-        qs = qs.filter(order__order_date__gte=request.GET.get("order_date_start", def_start))
-    if request.GET.get("order_date_end") or def_end:
-        qs = qs.filter(order__order_date__lte=request.GET.get("order_date_end", def_end))
-    if request.GET.get("expected_date_start"):
-        qs = qs.filter(expected_date__gte=request.GET.get("expected_date_start"))
-    if request.GET.get("expected_date_end"):
-        qs = qs.filter(expected_date__lte=request.GET.get("expected_date_end"))
-    if request.GET.get("vendor"):
-        qs = qs.filter(order__vendor__name__icontains=request.GET.get("vendor"))
-    if request.GET.get("product"):
-        qs = qs.filter(item_name_snapshot__icontains=request.GET.get("product"))
-    if request.GET.get("order_status"):
-        qs = qs.filter(order__order_status=request.GET.get("order_status"))
-    if request.GET.get("flow_status"):
-        qs = qs.filter(order__flow_status=request.GET.get("flow_status"))
-
-    import csv
-    resp = HttpResponse(content_type="text/csv; charset=utf-8")
-    resp["Content-Disposition"] = f'attachment; filename="orders_{cat}_{today.isoformat()}.csv"'
-    writer = csv.writer(resp)
-    writer.writerow([
-        "LOT", "발주처", "발주일", "품명", "수량", "단가", "금액",
-        "입고예정일", "발주상태", "진행상태", "등록일시", "수정일시"
-    ])
-    for it in qs.order_by("-order__order_date", "-order_id", "id"):
-        o = it.order
-        writer.writerow([
-            o.order_lot, getattr(o.vendor, "name", "-"),
-            o.order_date, it.item_name_snapshot, it.qty,
-            it.unit_price, it.amount, it.expected_date,
-            o.get_order_status_display(), o.get_flow_status_display(),
-            o.created_at, o.updated_at,
-        ])
-    return resp
 
 
 # ---------------------------------------------------------------------
@@ -1409,24 +1516,94 @@ def usage_receipt_apply(request):
     except Exception as e:
         return JsonResponse({"ok": False, "msg": str(e)}, status=400)
 
+@require_http_methods(["POST"])
+@login_required
+def usage_item_consume(request):
+    """
+    CHEM: 품목 + 창고 기준 총량 소비(유효기간 빠른 서브 LOT 부터, 여러 입고 전표에 걸쳐 자동 배분)
+    body(JSON):
+      - item_app + item_model (또는 item_ct_id), item_id: 품목
+      - warehouse_id(pk) 또는 wh(창고코드, 기본 sk_wh_6)
+      - qty: Decimal-compatible string
+      - transaction_uid: 멱등키(라인별 이력은 {transaction_uid}:{n})
+      - ref_type, ref_id, note (optional)
+    """
+    if not getattr(request.user, "is_internal", False):
+        return JsonResponse({"ok": False, "msg": "권한 없음"}, status=403)
+
+    import json
+    try:
+        payload = json.loads(request.body.decode("utf-8"))
+        if payload.get("item_app") and payload.get("item_model"):
+            item_ct_id = _ct_for(payload["item_app"], payload["item_model"]).id
+        else:
+            item_ct_id = int(payload.get("item_ct_id"))
+        item_id = int(payload.get("item_id"))
+        if payload.get("warehouse_id") not in (None, ""):
+            warehouse_id = int(payload["warehouse_id"])
+        else:
+            wh_code = (payload.get("wh") or "sk_wh_6").strip()
+            warehouse_id = Warehouse.objects.only("id").get(warehouse_id=wh_code).id
+        qty = Decimal(str(payload.get("qty")))
+        txid = (payload.get("transaction_uid") or "").strip()
+        if not txid:
+            raise ValueError("transaction_uid 는 필수입니다.")
+        # 라인별 이력 키 {txid}:{n} 이 컬럼 길이를 넘지 않도록
+        if len(txid) > CONSUME_UID_MAX_LEN:
+            raise ValueError(f"transaction_uid 는 {CONSUME_UID_MAX_LEN}자 이하여야 합니다.")
+    except Exception as e:
+        return JsonResponse({"ok": False, "msg": f"잘못된 요청: {e}"}, status=400)
+
+    try:
+        res = consume_chem_item(
+            item_ct_id, item_id, warehouse_id, qty,
+            user=request.user,
+            base_transaction_uid=txid,
+            ref_type=(payload.get("ref_type") or "").strip(),
+            ref_id=str(payload.get("ref_id") or ""),
+            note=(payload.get("note") or "").strip(),
+        )
+        return JsonResponse(res)
+    except ValidationError as e:
+        if e.code == "busy":
+            return JsonResponse({"ok": False, "busy": True, "msg": "; ".join(e.messages)}, status=409)
+        return JsonResponse({"ok": False, "msg": "; ".join(e.messages)}, status=400)
+
+@require_http_methods(["POST"])
+@login_required
+def usage_batch_apply(request):
+    """
+    사용/반납/조정 일괄 처리(CHEM 라인 + NF/SUP 헤더 혼합 가능)
+    body(JSON):
+      - operations: [
+          {"line_id" | "receipt_id": int, "action": "use"|"return"|"adjust",
+           "qty": str, "transaction_uid": str, "ref_type"?, "ref_id"?, "note"?},
+          ...
+        ]
+    응답: {"ok", "applied", "results": [{index, transaction_uid, ok, status, msg?, ...}]}
+    """
+    import json
+    try:
+        payload = json.loads(request.body.decode("utf-8"))
+        operations = payload.get("operations")
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("operations 목록이 비어 있습니다.")
+        if len(operations) > USAGE_BATCH_MAX:
+            raise ValueError(f"한 번에 최대 {USAGE_BATCH_MAX}건까지 처리할 수 있습니다.")
+    except Exception as e:
+        return JsonResponse({"ok": False, "msg": f"잘못된 요청: {e}"}, status=400)
+
+    try:
+        return JsonResponse(apply_usage_batch(operations, user=request.user))
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "msg": "; ".join(e.messages)}, status=409)
+
 def _next_unified_receipt_lot(d: date) -> str:
     """
     통합 입고 헤더 LOT 생성:
-    IN + YYYYMMDD + 3자리(001, 002, ...)
+    IN + YYYYMMDD + 3자리(001, 002, ...) — 카운터 블록 발급
     """
-    prefix = d.strftime("IN%Y%m%d")
-    last = (
-        UnifiedReceipt.objects
-        .filter(receipt_lot__startswith=prefix)
-        .order_by("-id")
-        .values_list("receipt_lot", flat=True)
-        .first()
-    )
-    if last and len(last) > len(prefix) and last[len(prefix):].isdigit():
-        seq = int(last[len(prefix):]) + 1
-    else:
-        seq = 1
-    return f"{prefix}{seq:03d}"
+    return get_next_lot("IN", d)
 
 QTY_Q = Decimal("0.001")  # Decimal(18,3) 정책
 
@@ -1668,6 +1845,11 @@ def receipt_commit(request, order_id: int):
         rows: list[dict] = []
         total_qty = Decimal("0")
 
+        # 라인별 창고 일괄 조회 (1쿼리)
+        sub_wh_map = Warehouse.objects.in_bulk(
+            [int(v) for v in sub_wh_ids if str(v).isdigit()]
+        )
+
         for idx, lot in enumerate(sub_lots):
             lot = (lot or "").strip()
             qty = _to_dec(sub_qtys[idx] if idx < len(sub_qtys) else "")
@@ -1675,8 +1857,8 @@ def receipt_commit(request, order_id: int):
                 continue
 
             wh = default_wh
-            if idx < len(sub_wh_ids) and sub_wh_ids[idx]:
-                wh = Warehouse.objects.filter(id=sub_wh_ids[idx]).first() or default_wh
+            if idx < len(sub_wh_ids) and str(sub_wh_ids[idx]).isdigit():
+                wh = sub_wh_map.get(int(sub_wh_ids[idx])) or default_wh
 
             expire_raw = (sub_expires[idx] if idx < len(sub_expires) else "") or ""
             line_remark = (sub_remarks[idx] if idx < len(sub_remarks) else "").strip()
@@ -1742,9 +1924,9 @@ def receipt_commit(request, order_id: int):
             is_used=False,
         )
 
-        # 서브 LOT 라인 생성 (★ 비고 자동 조작 없음)
-        for seq, r in enumerate(rows, start=1):
-            UnifiedReceiptLine.objects.create(
+        # 서브 LOT 라인 메모리 구성 → bulk_create 1회 (★ 비고 자동 조작 없음)
+        lines = UnifiedReceiptLine.objects.bulk_create([
+            UnifiedReceiptLine(
                 receipt=created_receipt,
                 sub_seq=seq,
                 sub_lot=r["lot"],
@@ -1755,7 +1937,13 @@ def receipt_commit(request, order_id: int):
                 expiry_date=r["expiry_date"],
                 remark=r["remark"],
             )
-            created_lines += 1
+            for seq, r in enumerate(rows, start=1)
+        ])
+        created_lines = len(lines)
+        apply_stock_deltas([
+            (cat, item.item_ct_id, item.item_id, ln.warehouse_id or default_wh.id, ln.qty)
+            for ln in lines
+        ])
 
     # ------------------------------------------------------------------
     # 2) 비철 / 부자재 : 헤더만 생성
@@ -1834,6 +2022,7 @@ def receipt_commit(request, order_id: int):
             certificate_file=certificate_file if cat == "NF" else None,
             is_used=False,
         )
+        apply_stock_deltas([(cat, item.item_ct_id, item.item_id, default_wh.id, header_qty_int)])
 
     else:
         messages.error(request, f"지원되지 않는 카테고리입니다: {cat}")
@@ -1948,22 +2137,29 @@ def receipt_line_edit(request, line_id: int):
             }
             return render(request, "purchase/unified/receipts/line_edit.html", ctx)
 
-        # 실제 저장
-        receipt.date = receipt_date
-        receipt.warehouse = new_receipt_wh
+        # 실제 저장 (헤더 창고가 바뀌면 라인 창고 없는 서브 LOT 재고가 함께 이동)
+        with transaction.atomic():
+            wh_changed = new_receipt_wh.id != receipt.warehouse_id
+            stock_before = receipt_stock_rows([receipt.id], sign=-1) if wh_changed else []
+
+            receipt.date = receipt_date
+            receipt.warehouse = new_receipt_wh
+
+            if delete_cert:
+                if receipt.certificate_file:
+                    receipt.certificate_file.delete(save=False)
+                receipt.certificate_file = None
+            elif new_cert:
+                receipt.certificate_file = new_cert
 
-        if delete_cert:
-            if receipt.certificate_file:
-                receipt.certificate_file.delete(save=False)
-            receipt.certificate_file = None
-        elif new_cert:
-            receipt.certificate_file = new_cert
+            receipt.save()
 
-        receipt.save()
+            line.expiry_date = expiry_date
+            line.remark = remark_raw
+            line.save()
 
-        line.expiry_date = expiry_date
-        line.remark = remark_raw
-        line.save()
+            if wh_changed:
+                apply_stock_deltas(stock_before + receipt_stock_rows([receipt.id]))
 
         messages.success(request, f"서브 LOT {line.sub_lot} 정보가 수정되었습니다.")
         return redirect(back_url)
@@ -0,0 +1,189 @@
+# quality/defects/rollups.py
+"""
+불량 Pareto 일별 집계(quality_defect_daily) 유지/조회
+
+- 검사 저장 시: 영향받는 (일자, 품목, 거래처) 구간만 DELETE → INSERT ... SELECT 로 다시 계산
+  (구간 단위 재계산이라 수정/삭제/검사일 변경도 증감 계산 없이 그대로 맞춰짐)
+  테이블에 유니크 키가 없으므로 DELETE 전에 출하=품목, 수입=거래처 단위 advisory lock
+  → 같은 구간을 동시에 저장해도 두 번째 재계산은 첫 번째 커밋 뒤에 실행되어 중복 행이 남지 않음
+- 전체 재구성: rebuild_defect_rollups() / manage.py rebuild_defect_rollups
+- 조회 화면은 이 테이블만 읽는다 (원본 검사/불량 테이블 조인 없음)
+"""
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from injectionorder.models import InjectionOrder
+from production.models import WorkOrder
+from quality.inspections.models import (
+    DEFECT_CODE_CHOICES,
+    DefectDaily,
+    DefectSource,
+    IncomingInspection,
+    OutgoingDefectCode,
+    OutgoingDefectGroup,
+    OutgoingInspection,
+    OutgoingInspectionDefect,
+)
+from utils.locks import advisory_xact_lock
+
+_T = DefectDaily._meta.db_table
+_COLS = "source, day, product_id, vendor_id, defect_group, code, insp_count, qty"
+
+# 출하: 불량코드별 수량 (PL_ 접두어 = 도금불량)
+_OUT_SQL = f"""
+INSERT INTO {_T} ({_COLS})
+SELECT %(source)s, i.inspection_date, w.product_id, w.customer_id,
+       CASE WHEN left(d.code, 3) = 'PL_' THEN %(plating)s ELSE %(injection)s END,
+       d.code, COUNT(*), SUM(d.qty)
+  FROM {OutgoingInspectionDefect._meta.db_table} d
+  JOIN {OutgoingInspection._meta.db_table} i ON i.id = d.inspection_id
+  JOIN {WorkOrder._meta.db_table} w ON w.id = i.workorder_id
+ WHERE d.qty > 0 {{scope}}
+ GROUP BY i.inspection_date, w.product_id, w.customer_id, d.code
+"""
+
+# 수입: 배송상세(주문, shipment_id)별 최신 검사 1건의 사유코드 배열을 unnest
+#   - 최신 검사가 사유코드 없이(합격) 저장되면 이전 불합격 사유는 빠짐
+#   - 라인(IncomingInspectionDetail)은 헤더 사유코드를 그대로 복사한 스냅샷이라 헤더만 집계
+#   - 코드별 수량 입력이 없으므로 반출수량을 각 사유코드에 그대로 귀속
+_IN_SQL = f"""
+INSERT INTO {_T} ({_COLS})
+SELECT %(source)s, h.inspection_date, NULL, o.vendor_id, %(injection)s,
+       c.code, COUNT(*), SUM(COALESCE(h.return_qty, 0))
+  FROM (
+        SELECT DISTINCT ON (order_id, shipment_id)
+               order_id, inspection_date, defects, return_qty
+          FROM {IncomingInspection._meta.db_table}
+         WHERE TRUE {{inner_scope}}
+         ORDER BY order_id, shipment_id, created_at DESC, id DESC
+       ) h
+  JOIN {InjectionOrder._meta.db_table} o ON o.id = h.order_id
+ CROSS JOIN LATERAL (SELECT DISTINCT unnest(h.defects) AS code) c
+ WHERE TRUE {{scope}}
+ GROUP BY h.inspection_date, o.vendor_id, c.code
+"""
+
+_BASE_PARAMS = {
+    "plating": OutgoingDefectGroup.PLATING,
+    "injection": OutgoingDefectGroup.INJECTION,
+}
+
+
+def _execute(sql: str, params: dict) -> int:
+    with connection.cursor() as cur:
+        cur.execute(sql, {**_BASE_PARAMS, **params})
+        return cur.rowcount
+
+
+# ─────────────────────────────────────────────
+# 구간 재계산 (검사 저장 시)
+# ─────────────────────────────────────────────
+
+def refresh_outgoing_defects(days, product_id: int, vendor_id: int) -> int:
+    """출하 (일자들, 품목, 거래처) 구간 재계산. 검사일 변경 시 이전/새 일자를 함께 넘긴다."""
+    days = sorted({d for d in days if d})
+    if not days:
+        return 0
+    with transaction.atomic():
+        advisory_xact_lock("quality_defect_daily:OUT", [product_id])
+        DefectDaily.objects.filter(
+            source=DefectSource.OUTGOING, day__in=days,
+            product_id=product_id, vendor_id=vendor_id,
+        ).delete()
+        return _execute(
+            _OUT_SQL.format(
+                scope="AND i.inspection_date = ANY(%(days)s) "
+                      "AND w.product_id = %(product_id)s AND w.customer_id = %(vendor_id)s"
+            ),
+            {"source": DefectSource.OUTGOING, "days": days,
+             "product_id": product_id, "vendor_id": vendor_id},
+        )
+
+
+def refresh_outgoing_for(workorder, *extra_days) -> int:
+    """WorkOrder 의 출하검사(있으면) 검사일 + extra_days(이전 검사일 등) 구간 재계산"""
+    days = set(extra_days)
+    days.update(
+        OutgoingInspection.objects.filter(workorder=workorder).values_list("inspection_date", flat=True)
+    )
+    return refresh_outgoing_defects(days, workorder.product_id, workorder.customer_id)
+
+
+def refresh_incoming_for_order(order) -> int:
+    """
+    발주의 수입검사가 걸친 모든 검사일 × 발주처 구간 재계산.
+    새 검사가 같은 배송상세의 이전 검사(다른 날짜일 수 있음)를 대체하므로 발주 전체 일자를 다시 본다.
+    """
+    with transaction.atomic():
+        advisory_xact_lock("quality_defect_daily:IN", [order.vendor_id])
+        days = sorted(set(
+            IncomingInspection.objects.filter(order=order).values_list("inspection_date", flat=True)
+        ))
+        if not days:
+            return 0
+        DefectDaily.objects.filter(
+            source=DefectSource.INCOMING, day__in=days, vendor_id=order.vendor_id,
+        ).delete()
+        return _execute(
+            _IN_SQL.format(
+                inner_scope=f"AND order_id IN (SELECT id FROM {InjectionOrder._meta.db_table} "
+                            "WHERE vendor_id = %(vendor_id)s)",
+                scope="AND h.inspection_date = ANY(%(days)s)",
+            ),
+            {"source": DefectSource.INCOMING, "days": days, "vendor_id": order.vendor_id},
+        )
+
+
+def rebuild_defect_rollups() -> int:
+    """집계 테이블을 비우고 원본 검사 데이터로 다시 채운다."""
+    with transaction.atomic():
+        with connection.cursor() as cur:
+            cur.execute(f"TRUNCATE {_T}")
+        count = _execute(_OUT_SQL.format(scope=""), {"source": DefectSource.OUTGOING})
+        count += _execute(
+            _IN_SQL.format(inner_scope="", scope=""), {"source": DefectSource.INCOMING},
+        )
+    return count
+
+
+# ─────────────────────────────────────────────
+# 조회 (Pareto / 추이)
+# ─────────────────────────────────────────────
+
+_INCOMING_LABELS = dict(DEFECT_CODE_CHOICES)
+
+
+def defect_label(source: str, code: str) -> str:
+    if source == DefectSource.INCOMING:
+        return _INCOMING_LABELS.get(code, code)
+    try:
+        return OutgoingDefectCode(code).label
+    except ValueError:
+        return code
+
+
+def pareto_rows(qs, source: str) -> list[dict]:
+    """불량코드별 수량 내림차순 + 점유율/누적 점유율(%)"""
+    rows = list(
+        qs.values("defect_group", "code")
+        .annotate(qty_sum=Sum("qty"), cnt_sum=Sum("insp_count"))
+        .order_by("-qty_sum", "-cnt_sum", "code")
+    )
+    total = sum(r["qty_sum"] or 0 for r in rows)
+    cum = 0
+    for r in rows:
+        cum += r["qty_sum"] or 0
+        r["label"] = defect_label(source, r["code"])
+        r["group_label"] = OutgoingDefectGroup(r["defect_group"]).label
+        r["share"] = round((r["qty_sum"] or 0) * 100 / total, 1) if total else 0
+        r["cum_share"] = round(cum * 100 / total, 1) if total else 0
+    return rows
+
+
+def trend_rows(qs) -> list[dict]:
+    """일자별 불량 수량/건수"""
+    return list(
+        qs.values("day")
+        .annotate(qty_sum=Sum("qty"), cnt_sum=Sum("insp_count"))
+        .order_by("day")
+    )
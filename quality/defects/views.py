@@ -0,0 +1,90 @@
+# quality/defects/views.py
+"""
+불량 Pareto / 추이 화면 — 일별 집계(quality_defect_daily)만 읽는다.
+"""
+from datetime import timedelta
+
+from django.db.models import Q, Sum
+from django.shortcuts import render
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET
+
+from production.orders.views import _today_localdate
+from quality.inspections.models import DefectDaily, DefectSource, OutgoingDefectGroup
+from quality.defects.rollups import pareto_rows, trend_rows
+
+TOP_N = 10
+
+
+@require_GET
+def defect_pareto(request):
+    """
+    GET 파라미터
+      - source : OUT(출하, 기본) / IN(수입)
+      - start / end : 검사일 범위 (기본: 이번 달 1일 ~ 오늘)
+      - group  : PLATING / INJECTION (출하만 의미 있음)
+      - product / vendor : 품번·품명 / 거래처명 부분검색
+    """
+    today = _today_localdate()
+    source = request.GET.get("source") or DefectSource.OUTGOING
+    if source not in DefectSource.values:
+        source = DefectSource.OUTGOING
+
+    start = parse_date(request.GET.get("start") or "") or today.replace(day=1)
+    end = parse_date(request.GET.get("end") or "") or today
+    if end < start:
+        start, end = end, start
+
+    group = (request.GET.get("group") or "").strip()
+    product = (request.GET.get("product") or "").strip()
+    vendor = (request.GET.get("vendor") or "").strip()
+
+    qs = DefectDaily.objects.filter(source=source, day__gte=start, day__lte=end)
+    if group in OutgoingDefectGroup.values:
+        qs = qs.filter(defect_group=group)
+    if product:
+        qs = qs.filter(Q(product__part_number__icontains=product) | Q(product__name__icontains=product))
+    if vendor:
+        qs = qs.filter(vendor__name__icontains=vendor)
+
+    pareto = pareto_rows(qs, source)
+    max_qty = max((r["qty_sum"] or 0 for r in pareto), default=0)
+
+    # 일자별 추이 — 데이터 없는 날도 0 으로 채움 (최대 92일)
+    by_day = {r["day"]: r for r in trend_rows(qs)}
+    trend = []
+    span = min((end - start).days, 91)
+    for i in range(span + 1):
+        d = end - timedelta(days=span - i)
+        r = by_day.get(d)
+        trend.append({"day": d, "qty": r["qty_sum"] if r else 0, "cnt": r["cnt_sum"] if r else 0})
+    trend_max = max((t["qty"] for t in trend), default=0)
+
+    # 품목별(출하) / 거래처별(수입) 상위
+    if source == DefectSource.OUTGOING:
+        top_key = ("product__part_number", "product__name")
+    else:
+        top_key = ("vendor__name",)
+    top = list(
+        qs.values(*top_key)
+        .annotate(qty_sum=Sum("qty"), cnt_sum=Sum("insp_count"))
+        .order_by("-qty_sum")[:TOP_N]
+    )
+
+    ctx = {
+        "source": source,
+        "source_choices": DefectSource.choices,
+        "group": group,
+        "group_choices": OutgoingDefectGroup.choices,
+        "start": start,
+        "end": end,
+        "product": product,
+        "vendor": vendor,
+        "pareto": pareto,
+        "max_qty": max_qty,
+        "total_qty": sum(r["qty_sum"] or 0 for r in pareto),
+        "trend": trend,
+        "trend_max": trend_max,
+        "top": top,
+    }
+    return render(request, "quality/defects/pareto.html", ctx)
@@ -1,6 +1,7 @@
 # quality/inspections/models.py
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.utils import timezone
 from django.conf import settings
 
@@ -80,6 +81,8 @@ class IncomingInspection(models.Model):
             models.Index(fields=["inspection_date"]),
             # 주문+배송상세 최신 검사 조회 최적화
             models.Index(fields=["order", "shipment_id", "created_at"]),
+            # 불합격 사유코드 검색(defects__overlap / __contains)
+            GinIndex(fields=["defects"], name="ix_incoming_defects_gin"),
         ]
 
     def __str__(self):
@@ -135,6 +138,7 @@ class IncomingInspectionDetail(models.Model):
             models.Index(fields=["inspection"]),
             models.Index(fields=["shipment_line"]),
             models.Index(fields=["status"]),
+            GinIndex(fields=["defects"], name="ix_incoming_dtl_defects_gin"),
         ]
         unique_together = [("inspection", "shipment_line")]  # 한 검사 헤더당 동일 배송 라인 중복 방지(선택)
 
@@ -526,3 +530,50 @@ class OutgoingFinishedLot(models.Model):
         return f"{self.finished_lot} ({self.box_size}ea)"
 
 
+
+
+# -------------------------------
+# 불량 Pareto 일별 집계 (조회 전용 요약 테이블)
+# -------------------------------
+class DefectSource(models.TextChoices):
+    OUTGOING = "OUT", "출하검사"
+    INCOMING = "IN", "수입검사"
+
+
+class DefectDaily(models.Model):
+    """
+    (일자, 품목, 거래처, 불량코드, 대분류) 별 불량 건수/수량 일별 집계.
+    - 출하: OutgoingInspectionDefect → 검사일 / WorkOrder.product / WorkOrder.customer
+    - 수입: IncomingInspection.defects(배열) unnest → 검사일 / 발주처 (품목 없음, 대분류=사출불량)
+            배송상세별 최신 검사 1건만 집계, 수량은 반출수량
+    - 검사 저장 시 해당 (일자, 품목, 거래처) 구간만 다시 계산 (quality.defects.rollups 참고)
+    - 정합성 복구: manage.py rebuild_defect_rollups
+    """
+    source = models.CharField("구분", max_length=3, choices=DefectSource.choices)
+    day = models.DateField("검사일")
+    product = models.ForeignKey(
+        "product.Product", on_delete=models.CASCADE,
+        null=True, blank=True, related_name="+", verbose_name="품목",
+    )
+    vendor = models.ForeignKey(
+        "vendor.Vendor", on_delete=models.CASCADE,
+        null=True, blank=True, related_name="+", verbose_name="거래처",
+    )
+    defect_group = models.CharField("불량 대분류", max_length=10, choices=OutgoingDefectGroup.choices)
+    code = models.CharField("불량 코드", max_length=32)
+
+    insp_count = models.PositiveIntegerField("검사 건수", default=0)
+    qty = models.PositiveIntegerField("불량 수량", default=0)
+
+    class Meta:
+        db_table = "quality_defect_daily"
+        verbose_name = "불량 일별 집계"
+        verbose_name_plural = "불량 일별 집계"
+        indexes = [
+            models.Index(fields=["source", "day"], name="ix_defect_daily_day"),
+            models.Index(fields=["source", "product", "day"], name="ix_defect_daily_product"),
+            models.Index(fields=["source", "vendor", "day"], name="ix_defect_daily_vendor"),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.day} {self.code} ({self.qty})"
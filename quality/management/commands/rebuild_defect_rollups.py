@@ -0,0 +1,12 @@
+# quality/management/commands/rebuild_defect_rollups.py
+from django.core.management.base import BaseCommand
+
+from quality.defects.rollups import rebuild_defect_rollups
+
+
+class Command(BaseCommand):
+    help = "출하/수입검사 불량 데이터로 불량 일별 집계(quality_defect_daily)를 재구성합니다."
+
+    def handle(self, *args, **options):
+        count = rebuild_defect_rollups()
+        self.stdout.write(self.style.SUCCESS(f"불량 일별 집계 재구성 완료: {count}건"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0009_product_packaging_spec_file_and_more'),
+        ('quality', '0011_alter_outgoingfinishedlot_options_and_more'),
+        ('vendor', '0007_vendoritemkind_vendor_major_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DefectDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('OUT', '출하검사'), ('IN', '수입검사')], max_length=3, verbose_name='구분')),
+                ('day', models.DateField(verbose_name='검사일')),
+                ('defect_group', models.CharField(choices=[('PLATING', '도금불량'), ('INJECTION', '사출불량')], max_length=10, verbose_name='불량 대분류')),
+                ('code', models.CharField(max_length=32, verbose_name='불량 코드')),
+                ('insp_count', models.PositiveIntegerField(default=0, verbose_name='검사 건수')),
+                ('qty', models.PositiveIntegerField(default=0, verbose_name='불량 수량')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product', verbose_name='품목')),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vendor.vendor', verbose_name='거래처')),
+            ],
+            options={
+                'verbose_name': '불량 일별 집계',
+                'verbose_name_plural': '불량 일별 집계',
+                'db_table': 'quality_defect_daily',
+                'indexes': [models.Index(fields=['source', 'day'], name='ix_defect_daily_day'), models.Index(fields=['source', 'product', 'day'], name='ix_defect_daily_product'), models.Index(fields=['source', 'vendor', 'day'], name='ix_defect_daily_vendor')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 08:18
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('injectionorder', '0005_alter_injectionorder_flow_status_injectionreceipt'),
+        ('partnerorder', '0002_partnershipmentline'),
+        ('quality', '0012_defectdaily'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incominginspection',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['defects'], name='ix_incoming_defects_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='incominginspectiondetail',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['defects'], name='ix_incoming_dtl_defects_gin'),
+        ),
+    ]
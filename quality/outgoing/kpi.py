@@ -0,0 +1,119 @@
+# quality/outgoing/kpi.py
+"""
+출하검사 KPI 쿼리셋 annotate (목록 화면 공용)
+
+WorkOrder 쿼리셋에 상세 화면과 같은 규칙의 파생값을 SQL 로 계산해 붙인다.
+→ 파이썬 루프 없이 정렬/필터/페이징 가능.
+    actual_total = 지시수량 + 실수량 보정
+    inspected    = 양품 + 불량 + LOSS            (보정 제외 실측)
+    remain       = max(actual_total - inspected, 0)
+    box_cnt      = 양품 // 박스당 포장수량
+    yield        = 양품 / inspected × 100       (검사 전이면 NULL)
+기존 템플릿 호환용 *_for_outgoing 값은 출하검사가 없으면 None (이전 화면 로직과 동일).
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import (
+    Case, DecimalField, F, IntegerField, Q, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf, Round
+
+from quality.inspections.models import OutgoingStatus
+
+# 제품에 package_quantity 없을 때만 쓰는 기본값
+DEFAULT_BOX_SIZE = 24
+
+_INSP = "outgoing_inspection__"
+
+
+def _q(field: str):
+    return Coalesce(F(f"{_INSP}{field}"), 0)
+
+
+def with_outgoing_kpis(qs):
+    """WorkOrder 쿼리셋 → kpi_* / *_for_outgoing annotate (추가 쿼리 없음, LEFT JOIN 1회)"""
+    no_insp = Q(outgoing_inspection__isnull=True)
+    return (
+        qs.annotate(
+            box_size_for_outgoing=Coalesce(
+                NullIf(F("product__package_quantity"), 0), Value(DEFAULT_BOX_SIZE),
+                output_field=IntegerField(),
+            ),
+            kpi_actual_total=Coalesce(F("order_qty"), 0) + _q("adjust_qty"),
+            kpi_good=_q("good_qty"),
+            kpi_inspected=_q("good_qty") + _q("defect_qty") + _q("loss_qty"),
+        )
+        .annotate(
+            kpi_remain=Greatest(F("kpi_actual_total") - F("kpi_inspected"), 0),
+            kpi_box_cnt=F("kpi_good") / F("box_size_for_outgoing"),
+            kpi_yield=Round(
+                Cast(F("kpi_good"), DecimalField(max_digits=14, decimal_places=4)) * 100
+                / NullIf(F("kpi_inspected"), 0),
+                1,
+                output_field=DecimalField(max_digits=5, decimal_places=1),
+            ),
+        )
+        .annotate(
+            remain_qty_for_outgoing=Case(When(no_insp, then=None), default=F("kpi_remain")),
+            finished_box_cnt_for_outgoing=Case(When(no_insp, then=None), default=F("kpi_box_cnt")),
+        )
+    )
+
+
+# ─────────────────────────────────────────────
+# 화면 공용 정렬 / 필터 (GET 파라미터)
+# ─────────────────────────────────────────────
+
+# sort=키 (앞에 '-' 면 내림차순)
+KPI_SORTS = {
+    "plan": "planned_start",
+    "lot": "work_lot",
+    "qty": "order_qty",
+    "actual": "kpi_actual_total",
+    "inspected": "kpi_inspected",
+    "remain": "kpi_remain",
+    "box": "kpi_box_cnt",
+    "yield": "kpi_yield",
+}
+
+
+def apply_kpi_params(qs, params, default_order=("planned_start", "created_at", "id")):
+    """
+    with_outgoing_kpis() 를 거친 쿼리셋에 GET 필터/정렬 적용
+      - remain=open(잔여 있음) | done(잔여 0)
+      - yield_lt=95  (수율 95% 미만, 검사 전 제외)
+      - insp=none(미검사) | DRAFT | HOLD | DONE | pending(완료 외 전부)
+      - sort=remain / -yield ... (KPI_SORTS 키)
+    반환: (qs, sort 문자열)
+    """
+    remain = (params.get("remain") or "").strip()
+    if remain == "open":
+        qs = qs.filter(kpi_remain__gt=0)
+    elif remain == "done":
+        qs = qs.filter(kpi_remain=0)
+
+    yield_lt = (params.get("yield_lt") or "").strip()
+    if yield_lt:
+        try:
+            qs = qs.filter(kpi_yield__lt=Decimal(yield_lt))
+        except InvalidOperation:
+            pass
+
+    insp = (params.get("insp") or "").strip()
+    if insp == "none":
+        qs = qs.filter(outgoing_inspection__isnull=True)
+    elif insp == "pending":
+        qs = qs.filter(Q(outgoing_inspection__isnull=True) | ~Q(outgoing_inspection__status=OutgoingStatus.DONE))
+    elif insp in OutgoingStatus.values:
+        qs = qs.filter(outgoing_inspection__status=insp)
+
+    sort = (params.get("sort") or "").strip()
+    field = KPI_SORTS.get(sort.lstrip("-"))
+    if field:
+        desc = sort.startswith("-")
+        expr = F(field).desc(nulls_last=True) if desc else F(field).asc(nulls_last=True)
+        qs = qs.order_by(expr, "id")
+    else:
+        sort = ""
+        qs = qs.order_by(*default_order)
+    return qs, sort
@@ -0,0 +1,148 @@
+# quality/outgoing/packing.py
+"""
+잔량 BOX 자동 포장(할당)
+
+양품 수량을 받아
+  1) 같은 품목의 SHORT BOX(미출하·삭제 안됨)를 오래된 순으로 잠그고(select_for_update) 채운 뒤
+  2) 남은 수량은 최소 개수의 새 C-LOT BOX 로 연다 (LOT 번호는 reserve_lots 로 일괄 발급).
+BOX 수량/상태, 적재 이력, 이 검사의 BOX LOT, 계보 간선을 모두 bulk 로 기록한다.
+→ 2,000EA 포장도 쿼리 수는 BOX 수와 무관하게 일정(잠금 조회 1 + bulk 몇 회).
+
+sync_finished_lots() 가 '화면 제출값 = 최종 상태' 로 맞추는 것과 달리
+pack_good_qty() 는 주어진 수량을 '추가로' 포장한다. 호출 측에서 transaction.atomic 안에서 사용.
+"""
+from dataclasses import dataclass, field
+
+from django.utils import timezone
+
+from mis.lineage import add_edges, fill_edge
+from quality.inspections.models import (
+    FinishedBox,
+    FinishedBoxFill,
+    OutgoingFinishedLot,
+)
+from utils.lot import reserve_lots
+
+
+@dataclass
+class PackResult:
+    packed_qty: int = 0
+    topped_up: list = field(default_factory=list)   # [(lot_no, 채운 수량)]
+    opened: list = field(default_factory=list)      # [(lot_no, 수량)]
+
+    @property
+    def box_lots(self) -> list[str]:
+        return [lot for lot, _qty in self.topped_up] + [lot for lot, _qty in self.opened]
+
+
+def _box_status(qty: int, box_size: int) -> str:
+    return "FULL" if qty >= box_size else "SHORT"
+
+
+def pack_good_qty(inspection, workorder, product, qty: int, *, box_size: int,
+                  operator: str | None = None) -> PackResult:
+    """
+    qty(EA)를 product 의 BOX 에 포장한다.
+      - 기존 SHORT BOX: created_at, id 오름차순으로 각 BOX 의 box_size 까지 채움
+      - 새 BOX:         ceil(남은수량 / box_size) 개, 마지막 BOX 만 SHORT 가능
+    """
+    result = PackResult()
+    if qty <= 0:
+        return result
+    if box_size <= 0:
+        raise ValueError("포장수량(package_quantity)은 1 이상이어야 합니다.")
+
+    now = timezone.now()
+    remain = qty
+
+    box_update: list[FinishedBox] = []
+    fills: list[FinishedBoxFill] = []
+    edges: list[tuple] = []
+
+    # 1) 잔량 BOX 채우기 (행 잠금 — 동시 검사 저장 시 같은 BOX 초과 적재 방지)
+    short_boxes = (
+        FinishedBox.objects
+        .select_for_update()
+        .filter(product=product, status="SHORT", shipped=False, dlt_yn="N")
+        .order_by("created_at", "id")
+    )
+    for box in short_boxes:
+        if remain <= 0:
+            break
+        take = min(max(box.box_size - box.qty, 0), remain)
+        if take > 0:
+            box.qty += take
+            remain -= take
+            fills.append(FinishedBoxFill(
+                box=box, inspection=inspection, qty_added=take,
+                filled_at=now, operator=operator or "",
+            ))
+            edges.append(fill_edge(workorder, box, take))
+            result.topped_up.append((box.lot_no, take))
+        # 데이터상 이미 가득 찬 SHORT BOX 도 상태만 바로잡음
+        box.status = _box_status(box.qty, box.box_size)
+        box.updated_at = now
+        box_update.append(box)
+
+    # 2) 새 BOX 열기 (LOT 번호 블록 발급 1회)
+    new_boxes: list[FinishedBox] = []
+    if remain > 0:
+        count = -(-remain // box_size)
+        codes = reserve_lots("C", count, inspection.inspection_date)
+        for code in codes:
+            take = min(box_size, remain)
+            remain -= take
+            new_boxes.append(FinishedBox(
+                lot_no=code, product=product, box_size=box_size, qty=take,
+                status=_box_status(take, box_size), shipped=False, dlt_yn="N",
+            ))
+            result.opened.append((code, take))
+
+    # 3) 일괄 기록
+    if box_update:
+        FinishedBox.objects.bulk_update(box_update, ["qty", "status", "updated_at"])
+    if new_boxes:
+        FinishedBox.objects.bulk_create(new_boxes)
+        for box in new_boxes:
+            fills.append(FinishedBoxFill(
+                box=box, inspection=inspection, qty_added=box.qty,
+                filled_at=now, operator=operator or "",
+            ))
+            edges.append(fill_edge(workorder, box, box.qty))
+    if fills:
+        FinishedBoxFill.objects.bulk_create(fills)
+
+    _sync_inspection_lots(inspection, box_update + new_boxes, result.box_lots, operator)
+    add_edges(edges)
+
+    result.packed_qty = qty - remain
+    return result
+
+
+def _sync_inspection_lots(inspection, boxes, lots: list[str], operator: str | None):
+    """이번에 채운 BOX 를 이 검사의 BOX LOT(OutgoingFinishedLot)에 반영 (화면 복원용)"""
+    if not lots:
+        return
+    by_lot = {b.lot_no: b for b in boxes}
+    existing = {
+        row.finished_lot: row
+        for row in OutgoingFinishedLot.objects.filter(
+            inspection=inspection, dlt_yn="N", finished_lot__in=lots,
+        )
+    }
+    to_create, to_update = [], []
+    for lot in lots:
+        box = by_lot[lot]
+        row = existing.get(lot)
+        if row is None:
+            to_create.append(OutgoingFinishedLot(
+                inspection=inspection, finished_lot=lot, box_size=box.qty,
+                status=box.status, shipped=False, operator=operator, dlt_yn="N",
+            ))
+        elif row.box_size != box.qty or row.status != box.status:
+            row.box_size, row.status = box.qty, box.status
+            to_update.append(row)
+    if to_create:
+        OutgoingFinishedLot.objects.bulk_create(to_create)
+    if to_update:
+        OutgoingFinishedLot.objects.bulk_update(to_update, ["box_size", "status"])
@@ -0,0 +1,308 @@
+# quality/outgoing/sync.py
+"""
+출하검사 저장 diff 엔진
+
+현장 태블릿 자동저장마다 불량/BOX 행 전체를 지우고 다시 쓰지 않도록,
+화면 제출값과 DB 상태를 비교해 필요한 INSERT / UPDATE / DELETE 만 일괄 실행한다.
+- 불량:       (inspection, code) 기준 qty 비교
+- BOX LOT:    OutgoingFinishedLot(이 검사) ↔ payload LOT, 빠진 LOT 은 SOFT DELETE
+- BOX 마스터: FinishedBox 는 lot_no__in 1회 조회(select_for_update) 후 변경분만 bulk_update
+- 적재 이력:  FinishedBoxFill 은 (BOX, 이 검사)당 1행으로 맞춤 — 자동저장 반복 시 중복 적재 방지
+호출 측에서 transaction.atomic 안에서 사용한다.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from mis.lineage import remove_edges, set_edges
+from mis.models import LotType
+from quality.inspections.models import (
+    FinishedBox,
+    FinishedBoxFill,
+    OutgoingFinishedLot,
+    OutgoingInspectionDefect,
+)
+from utils.lot import reserve_lots
+
+LOT_PATTERN = re.compile(r"^C-\d{8}-\d{2,}$")
+
+
+def _to_int(value, default=0):
+    """빈값/콤마 포함 숫자 문자열을 안전하게 int로 변환."""
+    if value is None:
+        return default
+    if isinstance(value, int):
+        return value
+    try:
+        s = str(value).replace(",", "").strip()
+        return int(s) if s else default
+    except (ValueError, TypeError):
+        return default
+
+
+# ─────────────────────────────────────────────
+# 불량 코드별 수량
+# ─────────────────────────────────────────────
+
+def sync_defects(inspection, submitted: dict[str, int]) -> dict:
+    """
+    submitted: {code: qty} (qty<=0 은 '없음')
+    반환: {"created": n, "updated": n, "deleted": n}
+    """
+    wanted = {code: qty for code, qty in submitted.items() if qty > 0}
+    existing = {row.code: row for row in OutgoingInspectionDefect.objects.filter(inspection=inspection)}
+
+    to_create = [
+        OutgoingInspectionDefect(inspection=inspection, code=code, qty=qty)
+        for code, qty in wanted.items() if code not in existing
+    ]
+    to_update = []
+    for code, row in existing.items():
+        qty = wanted.get(code)
+        if qty is not None and row.qty != qty:
+            row.qty = qty
+            to_update.append(row)
+    delete_ids = [row.id for code, row in existing.items() if code not in wanted]
+
+    if to_create:
+        OutgoingInspectionDefect.objects.bulk_create(to_create)
+    if to_update:
+        OutgoingInspectionDefect.objects.bulk_update(to_update, ["qty"])
+    if delete_ids:
+        OutgoingInspectionDefect.objects.filter(id__in=delete_ids).delete()
+    return {"created": len(to_create), "updated": len(to_update), "deleted": len(delete_ids)}
+
+
+# ─────────────────────────────────────────────
+# BOX LOT / BOX 마스터 / 적재 이력
+# ─────────────────────────────────────────────
+
+@dataclass
+class _BoxItem:
+    lot: str            # 기존 C-LOT (새 BOX 면 "")
+    qty: int            # OutgoingFinishedLot.box_size / FinishedBox.qty
+    status: str         # FULL / SHORT
+    residual: bool      # 잔량 BOX 채우기
+    fill_qty: int       # 이번 검사에서 이 BOX 에 채운 수량 (잔량 BOX 만 의미)
+
+
+def parse_box_payload(payload: list[dict]) -> list[_BoxItem]:
+    """화면 payload → 정규화된 BOX 목록 (qty<=0 제외, 같은 LOT 은 마지막 값)"""
+    items: list[_BoxItem] = []
+    seen: dict[str, int] = {}
+    for item in payload:
+        qty = _to_int(item.get("qty"))
+        if qty <= 0:
+            continue
+        status = (item.get("status") or "FULL").strip()
+        if status not in ("FULL", "SHORT"):
+            status = "FULL"
+        raw_lot = (item.get("lot") or "").strip()
+        lot = raw_lot if LOT_PATTERN.match(raw_lot) else ""
+        residual = bool(item.get("isResidual")) and bool(lot)
+        if residual:
+            add_qty = _to_int(item.get("add_qty"))
+            qty = max(_to_int(item.get("base_qty")) + add_qty, 0)
+            box = _BoxItem(lot, qty, status, True, max(add_qty, 0))
+        else:
+            box = _BoxItem(lot, qty, status, False, qty)
+        if lot and lot in seen:
+            items[seen[lot]] = box
+            continue
+        if lot:
+            seen[lot] = len(items)
+        items.append(box)
+    return items
+
+
+def residual_fills(inspection, lots: list[str]) -> dict[str, int]:
+    """
+    화면 복원용: 이 검사의 BOX LOT 중 다른 검사도 적재한 BOX(= 잔량 BOX 채우기) → 이 검사가 채운 수량
+    OutgoingFinishedLot.box_size 는 BOX 전체 수량이므로, 복원 시 isResidual/add_qty 를 되살려야
+    다음 저장에서 BOX 전체가 이번 양품으로 잡히지 않는다.
+    """
+    if not lots:
+        return {}
+    mine: dict[str, int] = {}
+    shared: set[str] = set()
+    for lot_no, insp_id, qty in (
+        FinishedBoxFill.objects
+        .filter(box__lot_no__in=lots, box__dlt_yn="N")
+        .values_list("box__lot_no", "inspection_id")
+        .annotate(qty=Sum("qty_added"))
+        .order_by()
+    ):
+        if insp_id == inspection.pk:
+            mine[lot_no] = mine.get(lot_no, 0) + (qty or 0)
+        else:
+            shared.add(lot_no)
+    return {lot: mine.get(lot, 0) for lot in shared}
+
+
+def sync_finished_lots(inspection, workorder, product, box_size: int, payload: list[dict],
+                       *, operator: str | None) -> dict:
+    """
+    payload 와 DB 를 비교해 BOX LOT/마스터/적재 이력을 맞춘다.
+      - 잔량 BOX:        FinishedBox 수량/상태 갱신 + (BOX, 이 검사) 적재 이력 = add_qty
+      - 이 검사의 기존 LOT: 수량/상태가 바뀐 경우만 LOT·BOX 갱신
+      - 새 BOX:          C-LOT 일괄 발급 → LOT/BOX/적재 이력 bulk_create
+      - 화면에서 빠진 LOT: SOFT DELETE (+ BOX 비활성, 계보 간선 제거)
+    """
+    items = parse_box_payload(payload)
+    now = timezone.now()
+
+    existing = {
+        row.finished_lot: row
+        for row in OutgoingFinishedLot.objects.filter(inspection=inspection, dlt_yn="N")
+    }
+
+    # 잔량 BOX 또는 이 검사의 기존 LOT 만 기존 BOX 로 취급, 나머지는 새 BOX
+    known: list[_BoxItem] = []
+    new_items: list[_BoxItem] = []
+    for it in items:
+        (known if it.lot and (it.residual or it.lot in existing) else new_items).append(it)
+
+    boxes = {
+        b.lot_no: b
+        for b in FinishedBox.objects.select_for_update().filter(
+            lot_no__in=[it.lot for it in known], dlt_yn="N",
+        )
+    }
+
+    lot_create: list[OutgoingFinishedLot] = []
+    lot_update: list[OutgoingFinishedLot] = []
+    box_update: list[FinishedBox] = []
+    kept: set[str] = set()
+    residual_fill: dict[int, int] = {}     # box_id → 이 검사에서 채운 수량
+
+    for it in known:
+        kept.add(it.lot)
+        row = existing.get(it.lot)
+        if row is None:
+            lot_create.append(OutgoingFinishedLot(
+                inspection=inspection, finished_lot=it.lot, box_size=it.qty,
+                status=it.status, shipped=False, operator=operator, dlt_yn="N",
+            ))
+        elif row.box_size != it.qty or row.status != it.status:
+            row.box_size, row.status = it.qty, it.status
+            lot_update.append(row)
+
+        box = boxes.get(it.lot)
+        if box is None:
+            continue
+        if box.qty != it.qty or box.status != it.status:
+            box.qty, box.status = it.qty, it.status
+            box.updated_at = now
+            box_update.append(box)
+        if it.residual:
+            residual_fill[box.id] = it.fill_qty
+
+    # 새 BOX: LOT 번호 일괄 발급
+    new_boxes: list[FinishedBox] = []
+    if new_items:
+        codes = reserve_lots("C", len(new_items), inspection.inspection_date)
+        for code, it in zip(codes, new_items):
+            kept.add(code)
+            lot_create.append(OutgoingFinishedLot(
+                inspection=inspection, finished_lot=code, box_size=it.qty,
+                status=it.status, shipped=False, operator=operator, dlt_yn="N",
+            ))
+            new_boxes.append(FinishedBox(
+                lot_no=code, product=product, box_size=box_size, qty=it.qty,
+                status=it.status, shipped=False, dlt_yn="N",
+            ))
+
+    if lot_create:
+        OutgoingFinishedLot.objects.bulk_create(lot_create)
+    if lot_update:
+        OutgoingFinishedLot.objects.bulk_update(lot_update, ["box_size", "status"])
+    if box_update:
+        FinishedBox.objects.bulk_update(box_update, ["qty", "status", "updated_at"])
+
+    # 적재 이력: 새 BOX 는 전량, 잔량 BOX 는 (BOX, 이 검사)당 1행으로 diff
+    fill_create: list[FinishedBoxFill] = []
+    edge_set: list[tuple] = []
+    edge_remove: list[tuple] = []
+    if new_boxes:
+        FinishedBox.objects.bulk_create(new_boxes)
+        for box in new_boxes:
+            fill_create.append(FinishedBoxFill(
+                box=box, inspection=inspection, qty_added=box.qty, filled_at=now,
+            ))
+            edge_set.append((LotType.WORK, workorder.work_lot, LotType.CLOT, box.lot_no, box.qty))
+
+    fill_update: list[FinishedBoxFill] = []
+    fill_delete: list[int] = []
+    if residual_fill:
+        fills_by_box: dict[int, list[FinishedBoxFill]] = {}
+        for f in (
+            FinishedBoxFill.objects
+            .filter(inspection=inspection, box_id__in=list(residual_fill))
+            .order_by("box_id", "id")
+        ):
+            fills_by_box.setdefault(f.box_id, []).append(f)
+        lot_by_box = {b.id: b.lot_no for b in boxes.values()}
+
+        for box_id, want in residual_fill.items():
+            rows = fills_by_box.get(box_id, [])
+            have = sum(f.qty_added for f in rows)
+            if have == want and len(rows) <= 1:
+                continue
+            lot_no = lot_by_box[box_id]
+            if want <= 0:
+                fill_delete.extend(f.id for f in rows)
+                edge_remove.append((LotType.WORK, workorder.work_lot, LotType.CLOT, lot_no))
+                continue
+            if rows:
+                first, extra = rows[0], rows[1:]
+                first.qty_added = want
+                first.filled_at = now
+                fill_update.append(first)
+                fill_delete.extend(f.id for f in extra)
+            else:
+                fill_create.append(FinishedBoxFill(
+                    box_id=box_id, inspection=inspection, qty_added=want, filled_at=now,
+                ))
+            edge_set.append((LotType.WORK, workorder.work_lot, LotType.CLOT, lot_no, want))
+
+    if fill_create:
+        FinishedBoxFill.objects.bulk_create(fill_create)
+    if fill_update:
+        FinishedBoxFill.objects.bulk_update(fill_update, ["qty_added", "filled_at"])
+    if fill_delete:
+        FinishedBoxFill.objects.filter(id__in=fill_delete).delete()
+
+    # 화면에서 빠진 LOT → SOFT DELETE
+    removed_lots = [lot for lot in existing if lot not in kept]
+    if removed_lots:
+        OutgoingFinishedLot.objects.filter(
+            inspection=inspection, dlt_yn="N", finished_lot__in=removed_lots,
+        ).update(
+            dlt_yn="Y", dlt_at=now, dlt_user=operator,
+            dlt_reason="출하검사(현장) 화면에서 삭제",
+        )
+        # BOX 마스터도 함께 비활성화 (현재는 1:1 매핑이므로 그대로 Y 처리)
+        FinishedBox.objects.filter(lot_no__in=removed_lots).update(
+            dlt_yn="Y", dlt_at=now, dlt_user=operator,
+            dlt_reason="출하검사(현장) BOX 삭제 연동",
+        )
+        edge_remove.extend(
+            (LotType.WORK, workorder.work_lot, LotType.CLOT, lot) for lot in removed_lots
+        )
+
+    set_edges(edge_set)
+    if edge_remove:
+        remove_edges(edge_remove)
+
+    return {
+        "lots_created": len(lot_create),
+        "lots_updated": len(lot_update),
+        "lots_removed": len(removed_lots),
+        "boxes_created": len(new_boxes),
+        "boxes_updated": len(box_update),
+        "fills_created": len(fill_create),
+        "fills_updated": len(fill_update),
+        "fills_deleted": len(fill_delete),
+    }
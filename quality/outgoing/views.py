@@ -1,10 +1,10 @@
 # quality/outgoing/views.py
 from datetime import timedelta
 from datetime import date
-import re
-
-from django.db import IntegrityError
 
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Q, Sum
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.decorators.http import require_GET, require_http_methods
 from django.utils.dateparse import parse_date
@@ -25,29 +25,18 @@ from quality.inspections.models import (
     InspectionResult,
     OutgoingFinishedLot,
     FinishedBox,        # ✅ 추가
-    FinishedBoxFill,    # ✅ 추가
 )
-
-
-# 제품에 package_quantity 없을 때만 쓰는 기본값
-DEFAULT_BOX_SIZE = 24
-
-def _to_int(value, default=0):
-    """빈값/콤마 포함 숫자 문자열을 안전하게 int로 변환."""
-    if value is None:
-        return default
-    if isinstance(value, int):
-        return value
-    try:
-        s = str(value).replace(",", "").strip()
-        return int(s) if s else default
-    except (ValueError, TypeError):
-        return default
+from utils.lot import next_lot
+from quality.defects.rollups import refresh_outgoing_for
+from quality.outgoing.kpi import DEFAULT_BOX_SIZE, apply_kpi_params, with_outgoing_kpis
+from quality.outgoing.packing import pack_good_qty
+from quality.outgoing.sync import _to_int, residual_fills, sync_defects, sync_finished_lots
 
 
 def _get_outgoing_list_context(request):
     """
     출하검사 리스트 공통 컨텍스트 (PC/현장 공용)
+    잔여수량/BOX 수/수율 등은 with_outgoing_kpis() 로 SQL 에서 계산 (정렬/필터 가능)
     """
     d_str = (request.GET.get("d") or "").strip()
     try:
@@ -57,7 +46,7 @@ def _get_outgoing_list_context(request):
 
     start_dt, end_dt = _day_range_for(query_date)
 
-    orders_qs = (
+    orders_qs = with_outgoing_kpis(
         WorkOrder.objects
         .filter(
             planned_start__gte=start_dt,
@@ -65,53 +54,14 @@ def _get_outgoing_list_context(request):
             status="완료",  # 생산완료만 대상
         )
         .select_related("product", "customer", "outgoing_inspection")
-        .order_by("planned_start", "created_at", "id")
     )
-
-    # 상세 화면 카드와 동일한 값 계산을 위해
-    # 각 WorkOrder 객체에 계산 결과를 얹어서 전달
+    orders_qs, sort = apply_kpi_params(orders_qs, request.GET)
     orders = list(orders_qs)
 
-    for o in orders:
-        # 계획검사수량(지시수량) = 작업수량
-        plan_qty = o.order_qty or 0
-
-        # 박스당 포장수량
-        product = getattr(o, "product", None)
-        box_size = getattr(product, "package_quantity", None) or DEFAULT_BOX_SIZE
-        o.box_size_for_outgoing = box_size
-
-        insp = getattr(o, "outgoing_inspection", None)
-
-        remain_qty = None          # 미검사 잔여수량
-        finished_box_cnt = None    # 포장완료 BOX 수
-        # 포장완료수량은 insp.good_qty 그대로 사용
-
-        if insp is not None:
-            adjust = insp.adjust_qty or 0
-            good = insp.good_qty or 0
-            defect = insp.defect_qty or 0
-            loss = insp.loss_qty or 0
-
-            # 상세화면 로직과 동일:
-            # actual_total = PLAN + adjust
-            # raw_inspect = good + defect + loss
-            # remain = max(actual_total - raw_inspect, 0)
-            actual_total = plan_qty + adjust
-            raw_inspect = good + defect + loss
-            remain_qty = max(actual_total - raw_inspect, 0)
-
-            # 포장완료 BOX 수 = good / BOX_SIZE
-            if box_size > 0:
-                finished_box_cnt = good // box_size
-            else:
-                finished_box_cnt = 0
-
-        o.remain_qty_for_outgoing = remain_qty
-        o.finished_box_cnt_for_outgoing = finished_box_cnt
-
     return {
         "orders": orders,
+        "sort": sort,
+        "remain": request.GET.get("remain") or "",
         "query_date": query_date,
         "prev_date": query_date - timedelta(days=1),
         "next_date": query_date + timedelta(days=1),
@@ -121,60 +71,14 @@ def _next_finished_lot_code(inspect_date: date | None) -> str:
     """
     C-YYYYMMDD-XX 형식의 LOT 번호를 생성한다.
     - YYYYMMDD: 검사일(inspection_date) 기준, 없으면 오늘 날짜
-    - XX     : 해당 날짜 기준 증가하는 2자리 시퀀스
+    - XX     : 해당 날짜 기준 증가하는 시퀀스(최소 2자리, 카운터 블록 발급)
 
-    ⚠ 단계적 이관을 위해
-    - 새 마스터 테이블 FinishedBox.lot_no
-    - 기존 OutgoingFinishedLot.finished_lot
-    둘을 모두 조회해서 가장 큰 시퀀스를 기준으로 다음 번호를 만든다.
+    ⚠ 카운터 행이 처음 만들어질 때 FinishedBox.lot_no / OutgoingFinishedLot.finished_lot
+      양쪽의 최대값을 시작점으로 삼으므로 기존 번호와 겹치지 않는다.
     """
-
     if inspect_date is None:
         inspect_date = timezone.localdate()
-
-    base = inspect_date.strftime("%Y%m%d")
-    prefix = f"C-{base}-"
-
-    # 1) 새 구조: FinishedBox 기준으로 가장 마지막 LOT 가져오기
-    last_box_code = (
-        FinishedBox.objects.filter(
-            lot_no__startswith=prefix,
-            dlt_yn="N",
-        )
-        .order_by("-lot_no")
-        .values_list("lot_no", flat=True)
-        .first()
-    )
-
-    # 2) 기존 구조: OutgoingFinishedLot 기준(과거/기존 데이터용)
-    last_old_code = (
-        OutgoingFinishedLot.objects.filter(
-            finished_lot__startswith=prefix,
-            dlt_yn="N",
-        )
-        .order_by("-finished_lot")
-        .values_list("finished_lot", flat=True)
-        .first()
-    )
-
-    # 3) 두 쪽에서 가져온 코드들 중 가장 큰 시퀀스를 찾는다.
-    candidates: list[str] = []
-    if last_box_code:
-        candidates.append(last_box_code)
-    if last_old_code:
-        candidates.append(last_old_code)
-
-    last_seq = 0
-    for code in candidates:
-        try:
-            seq = int(code.split("-")[-1])
-        except (ValueError, AttributeError):
-            continue
-        if seq > last_seq:
-            last_seq = seq
-
-    new_seq = last_seq + 1
-    return f"{prefix}{new_seq:02d}"
+    return next_lot("C", inspect_date)
 
 
 @require_GET
@@ -195,6 +99,79 @@ def outgoing_site_list(request):
     return render(request, "quality/outgoing/outgoing_site_list.html", ctx)
 
 
+RANGE_MAX_DAYS = 93        # 기간 목록 최대 조회일수
+RANGE_PAGE_SIZE = 50
+
+
+@require_GET
+def outgoing_range_list(request):
+    """
+    출하검사 기간 목록 (관리자) — 여러 작업일의 생산완료 LOT KPI 를 SQL 로 계산
+    GET: start, end(작업일, 기본 최근 7일), customer, product,
+         remain / yield_lt / insp / sort (apply_kpi_params 참고), page
+    """
+    today = _today_localdate()
+    end = parse_date(request.GET.get("end") or "") or today
+    start = parse_date(request.GET.get("start") or "") or (end - timedelta(days=6))
+    if end < start:
+        start, end = end, start
+    if (end - start).days >= RANGE_MAX_DAYS:
+        start = end - timedelta(days=RANGE_MAX_DAYS - 1)
+
+    start_dt, _ = _day_range_for(start)
+    _, end_dt = _day_range_for(end)
+
+    qs = WorkOrder.objects.filter(
+        planned_start__gte=start_dt,
+        planned_start__lt=end_dt,
+        status="완료",
+    )
+    customer = (request.GET.get("customer") or "").strip()
+    product = (request.GET.get("product") or "").strip()
+    if customer:
+        qs = qs.filter(customer__name__icontains=customer)
+    if product:
+        qs = qs.filter(Q(product__name__icontains=product) | Q(product__part_number__icontains=product))
+
+    qs, sort = apply_kpi_params(with_outgoing_kpis(qs), request.GET)
+
+    # 기간 합계 (페이지와 무관, 쿼리 1회)
+    totals = qs.aggregate(
+        lots=Count("id"),
+        actual=Sum("kpi_actual_total"),
+        inspected=Sum("kpi_inspected"),
+        good=Sum("kpi_good"),
+        remain=Sum("kpi_remain"),
+        boxes=Sum("kpi_box_cnt"),
+    )
+    totals["yield"] = (
+        round(totals["good"] * 100 / totals["inspected"], 1) if totals["inspected"] else None
+    )
+
+    paginator = Paginator(qs.select_related("product", "customer", "outgoing_inspection"), RANGE_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get("page") or 1)
+
+    q = request.GET.copy()
+    q.pop("page", None)
+
+    ctx = {
+        "orders": page_obj.object_list,
+        "page_obj": page_obj,
+        "querystring": q.urlencode(),
+        "totals": totals,
+        "start": start,
+        "end": end,
+        "customer": customer,
+        "product": product,
+        "sort": sort,
+        "remain": request.GET.get("remain") or "",
+        "yield_lt": request.GET.get("yield_lt") or "",
+        "insp": request.GET.get("insp") or "",
+        "status_choices": OutgoingStatus.choices,
+    }
+    return render(request, "quality/outgoing/outgoing_range_list.html", ctx)
+
+
 @require_http_methods(["GET", "POST"])
 def outgoing_inspect(request, workorder_id: int, mode: str = "admin"):
     """
@@ -239,6 +216,7 @@ def outgoing_inspect(request, workorder_id: int, mode: str = "admin"):
     # ------------------------------------------------------------------ #
     if request.method == "POST":
         action = (request.POST.get("action") or "save").strip() or "save"
+        prev_date = inspection.inspection_date   # 불량 집계: 검사일 변경 시 이전 일자도 재계산
 
         # ---------------- 삭제 (검사 전체 삭제) ----------------
         if action == "delete":
@@ -248,6 +226,7 @@ def outgoing_inspect(request, workorder_id: int, mode: str = "admin"):
                 inspection__workorder=workorder
             ).delete()
             inspection.delete()
+            refresh_outgoing_for(workorder, prev_date)
 
             redirect_name = (
                 "quality:outgoing_site_list"
@@ -300,21 +279,13 @@ def outgoing_inspect(request, workorder_id: int, mode: str = "admin"):
         else:
             qtys = qtys[: len(codes)]
 
-        defect_rows: list[OutgoingInspectionDefect] = []
-        total_defect_qty = 0
-
+        defect_map: dict[str, int] = {}
         for code, qty_str in zip(codes, qtys):
             qty = _to_int(qty_str, default=0)
             if qty <= 0:
                 continue
-            total_defect_qty += qty
-            defect_rows.append(
-                OutgoingInspectionDefect(
-                    inspection=inspection,
-                    code=code,
-                    qty=qty,
-                )
-            )
+            defect_map[code] = defect_map.get(code, 0) + qty
+        total_defect_qty = sum(defect_map.values())
 
         # 3) BOX LOT payload(JSON) 파싱
         raw_finished = (request.POST.get("finished_lots_payload") or "").strip()
@@ -341,7 +312,6 @@ def outgoing_inspect(request, workorder_id: int, mode: str = "admin"):
         for item in finished_payload:
             is_residual = bool(item.get("isResidual"))
             qty       = _to_int(item.get("qty"), default=0)
-            base_qty  = _to_int(item.get("base_qty"), default=0)
             add_qty   = _to_int(item.get("add_qty"), default=0)
 
             if is_residual:
@@ -351,7 +321,10 @@ def outgoing_inspect(request, workorder_id: int, mode: str = "admin"):
                 # 일반 BOX: 화면의 qty 전체를 이번 작업 검사 양품으로 인정
                 completed_qty += max(qty, 0)
 
-        good_qty = max(completed_qty, 0)
+        # 자동 포장 요청 수량(잔량 BOX → 새 BOX 순으로 서버에서 배분) – 이번 작업 양품에 포함
+        auto_pack_qty = max(_to_int(request.POST.get("auto_pack_qty"), default=0), 0)
+
+        good_qty = max(completed_qty + auto_pack_qty, 0)
 
         # 4-1) 실측 검사수 = 양품 + 불량 + LOSS
         raw_inspect_qty = good_qty + total_defect_qty + loss_qty
@@ -381,207 +354,25 @@ def outgoing_inspect(request, workorder_id: int, mode: str = "admin"):
         inspection.good_qty = good_qty
         inspection.hold_qty = 0      # HOLD 개념 폐지
 
-        # 7) DB 저장
-        #   7-1) 불량 상세
-        OutgoingInspectionDefect.objects.filter(inspection=inspection).delete()
-        if defect_rows:
-            OutgoingInspectionDefect.objects.bulk_create(defect_rows)
-
-        #   7-2) 헤더 저장
-        inspection.save()
-
-        #   7-3) BOX LOT 동기화
-        #   - OutgoingFinishedLot : 기존처럼 유지
-        #   - FinishedBox         : LOT(BOX) 마스터 1:1 생성/갱신
-        #   - FinishedBoxFill     : 이 출하검사에서 해당 BOX 에 채운 수량 기록
-
-        #   7-3-0) 기존 BOX/LOT 조회
-        existing_qs = OutgoingFinishedLot.objects.filter(
-            inspection=inspection,
-            dlt_yn="N",
+        # 7) DB 저장 — 제출값과 DB 를 비교해 바뀐 행만 일괄 반영 (quality.outgoing.sync)
+        operator = (
+            request.user.username
+            if getattr(request, "user", None) and request.user.is_authenticated
+            else None
         )
-        existing_map: dict[str, OutgoingFinishedLot] = {
-            row.finished_lot: row for row in existing_qs
-        }
-        kept_codes: set[str] = set()
-
-        lot_pattern = re.compile(r"^C-\d{8}-\d{2}$")
-        inspect_date = inspection.inspection_date
-
-        for item in finished_payload:
-            qty = _to_int(item.get("qty"), default=0)
-            if qty <= 0:
-                continue
-
-            status_code = (item.get("status") or "FULL").strip()
-            if status_code not in ("FULL", "SHORT"):
-                status_code = "FULL"
-
-            raw_lot    = (item.get("lot") or "").strip()
-            is_residual = bool(item.get("isResidual"))
-            base_qty   = _to_int(item.get("base_qty"), default=0)
-            add_qty    = _to_int(item.get("add_qty"), default=0)
-
-            # -------------------------------------------------------
-            # 7-3-1) 잔량 BOX(C-LOT) 처리
-            #   - FinishedBox(lot_no=raw_lot) UPDATE
-            #   - FinishedBoxFill(이번 작업에서 채운 수량) INSERT
-            #   - OutgoingFinishedLot(이번 검사와 LOT 연결) UPSERT
-            # -------------------------------------------------------
-            if is_residual and raw_lot and lot_pattern.match(raw_lot):
-                final_qty = max(base_qty + add_qty, 0)
-
-                # BoxMaster(FinishedBox) 갱신
-                try:
-                    box = FinishedBox.objects.get(lot_no=raw_lot, dlt_yn="N")
-                except FinishedBox.DoesNotExist:
-                    box = None
-
-                if box is not None:
-                    box.qty = final_qty
-                    box.status = status_code
-                    # product / box_size / shipped 는 그대로 유지
-                    box.save()
-
-                    # 이번 작업에서 채운 수량이 있다면 Fill 이력 추가
-                    if add_qty > 0:
-                        FinishedBoxFill.objects.create(
-                            box=box,
-                            inspection=inspection,
-                            qty_added=add_qty,
-                            filled_at=timezone.now(),
-                        )
-
-                # 이 검사와 LOT 연결(OutgoingFinishedLot)
-                obj = existing_map.get(raw_lot)
-                if obj is not None:
-                    obj.box_size = final_qty
-                    obj.status = status_code
-                    obj.shipped = obj.shipped
-                    obj.dlt_yn = "N"
-                    obj.dlt_at = None
-                    obj.dlt_user = None
-                    obj.dlt_reason = ""
-                    obj.save()
-                else:
-                    obj = OutgoingFinishedLot.objects.create(
-                        inspection=inspection,
-                        finished_lot=raw_lot,
-                        box_size=final_qty,
-                        status=status_code,
-                        shipped=False,
-                        operator=(
-                            request.user.username
-                            if getattr(request, "user", None)
-                            and request.user.is_authenticated
-                            else None
-                        ),
-                        dlt_yn="N",
-                    )
-
-                kept_codes.add(obj.finished_lot)
-                continue  # 잔량 BOX 처리 끝
-
-            # -------------------------------------------------------
-            # 7-3-2) 일반 BOX 처리 (임시포장 + 기존 C-코드)
-            #   - C-코드이고 이 검사에 이미 존재 → OutgoingFinishedLot/FinishedBox UPDATE
-            #   - 그 외(임시포장) → 새 LOT 발급 + FinishedBox/FinishedBoxFill CREATE
-            # -------------------------------------------------------
-            obj = None
-
-            if raw_lot and lot_pattern.match(raw_lot):
-                # 이 검사에서 이미 존재하던 LOT → UPDATE
-                obj = existing_map.get(raw_lot)
-                if obj is not None:
-                    obj.box_size = qty
-                    obj.status = status_code
-                    obj.shipped = obj.shipped
-                    obj.dlt_yn = "N"
-                    obj.dlt_at = None
-                    obj.dlt_user = None
-                    obj.dlt_reason = ""
-                    obj.save()
-
-                    # BoxMaster 도 있으면 qty/status 동기화
-                    try:
-                        box = FinishedBox.objects.get(lot_no=raw_lot, dlt_yn="N")
-                    except FinishedBox.DoesNotExist:
-                        box = None
-                    if box is not None:
-                        box.qty = qty
-                        box.status = status_code
-                        box.save()
-
-                    kept_codes.add(obj.finished_lot)
-                    continue  # 기존 LOT 업데이트만 하고 다음 item 으로
-
-            # 여기까지 왔으면 "새 BOX" 이므로 LOT 코드를 발급
-            while True:
-                lot_no = _next_finished_lot_code(inspect_date)
-                try:
-                    obj = OutgoingFinishedLot.objects.create(
-                        inspection=inspection,
-                        finished_lot=lot_no,
-                        box_size=qty,         # 실제 박스 수량
-                        status=status_code,
-                        shipped=False,
-                        operator=(
-                            request.user.username
-                            if getattr(request, "user", None)
-                            and request.user.is_authenticated
-                            else None
-                        ),
-                        dlt_yn="N",
-                    )
-
-                    # BoxMaster(FinishedBox) 생성
-                    box = FinishedBox.objects.create(
-                        lot_no=lot_no,
-                        product=product,
-                        box_size=box_size,   # 기준 BOX 수량
-                        qty=qty,             # 현재 담긴 수량
-                        status=status_code,
-                        shipped=False,
-                        dlt_yn="N",
-                    )
-                    # 이번 작업에서 전량을 채운 이력
-                    FinishedBoxFill.objects.create(
-                        box=box,
-                        inspection=inspection,
-                        qty_added=qty,
-                        filled_at=timezone.now(),
-                    )
-
-                    kept_codes.add(obj.finished_lot)
-                    break
-                except IntegrityError:
-                    # 동시에 같은 LOT 번호를 발급받은 경우 → 다음 번호로 재시도
-                    continue
-
-        # 7-3-3) 기존 LOT 중 화면에 없는 것들 → SOFT DELETE
-        removed_qs = existing_qs.exclude(finished_lot__in=kept_codes)
-        if removed_qs.exists():
-            now = timezone.now()
-            dlt_user = operator_name
-
-            removed_lots = list(
-                removed_qs.values_list("finished_lot", flat=True)
-            )
-
-            removed_qs.update(
-                dlt_yn="Y",
-                dlt_at=now,
-                dlt_user=dlt_user,
-                dlt_reason="출하검사(현장) 화면에서 삭제",
-            )
-
-            # BOX 마스터도 함께 비활성화 (현재는 1:1 매핑이므로 그대로 Y 처리)
-            FinishedBox.objects.filter(lot_no__in=removed_lots).update(
-                dlt_yn="Y",
-                dlt_at=now,
-                dlt_user=dlt_user,
-                dlt_reason="출하검사(현장) BOX 삭제 연동",
+        with transaction.atomic():
+            inspection.save()
+            sync_defects(inspection, defect_map)
+            sync_finished_lots(
+                inspection, workorder, product, box_size, finished_payload,
+                operator=operator,
             )
+            if auto_pack_qty:
+                pack_good_qty(
+                    inspection, workorder, product, auto_pack_qty,
+                    box_size=box_size, operator=operator,
+                )
+            refresh_outgoing_for(workorder, prev_date)
 
         # 8) 저장 후 자기 자신으로 리다이렉트
         redirect_name = (
@@ -619,17 +410,27 @@ def outgoing_inspect(request, workorder_id: int, mode: str = "admin"):
         dlt_yn="N",
     ).order_by("id")
 
+    lots = list(lot_qs)
+    # 잔량 BOX 를 채운 LOT: 이 검사가 채운 수량(add_qty)만 양품으로 잡히도록 잔량 정보 복원
+    fills = residual_fills(inspection, [lot.finished_lot for lot in lots])
+
     finished_payload: list[dict] = []
-    for idx, lot in enumerate(lot_qs, start=1):
-        finished_payload.append(
-            {
-                "seq": idx,
-                "lot": lot.finished_lot,   # 이미 발급된 LOT 번호
-                "qty": lot.box_size,       # 실제 수량
-                "box_size": box_size,      # 기준 박스 수량
-                "status": lot.status,      # FULL / SHORT 코드
-            }
-        )
+    for idx, lot in enumerate(lots, start=1):
+        item = {
+            "seq": idx,
+            "lot": lot.finished_lot,   # 이미 발급된 LOT 번호
+            "qty": lot.box_size,       # 실제 수량
+            "box_size": box_size,      # 기준 박스 수량
+            "status": lot.status,      # FULL / SHORT 코드
+        }
+        if lot.finished_lot in fills:
+            add_qty = fills[lot.finished_lot]
+            item.update(
+                isResidual=True,
+                base_qty=max(lot.box_size - add_qty, 0),   # 다른 검사까지 적재된 수량
+                add_qty=add_qty,                           # 이 검사에서 채운 수량
+            )
+        finished_payload.append(item)
     finished_lots_json = json.dumps(finished_payload, ensure_ascii=False)
 
     # ✅ 동일 품목의 잔량 BOX(= SHORT, 미출하, 삭제 안됨) 목록
@@ -2,6 +2,7 @@
 from django.urls import path
 from . import views
 from .outgoing import views as outgoing_views  # 출하검사용 views
+from .defects import views as defect_views      # 불량 Pareto
 
 app_name = "quality"
 
@@ -12,6 +13,9 @@ urlpatterns = [
     # 목록 엑셀(CSV) 다운로드
     path("incoming/export/", views.incoming_export, name="incoming_export"),
 
+    # 불합격 사유코드 검색 API (JSON)
+    path("incoming/defects/search/", views.incoming_defect_search, name="incoming_defect_search"),
+
     # 검사 팝업(배송상세 반복)
     path(
         "incoming/<int:order_id>/inspect/",
@@ -29,6 +33,9 @@ urlpatterns = [
     # 출하검사 목록 (관리자용)
     path("outgoing/", outgoing_views.outgoing_list, name="outgoing_list"),
 
+    # 출하검사 기간 현황 (KPI 정렬/필터)
+    path("outgoing/range/", outgoing_views.outgoing_range_list, name="outgoing_range_list"),
+
     # 출하검사 목록 (현장용)
     path(
         "outgoing/site/",
@@ -50,4 +57,7 @@ urlpatterns = [
         {"mode": "site"},
         name="outgoing_site_inspect",
     ),
+
+    # ───────── 불량 Pareto / 추이 (일별 집계) ─────────
+    path("defects/pareto/", defect_views.defect_pareto, name="defect_pareto"),
 ]
@@ -1,10 +1,9 @@
 # quality/views.py
 from __future__ import annotations
 
-import csv
 from datetime import date, datetime, timedelta
 from types import SimpleNamespace
-from typing import Dict, Optional
+from typing import Optional
 
 from django.contrib import messages
 from django.core.paginator import Paginator
@@ -12,19 +11,27 @@ from django.db import transaction
 from django.db.models import (
     Case,
     CharField,
+    Count,
     DateTimeField,
+    Exists,
     OuterRef,
     Prefetch,
+    Q,
     Subquery,
     Sum,
     Value,
     When,
 )
-from django.http import HttpResponse
+from django.db.models.expressions import RawSQL
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
-from injectionorder.models import InjectionOrder, FlowStatus
+from injectionorder.models import InjectionOrder, InjectionOrderItem, FlowStatus
+from utils.export import stream_queryset_csv
+
+from .defects.rollups import refresh_incoming_for_order
 
 # 검사 헤더 + 라인
 from .inspections.models import (
@@ -69,52 +76,98 @@ HAS_SHIPMENT_FIELD: bool = any(
 )
 
 
-def _latest_inspection(order: InjectionOrder, shipment_id: Optional[int]) -> Optional[IncomingInspection]:
-    """주문(+선택 배송상세)에 대한 최신 검사 1건."""
-    qs = IncomingInspection.objects.filter(order=order)
-    if HAS_SHIPMENT_FIELD and shipment_id is not None:
-        qs = qs.filter(shipment_id=shipment_id)
-    return qs.order_by("-created_at", "-id").first()
+def _latest_per_shipment(order_ids):
+    """
+    주문별·배송상세별 최신 검사 (PostgreSQL DISTINCT ON — 쿼리 1회).
+    인덱스 (order, shipment_id, created_at) 를 그대로 타는 정렬 순서.
+    """
+    return (
+        IncomingInspection.objects
+        .filter(order_id__in=list(order_ids))
+        .order_by("order_id", "shipment_id", "-created_at", "-id")
+        .distinct("order_id", "shipment_id")
+    )
 
 
-def _aggregate_status_from_latest_per_shipment(order: InjectionOrder) -> tuple[str, Optional[datetime]]:
+# '배송상세별 최신 검사' → 주문 집계 상태 (상관 서브쿼리, 주문 1행당 인덱스 범위 스캔 1회)
+#   - 아무 검사도 없으면  → '미실시'
+#   - 전부 PASS          → '합격'
+#   - PASS + (그 외) 공존 → '부분합격'
+#   - PASS 없음 & FAIL만 → '불합격'
+#   - PASS 없음 & HOLD 有 → '보류'
+#   - 그 외               → '대기'
+_INCOMING_STATUS_SQL = f"""
+SELECT CASE
+    WHEN count(*) = 0 THEN '미실시'
+    WHEN bool_and(t.status = %s) THEN '합격'
+    WHEN bool_or(t.status = %s) THEN '부분합격'
+    WHEN bool_and(t.status = %s) THEN '불합격'
+    WHEN bool_or(t.status = %s) THEN '보류'
+    ELSE '대기'
+END
+FROM (
+    SELECT DISTINCT ON (ii.shipment_id) ii.status
+    FROM "{IncomingInspection._meta.db_table}" ii
+    WHERE ii.order_id = "{InjectionOrder._meta.db_table}"."id"
+    -- 배송상세별 최신 1건: created_at 동률은 id 로 결정 (_latest_per_shipment 의 -created_at, -id 와 동일)
+    ORDER BY ii.shipment_id DESC, ii.created_at DESC, ii.id DESC
+) t
+"""
+
+
+def _with_incoming_status(qs):
     """
-    주문에 대해 '배송상세별 최신 검사'를 모아 집계 상태/최신시각 계산.
-      - 아무 검사도 없으면  → '미실시'
-      - 전부 PASS          → '합격'
-      - PASS + (그 외) 공존 → '부분합격'
-      - PASS 없음 & FAIL만 → '불합격'
-      - PASS 없음 & HOLD만 → '보류'
-      - 그 외               → '대기'
+    InjectionOrder 쿼리셋에 수입검사 집계를 annotate (목록/엑셀 공용, 추가 쿼리 없음)
+      - insp_status_display: 집계 상태(위 규칙)
+      - insp_date: 최신 검사 시각 (= 배송상세별 최신 중 최댓값)
     """
-    insp_list = list(
-        IncomingInspection.objects.filter(order=order)
-        .order_by("shipment_id", "-created_at", "-id")
-        .only("shipment_id", "status", "created_at")
+    return qs.annotate(
+        insp_status_display=RawSQL(
+            _INCOMING_STATUS_SQL,
+            (QCStatus.PASS, QCStatus.PASS, QCStatus.FAIL, QCStatus.HOLD),
+            output_field=CharField(),
+        ),
+        insp_date=Subquery(
+            IncomingInspection.objects
+            .filter(order=OuterRef("pk"))
+            .order_by("-created_at", "-id")
+            .values("created_at")[:1],
+            output_field=DateTimeField(),
+        ),
     )
-    latest_by_ship: Dict[Optional[int], IncomingInspection] = {}
-    for ii in insp_list:
-        sid = getattr(ii, "shipment_id", None)
-        if sid not in latest_by_ship:
-            latest_by_ship[sid] = ii
-
-    if not latest_by_ship:
-        return ("미실시", None)
-
-    statuses = {ii.status for ii in latest_by_ship.values()}
-    last_dt = max(ii.created_at for ii in latest_by_ship.values())
-
-    if statuses == {QCStatus.PASS}:
-        return ("합격", last_dt)
-    if QCStatus.PASS in statuses and (statuses - {QCStatus.PASS}):
-        return ("부분합격", last_dt)
-    if QCStatus.FAIL in statuses and QCStatus.PASS not in statuses and QCStatus.HOLD not in statuses and QCStatus.DRAFT not in statuses:
-        return ("불합격", last_dt)
-    if QCStatus.HOLD in statuses and QCStatus.PASS not in statuses:
-        return ("보류", last_dt)
-    if statuses == {QCStatus.DRAFT}:
-        return ("대기", last_dt)
-    return ("대기", last_dt)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 불합격 사유코드 검색 (GIN 인덱스: defects && / @>)
+# ─────────────────────────────────────────────────────────────────────────────
+
+DEFECT_LABELS = dict(DEFECT_CODE_CHOICES)
+DEFECT_MATCH_ANY = "any"   # 하나라도 포함 → defects__overlap
+DEFECT_MATCH_ALL = "all"   # 모두 포함     → defects__contains
+
+
+def _defect_params(params) -> tuple[list[str], str]:
+    """GET defect(복수 또는 콤마 구분), defect_match(any|all) → (유효 코드 목록, 매칭 방식)"""
+    codes: list[str] = []
+    for raw in params.getlist("defect"):
+        codes.extend(c.strip() for c in raw.split(","))
+    codes = [c for c in dict.fromkeys(codes) if c in DEFECT_LABELS]
+    match = DEFECT_MATCH_ALL if params.get("defect_match") == DEFECT_MATCH_ALL else DEFECT_MATCH_ANY
+    return codes, match
+
+
+def _defects_q(codes: list[str], match: str) -> Q:
+    lookup = "defects__contains" if match == DEFECT_MATCH_ALL else "defects__overlap"
+    return Q(**{lookup: codes})
+
+
+def _filter_orders_by_defects(qs, codes: list[str], match: str):
+    """해당 사유코드 검사가 1건이라도 있는 발주만 (EXISTS + GIN)"""
+    if not codes:
+        return qs
+    return qs.filter(Exists(
+        IncomingInspection.objects.filter(_defects_q(codes, match), order=OuterRef("pk"))
+    ))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -141,9 +194,11 @@ def incoming_list(request):
     expected_date_end = (request.GET.get("expected_date_end") or "").strip()
     vendor_name = (request.GET.get("vendor") or "").strip()
     product_name = (request.GET.get("product") or "").strip()
+    defect_codes, defect_match = _defect_params(request.GET)
 
     # 🔽 GET 파라미터가 완전히 비어 있으면 → 기본값: 최근 7일
-    if not any([order_date_start, order_date_end, expected_date_start, expected_date_end, vendor_name, product_name]):
+    if not any([order_date_start, order_date_end, expected_date_start, expected_date_end, vendor_name, product_name,
+                defect_codes]):
         today = date.today()
         one_week_ago = today - timedelta(days=7)
         order_date_start = one_week_ago.strftime("%Y-%m-%d")
@@ -164,16 +219,12 @@ def incoming_list(request):
         qs = qs.filter(vendor__name__icontains=vendor_name)
     if product_name:
         qs = qs.filter(items__injection__name__icontains=product_name)
+    qs = _filter_orders_by_defects(qs, defect_codes, defect_match)
 
-    paginator = Paginator(qs, 20)
+    # 집계 상태는 annotate → 페이지 조회 쿼리 1회에 포함
+    paginator = Paginator(_with_incoming_status(qs), 20)
     page_obj = paginator.get_page(request.GET.get("page") or 1)
 
-    # 집계 상태
-    for o in page_obj.object_list:
-        status_disp, last_dt = _aggregate_status_from_latest_per_shipment(o)
-        o.insp_status_display = status_disp
-        o.insp_date = last_dt
-
     q = request.GET.copy()
     q.pop("page", None)
     querystring = q.urlencode()
@@ -191,6 +242,9 @@ def incoming_list(request):
             "order_date_end": order_date_end,
             "expected_date_start": expected_date_start,
             "expected_date_end": expected_date_end,
+            "defect_choices": DEFECT_CODE_CHOICES,
+            "defect_codes": defect_codes,
+            "defect_match": defect_match,
         },
     )
 
@@ -202,7 +256,6 @@ def incoming_export(request):
         InjectionOrder.objects
         .filter(flow_status__in=[FlowStatus.PRT, FlowStatus.RCV], dlt_yn="N")
         .select_related("vendor")
-        .prefetch_related("items")
         .annotate(qty_sum=Sum("items__quantity"))
         .order_by("-order_date", "-id")
         .distinct()
@@ -215,6 +268,7 @@ def incoming_export(request):
     expected_date_end = (request.GET.get("expected_date_end") or "").strip()
     vendor_name = (request.GET.get("vendor") or "").strip()
     product_name = (request.GET.get("product") or "").strip()
+    defect_codes, defect_match = _defect_params(request.GET)
 
     if order_date_start:
         qs = qs.filter(order_date__gte=order_date_start)
@@ -228,28 +282,146 @@ def incoming_export(request):
         qs = qs.filter(vendor__name__icontains=vendor_name)
     if product_name:
         qs = qs.filter(items__injection__name__icontains=product_name)
+    qs = _filter_orders_by_defects(qs, defect_codes, defect_match)
+
+    # 대표 품명/검사 집계 상태 모두 annotate → 스트리밍 쿼리 1회
+    qs = _with_incoming_status(qs).annotate(
+        first_item_name=Subquery(
+            InjectionOrderItem.objects
+            .filter(order=OuterRef("pk"))
+            .order_by("id")
+            .values("injection__name")[:1]
+        )
+    )
 
-    resp = HttpResponse(content_type="text/csv; charset=utf-8-sig")
-    resp["Content-Disposition"] = 'attachment; filename="incoming_list.csv"'
-    w = csv.writer(resp)
-    w.writerow(["발주LOT", "발주처", "발주일", "품명(대표)", "수량합", "입고예정일", "진행상태", "수입검사상태", "검사시각"])
+    def _fmt_dt(dt):
+        if not dt:
+            return "-"
+        dt = timezone.localtime(dt) if timezone.is_aware(dt) else dt
+        return dt.strftime("%Y-%m-%d %H:%M")
 
-    for o in qs:
-        status_disp, last_dt = _aggregate_status_from_latest_per_shipment(o)
-        first = o.items.first()
-        item_name = first.injection.name if first and first.injection else "-"
-        w.writerow([
+    def _row(o):
+        return [
             o.order_lot,
             o.vendor.name if o.vendor else "-",
             o.order_date.strftime("%Y-%m-%d") if o.order_date else "-",
-            item_name,
+            o.first_item_name or "-",
             o.qty_sum or 0,
             o.due_date.strftime("%Y-%m-%d") if o.due_date else "-",
             o.get_flow_status_display(),
-            status_disp,
-            last_dt.strftime("%Y-%m-%d %H:%M") if last_dt else "-",
-        ])
-    return resp
+            o.insp_status_display,
+            _fmt_dt(o.insp_date),
+        ]
+
+    return stream_queryset_csv(
+        qs,
+        "incoming_list.csv",
+        ["발주LOT", "발주처", "발주일", "품명(대표)", "수량합", "입고예정일", "진행상태", "수입검사상태", "검사시각"],
+        _row,
+    )
+
+
+DEFECT_SEARCH_PAGE_SIZE = 50
+DEFECT_SEARCH_MAX_PAGE_SIZE = 200
+
+
+@require_http_methods(["GET"])
+def incoming_defect_search(request):
+    """
+    수입검사 불합격 사유코드 검색 API (JSON)
+    GET:
+      defect=DEFECT_CD_07 (복수 또는 콤마) / defect_match=any(기본)|all
+      level=header(기본, 검사 헤더) | line(검사 라인)
+      vendor=발주처명(부분일치) 또는 vendor_id / start, end=검사일 / status
+      page, page_size(최대 200)
+    응답: results(페이지) + code_counts(필터 결과 전체의 사유코드별 건수, 쿼리 1회)
+    """
+    codes, match = _defect_params(request.GET)
+    level = "line" if request.GET.get("level") == "line" else "header"
+
+    if level == "line":
+        qs = IncomingInspectionDetail.objects.select_related(
+            "inspection__order__vendor", "shipment_line",
+        )
+        p = "inspection__"
+    else:
+        qs = IncomingInspection.objects.select_related("order__vendor")
+        p = ""
+
+    if codes:
+        qs = qs.filter(_defects_q(codes, match))
+
+    start = _to_date_or_none(request.GET.get("start"))
+    end = _to_date_or_none(request.GET.get("end"))
+    if start:
+        qs = qs.filter(**{f"{p}inspection_date__gte": start})
+    if end:
+        qs = qs.filter(**{f"{p}inspection_date__lte": end})
+
+    vendor_id = (request.GET.get("vendor_id") or "").strip()
+    vendor_name = (request.GET.get("vendor") or "").strip()
+    if vendor_id.isdigit():
+        qs = qs.filter(**{f"{p}order__vendor_id": int(vendor_id)})
+    elif vendor_name:
+        qs = qs.filter(**{f"{p}order__vendor__name__icontains": vendor_name})
+
+    status = (request.GET.get("status") or "").strip()
+    if status:
+        if status not in QCStatus.values:
+            return JsonResponse({"ok": False, "msg": f"잘못된 상태값: {status}"}, status=400)
+        qs = qs.filter(status=status)
+
+    # 사유코드별 건수 — 코드마다 FILTER(WHERE defects @> ARRAY[code]) 집계, 쿼리 1회
+    counts = qs.aggregate(**{
+        code: Count("id", filter=Q(defects__contains=[code])) for code in DEFECT_LABELS
+    })
+    code_counts = [
+        {"code": code, "label": DEFECT_LABELS[code], "count": counts[code]}
+        for code in DEFECT_LABELS if counts[code]
+    ]
+
+    page_size = _to_int_or_zero(request.GET.get("page_size")) or DEFECT_SEARCH_PAGE_SIZE
+    page_size = min(max(page_size, 1), DEFECT_SEARCH_MAX_PAGE_SIZE)
+    paginator = Paginator(qs.order_by(f"-{p}inspection_date", "-id"), page_size)
+    page_obj = paginator.get_page(request.GET.get("page") or 1)
+
+    results = []
+    for row in page_obj.object_list:
+        header = row.inspection if level == "line" else row
+        order = header.order
+        item = {
+            "id": row.id,
+            "inspection_id": header.id,
+            "order_id": order.id,
+            "order_lot": order.order_lot,
+            "vendor": order.vendor.name if order.vendor else "",
+            "inspection_date": header.inspection_date.isoformat() if header.inspection_date else None,
+            "status": row.status,
+            "status_display": row.get_status_display(),
+            "defects": [{"code": c, "label": DEFECT_LABELS.get(c, c)} for c in row.defects],
+            "return_qty": row.return_qty or 0,
+        }
+        if level == "line":
+            item["shipment_line_id"] = row.shipment_line_id
+            item["sub_seq"] = row.shipment_line.sub_seq
+            item["qty"] = row.qty
+        else:
+            item["shipment_id"] = row.shipment_id
+            item["inspect_qty"] = row.inspect_qty or 0
+        results.append(item)
+
+    return JsonResponse({
+        "ok": True,
+        "level": level,
+        "defect": codes,
+        "defect_match": match,
+        "count": paginator.count,
+        "page": page_obj.number,
+        "num_pages": paginator.num_pages,
+        "page_size": page_size,
+        "results": results,
+        "code_counts": code_counts,
+    })
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -287,6 +459,12 @@ def incoming_inspect_layer(request, order_id: int):
         "boxes",
     ).order_by("group_no", "id")
 
+    # 배송상세별 최신 검사 — 그룹마다 조회하지 않고 1회
+    latest_by_ship = (
+        {ii.shipment_id: ii for ii in _latest_per_shipment([order.id])}
+        if HAS_SHIPMENT_FIELD else {}
+    )
+
     shipments = []
     for grp in grp_qs:
         # 배송일: ship_date 없으면 created_at 사용
@@ -325,7 +503,7 @@ def incoming_inspect_layer(request, order_id: int):
             total_qty = sum(b.qty for b in alive_boxes)
             tokens = [f"{grp.group_no}-{b.box_no} : {b.qty}" for b in alive_boxes]
 
-        insp = _latest_inspection(order, grp.id) if HAS_SHIPMENT_FIELD else None
+        insp = latest_by_ship.get(grp.id)
         insp_dict = None
         if insp:
             insp_dict = {
@@ -441,6 +619,9 @@ def incoming_inspect_save(request, order_id: int):
                     for l in lines
                 ])
 
+            # 불량 Pareto 집계(발주처 × 검사일 구간) 갱신
+            refresh_incoming_for_order(order)
+
     except Exception:  # pragma: no cover - 운영 로깅
         logger.exception("[QC][SAVE] ERROR order_id=%s shipment_id=%s", order.id, shipment_id)
         messages.error(request, "수입검사 저장 중 오류가 발생했습니다.")
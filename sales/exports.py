@@ -0,0 +1,50 @@
+# sales/exports.py
+"""
+영업 목록 백그라운드 내보내기 등록 (core.exports)
+"""
+from datetime import date
+
+from core.exports import ExportSpec, register_export
+
+from .models import SalesShipmentLine
+from .shipment.views import _filtered_shipment_qs
+
+SHIPMENT_LINE_HEADER = [
+    "출하LOT", "출하일", "고객사", "프로그램", "품명", "C-LOT", "출하수량", "단가", "금액", "상태", "출고자",
+]
+
+
+def _shipment_line_row(ln):
+    sh = ln.shipment
+    return [
+        sh.sh_lot,
+        sh.ship_date.strftime("%Y-%m-%d") if sh.ship_date else "",
+        getattr(sh.customer, "name", "") or "",
+        sh.program or "",
+        getattr(ln.product, "name", "") or sh.product_name or "",
+        ln.c_lot,
+        ln.quantity,
+        ln.unit_price,
+        ln.total_price,
+        sh.get_status_display(),
+        sh.operator or "",
+    ]
+
+
+@register_export("sales.shipment_lines", "출하 라인(감사용)")
+def shipment_lines(params):
+    """출하 목록 검색조건에 걸린 출하서들의 라인 전체"""
+    shipments = _filtered_shipment_qs(params).order_by()
+    qs = (
+        SalesShipmentLine.objects
+        .filter(shipment__in=shipments.values("id"), delete_yn="N")
+        .select_related("shipment", "shipment__customer", "product")
+        .order_by("-shipment__ship_date", "-shipment_id", "id")
+    )
+    return ExportSpec(
+        filename=f"shipment_lines_{date.today():%Y%m%d}",
+        header=SHIPMENT_LINE_HEADER,
+        qs=qs,
+        row_fn=_shipment_line_row,
+        widths=[16, 12, 18, 14, 24, 18, 10, 10, 12, 10, 10],
+    )
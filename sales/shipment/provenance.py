@@ -0,0 +1,130 @@
+# sales/shipment/provenance.py
+"""
+완성 BOX(C-LOT) 출처 일괄 로더
+
+FinishedBox → OutgoingFinishedLot → 출하검사 → WorkOrder → WorkOrderInjectionUsage
+→ InjectionReceiptLine → InjectionReceipt → InjectionOrder 체인을
+BOX 목록 단위로 쿼리 2회에 해결하고, 같은 요청 안에서는 결과를 재사용한다.
+"""
+from dataclasses import dataclass
+
+from django.apps import apps
+
+
+@dataclass(frozen=True)
+class BoxProvenance:
+    order_lot: str = ""    # 발주 LOT
+    in_lot: str = ""       # 입고 서브 LOT (사출일)
+    work_lot: str = ""     # 생산 LOT
+    inspector: str = ""    # 출하검사자
+
+
+_EMPTY = BoxProvenance()
+
+
+class BoxProvenanceLoader:
+    """
+    DataLoader 방식: load_many() 로 모아서 한 번에 조회, lot_no 기준 메모이즈.
+    요청 단위 인스턴스는 for_request(request) 로 얻는다.
+    """
+
+    def __init__(self):
+        self._cache: dict[str, BoxProvenance] = {}
+
+    @classmethod
+    def for_request(cls, request) -> "BoxProvenanceLoader":
+        loader = getattr(request, "_box_provenance_loader", None)
+        if loader is None:
+            loader = cls()
+            request._box_provenance_loader = loader
+        return loader
+
+    def load_many(self, lot_nos) -> dict[str, BoxProvenance]:
+        lot_nos = [x for x in dict.fromkeys(lot_nos) if x]
+        missing = [x for x in lot_nos if x not in self._cache]
+        if missing:
+            self._cache.update(self._fetch(missing))
+        return {x: self._cache.get(x, _EMPTY) for x in lot_nos}
+
+    def load(self, lot_no: str) -> BoxProvenance:
+        return self.load_many([lot_no]).get(lot_no, _EMPTY)
+
+    def annotate(self, boxes) -> list:
+        """
+        FinishedBox 객체에 화면 표시용 속성 세팅
+        (order_lot / in_lot / work_lot / inspect_lot / inspector / program / product_name / qty_for_outgoing)
+        """
+        boxes = list(boxes)
+        prov_map = self.load_many(b.lot_no for b in boxes)
+        for b in boxes:
+            prov = prov_map.get(b.lot_no, _EMPTY)
+            b.qty_for_outgoing = getattr(b, "qty", 0)
+            b.order_lot = prov.order_lot
+            b.in_lot = prov.in_lot
+            b.work_lot = prov.work_lot
+            b.inspect_lot = getattr(b, "lot_no", "")  # 검사 LOT = C-LOT
+            b.inspector = prov.inspector
+            b.program = getattr(b.product, "program_name", "")
+            b.product_name = getattr(b.product, "name", "")
+        return boxes
+
+    # ------------------------------------------------------------------
+    def _fetch(self, lot_nos: list[str]) -> dict[str, BoxProvenance]:
+        OutgoingFinishedLot = apps.get_model("quality", "OutgoingFinishedLot")
+        WorkOrderInjectionUsage = apps.get_model("production", "WorkOrderInjectionUsage")
+
+        # 1) C-LOT → 출하검사(작업지시) / 검사자 — 같은 LOT 여러 건이면 최신 id 우선
+        wo_by_lot: dict[str, tuple] = {}
+        for lot, operator, wo_id, work_lot in (
+            OutgoingFinishedLot.objects
+            .filter(finished_lot__in=lot_nos, dlt_yn="N")
+            .order_by("finished_lot", "-id")
+            .values_list(
+                "finished_lot",
+                "operator",
+                "inspection__workorder_id",
+                "inspection__workorder__work_lot",
+            )
+        ):
+            if lot not in wo_by_lot:
+                wo_by_lot[lot] = (operator or "", wo_id, work_lot or "")
+
+        # 2) 작업지시 → 첫 사출 투입라인 → 입고/발주 LOT, 협력사 생산일
+        workorder_ids = {wo_id for _op, wo_id, _wl in wo_by_lot.values() if wo_id}
+        src_by_wo: dict[int, tuple] = {}
+        if workorder_ids:
+            for wo_id, sub_lot, receipt_lot, receipt_date, order_lot, prod_date in (
+                WorkOrderInjectionUsage.objects
+                .filter(workorder_id__in=workorder_ids)
+                .order_by("workorder_id", "id")
+                .values_list(
+                    "workorder_id",
+                    "line__sub_lot",
+                    "line__receipt__receipt_lot",
+                    "line__receipt__date",
+                    "line__receipt__order__order_lot",
+                    "line__detail__shipment_line__production_date",
+                )
+            ):
+                if wo_id not in src_by_wo:
+                    src_by_wo[wo_id] = (sub_lot, receipt_lot, receipt_date, order_lot, prod_date)
+
+        result: dict[str, BoxProvenance] = {}
+        for lot in lot_nos:
+            operator, wo_id, work_lot = wo_by_lot.get(lot, ("", None, ""))
+            src = src_by_wo.get(wo_id) if wo_id else None
+            in_lot = ""
+            order_lot = ""
+            if src:
+                sub_lot, receipt_lot, receipt_date, order_lot, prod_date = src
+                # 협력사 생산일 없으면 입고일
+                inj_date = prod_date or receipt_date
+                date_str = inj_date.strftime("%Y-%m-%d") if inj_date else ""
+                in_lot = f"{sub_lot or receipt_lot or ''} ({date_str})"
+            result[lot] = BoxProvenance(
+                order_lot=order_lot or "",
+                in_lot=in_lot,
+                work_lot=work_lot,
+                inspector=operator,
+            )
+        return result
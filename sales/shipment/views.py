@@ -7,26 +7,30 @@ from django.db import transaction, models
 from django.apps import apps
 from django.shortcuts import render
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 from ..models import SalesShipment, SalesShipmentLine
+from utils.lot import next_lot
+from mis.lineage import remove_edges, set_edges, ship_edge
+from .provenance import BoxProvenanceLoader
 
 
-def shipment_list(request):
+def _filtered_shipment_qs(params):
     """
-    출하 목록 (헤더 리스트)
-    검색조건:
+    출하 목록/백그라운드 내보내기 공통 검색조건 (params: request.GET 또는 저장된 QueryDict)
       - sh_lot: 출하 LOT (부분일치)
       - ship_date_from, ship_date_to: 출하일 기간
       - customer: 고객사명 (부분일치)
       - program: 프로그램명
       - product_name: 품명
     """
-    sh_lot = (request.GET.get("sh_lot") or "").strip()
-    ship_date_from = (request.GET.get("ship_date_from") or "").strip()
-    ship_date_to = (request.GET.get("ship_date_to") or "").strip()
-    customer = (request.GET.get("customer") or "").strip()
-    program = (request.GET.get("program") or "").strip()
-    product_name = (request.GET.get("product_name") or "").strip()
+    sh_lot = (params.get("sh_lot") or "").strip()
+    ship_date_from = (params.get("ship_date_from") or "").strip()
+    ship_date_to = (params.get("ship_date_to") or "").strip()
+    customer = (params.get("customer") or "").strip()
+    program = (params.get("program") or "").strip()
+    product_name = (params.get("product_name") or "").strip()
 
     qs = (
         SalesShipment.objects
@@ -52,8 +56,21 @@ def shipment_list(request):
         dt_to = parse_date(ship_date_to)
         if dt_to:
             qs = qs.filter(ship_date__lte=dt_to)
+    return qs
+
+
+def shipment_list(request):
+    """
+    출하 목록 (헤더 리스트) — 검색조건은 _filtered_shipment_qs 참고
+    """
+    sh_lot = (request.GET.get("sh_lot") or "").strip()
+    ship_date_from = (request.GET.get("ship_date_from") or "").strip()
+    ship_date_to = (request.GET.get("ship_date_to") or "").strip()
+    customer = (request.GET.get("customer") or "").strip()
+    program = (request.GET.get("program") or "").strip()
+    product_name = (request.GET.get("product_name") or "").strip()
 
-    shipments = qs
+    shipments = _filtered_shipment_qs(request.GET)
 
     context = {
         "shipments": shipments,
@@ -67,22 +84,8 @@ def shipment_list(request):
     return render(request, "shipment/shipment_list.html", context)
 
 def generate_sh_lot(ship_date):
-    prefix = ship_date.strftime("SH%Y%m%d")
-    last = (
-        SalesShipment.objects
-        .filter(sh_lot__startswith=prefix)
-        .order_by("-sh_lot")
-        .first()
-    )
-    if last:
-        try:
-            seq = int(last.sh_lot[-3:]) + 1
-        except ValueError:
-            seq = 1
-    else:
-        seq = 1
-    return f"{prefix}-{seq:03d}"
-
+    """출하 LOT: SH + YYYYMMDD + '-' + 3자리 (카운터 블록 발급)"""
+    return next_lot("SH", ship_date)
 
 
 def shipment_create(request):
@@ -92,13 +95,6 @@ def shipment_create(request):
     - 각 C-LOT에 대해 발주LOT / 입고LOT(사출일) / 생산LOT / 검사LOT / 검사자까지 세팅
     """
     FinishedBox = apps.get_model("quality", "FinishedBox")
-    OutgoingFinishedLot = apps.get_model("quality", "OutgoingFinishedLot")  # ✅ 검사자 출처
-    OutgoingInspection = apps.get_model("quality", "OutgoingInspection")
-    WorkOrder = apps.get_model("production", "WorkOrder")
-    WorkOrderInjectionUsage = apps.get_model("production", "WorkOrderInjectionUsage")
-    InjectionReceiptLine = apps.get_model("purchase", "InjectionReceiptLine")
-    InjectionReceipt = apps.get_model("purchase", "InjectionReceipt")
-    InjectionOrder = apps.get_model("injectionorder", "InjectionOrder")
 
     program = request.GET.get("program", "").strip()
     product_name = request.GET.get("product_name", "").strip()
@@ -125,116 +121,11 @@ def shipment_create(request):
     box_list = list(box_qs)
 
     if box_list:
-        # ---------------------------------------------------------------
-        # 1) C-LOT → 출하검사 / 검사자 매핑 (OutgoingFinishedLot 기준)
-        # ---------------------------------------------------------------
-        lot_nos = [b.lot_no for b in box_list]
-
-        ofl_qs = (
-            OutgoingFinishedLot.objects.filter(
-                finished_lot__in=lot_nos,
-                dlt_yn="N",
-            )
-            .select_related("inspection")
-            .order_by("finished_lot", "-id")  # 같은 LOT 여러 건이면 최신 id 우선
-        )
-
-        inspection_by_lot = {}
-        inspector_by_lot = {}
-        for row in ofl_qs:
-            code = row.finished_lot
-            if code not in inspection_by_lot:
-                inspection_by_lot[code] = row.inspection
-                inspector_by_lot[code] = row.operator or ""
-
-        # ---------------------------------------------------------------
-        # 2) inspection → workorder 매핑
-        # ---------------------------------------------------------------
-        inspections = [ins for ins in inspection_by_lot.values() if ins is not None]
-        workorder_ids = {
-            ins.workorder_id
-            for ins in inspections
-            if getattr(ins, "workorder_id", None)
-        }
-        workorders = WorkOrder.objects.filter(id__in=workorder_ids)
-        workorder_by_id = {w.id: w for w in workorders}
-
-        # ---------------------------------------------------------------
-        # 3) workorder → 사출 투입라인 / 입고 / 발주 LOT 역추적
-        # ---------------------------------------------------------------
-        usages = WorkOrderInjectionUsage.objects.filter(workorder_id__in=workorder_ids)
-        line_ids = {u.line_id for u in usages}
-        usage_by_workorder = {}
-        for u in usages:
-            if u.workorder_id not in usage_by_workorder:
-                usage_by_workorder[u.workorder_id] = u
-
-        lines = InjectionReceiptLine.objects.filter(id__in=line_ids)
-        receipt_ids = {ln.receipt_id for ln in lines}
-        line_by_id = {ln.id: ln for ln in lines}
-
-        receipts = InjectionReceipt.objects.filter(id__in=receipt_ids)
-        receipt_by_id = {r.id: r for r in receipts}
-
-        order_ids = {
-            r.order_id for r in receipts if getattr(r, "order_id", None)
-        }
-        orders = InjectionOrder.objects.filter(id__in=order_ids)
-        order_by_id = {o.id: o for o in orders}
+        # C-LOT → 발주LOT / 입고LOT(사출일) / 생산LOT / 검사자 (일괄 로더)
+        BoxProvenanceLoader.for_request(request).annotate(box_list)
 
-        # ---------------------------------------------------------------
-        # 4) 화면 표시용 필드 세팅
-        # ---------------------------------------------------------------
         for b in box_list:
-            # C-LOT 기준으로 출하검사 헤더/작업지시 찾아오기
-            ins = inspection_by_lot.get(b.lot_no)
-            wo = workorder_by_id.get(ins.workorder_id) if ins else None
-            usage = usage_by_workorder.get(wo.id) if wo else None
-            line = line_by_id.get(usage.line_id) if usage else None
-            receipt = receipt_by_id.get(line.receipt_id) if line else None
-            order = order_by_id.get(receipt.order_id) if receipt else None
-
-            # 수량
-            b.qty_for_outgoing = getattr(b, "qty", 0)
             b.display_qty = b.qty_for_outgoing  # ✅ 템플릿 호환용
-            # 발주 LOT
-            b.order_lot = getattr(order, "order_lot", "") if order else ""
-
-            # 입고 LOT (사출일)
-            if receipt and line:
-                # 1) LOT 문자열: 서브 LOT 우선
-                lot_str = getattr(line, "sub_lot", None) or getattr(
-                    receipt, "receipt_lot", ""
-                )
-
-                # 2) 협력사 생산일: PartnerShipmentLine.production_date 를 타고 올라감
-                detail = getattr(line, "detail", None)  # IncomingInspectionDetail
-                ship_line = getattr(detail, "shipment_line", None)  # PartnerShipmentLine
-
-                inj_date = getattr(ship_line, "production_date", None)
-
-                # 없으면 마지막 fallback 으로 입고일
-                if not inj_date:
-                    inj_date = getattr(receipt, "date", None)
-
-                date_str = inj_date.strftime("%Y-%m-%d") if inj_date else ""
-
-                b.in_lot = f"{lot_str} ({date_str})"
-            else:
-                b.in_lot = ""
-
-            # 생산 LOT
-            b.work_lot = getattr(wo, "work_lot", "") if wo else ""
-
-            # 검사 LOT = C-LOT
-            b.inspect_lot = getattr(b, "lot_no", "")
-
-            # ✅ 검사자 (출하검사자)
-            b.inspector = inspector_by_lot.get(b.lot_no, "")
-
-            # 프로그램 / 품명
-            b.program = getattr(b.product, "program_name", "")
-            b.product_name = getattr(b.product, "name", "")
 
             # ✅ 고객사 이름 (product.customer.name 기준)
             customer = getattr(b.product, "customer", None)
@@ -265,120 +156,15 @@ def shipment_detail(request, pk):
     # 출하 라인 가져오기
     lines = list(
         SalesShipmentLine.objects
-        .select_related("product", "finished_box")
+        .select_related("product", "finished_box__product")
         .filter(shipment=shipment, delete_yn="N")
         .order_by("id")
     )
 
-    # 라인이 있을 때만 LOT 역추적 수행
-    if lines:
-        FinishedBox = apps.get_model("quality", "FinishedBox")
-        OutgoingFinishedLot = apps.get_model("quality", "OutgoingFinishedLot")
-        OutgoingInspection = apps.get_model("quality", "OutgoingInspection")
-        WorkOrder = apps.get_model("production", "WorkOrder")
-        WorkOrderInjectionUsage = apps.get_model("production", "WorkOrderInjectionUsage")
-        InjectionReceiptLine = apps.get_model("purchase", "InjectionReceiptLine")
-        InjectionReceipt = apps.get_model("purchase", "InjectionReceipt")
-        InjectionOrder = apps.get_model("injectionorder", "InjectionOrder")
-
-        # 이번 출하에 포함된 BOX 목록
-        box_list = [ln.finished_box for ln in lines if ln.finished_box_id]
-
-        if box_list:
-            # 1) C-LOT → 출하검사/검사자 매핑
-            lot_nos = [b.lot_no for b in box_list]
-
-            ofl_qs = (
-                OutgoingFinishedLot.objects.filter(
-                    finished_lot__in=lot_nos,
-                    dlt_yn="N",
-                )
-                .select_related("inspection")
-                .order_by("finished_lot", "-id")
-            )
-
-            inspection_by_lot: dict[str, OutgoingInspection] = {}
-            inspector_by_lot: dict[str, str] = {}
-
-            for row in ofl_qs:
-                code = row.finished_lot
-                if code not in inspection_by_lot:
-                    inspection_by_lot[code] = row.inspection
-                    inspector_by_lot[code] = row.operator or ""
-
-            # 2) inspection → workorder 매핑
-            inspections = [ins for ins in inspection_by_lot.values() if ins is not None]
-            workorder_ids = {
-                ins.workorder_id
-                for ins in inspections
-                if getattr(ins, "workorder_id", None)
-            }
-            workorders = WorkOrder.objects.filter(id__in=workorder_ids)
-            workorder_by_id = {w.id: w for w in workorders}
-
-            # 3) workorder → 사출 투입라인 / 입고 / 발주 LOT 역추적
-            usages = WorkOrderInjectionUsage.objects.filter(workorder_id__in=workorder_ids)
-            line_ids = {u.line_id for u in usages}
-            usage_by_workorder = {}
-            for u in usages:
-                if u.workorder_id not in usage_by_workorder:
-                    usage_by_workorder[u.workorder_id] = u
-
-            rec_lines = InjectionReceiptLine.objects.filter(id__in=line_ids)
-            receipt_ids = {ln.receipt_id for ln in rec_lines}
-            line_by_id = {ln.id: ln for ln in rec_lines}
-
-            receipts = InjectionReceipt.objects.filter(id__in=receipt_ids)
-            receipt_by_id = {r.id: r for r in receipts}
-
-            order_ids = {
-                r.order_id for r in receipts if getattr(r, "order_id", None)
-            }
-            orders = InjectionOrder.objects.filter(id__in=order_ids)
-            order_by_id = {o.id: o for o in orders}
-
-            # 4) FinishedBox 객체에 표시용 필드 세팅
-            for b in box_list:
-                ins = inspection_by_lot.get(b.lot_no)
-                wo = workorder_by_id.get(ins.workorder_id) if ins else None
-                usage = usage_by_workorder.get(wo.id) if wo else None
-                rec_line = line_by_id.get(usage.line_id) if usage else None
-                receipt = receipt_by_id.get(rec_line.receipt_id) if rec_line else None
-                order = order_by_id.get(receipt.order_id) if receipt else None
-
-                # 발주 LOT
-                b.order_lot = getattr(order, "order_lot", "") if order else ""
-
-                # 입고 LOT (사출일)
-                if receipt and rec_line:
-                    lot_str = getattr(rec_line, "sub_lot", None) or getattr(
-                        receipt, "receipt_lot", ""
-                    )
-
-                    detail = getattr(rec_line, "detail", None)
-                    ship_line = getattr(detail, "shipment_line", None)
-
-                    inj_date = getattr(ship_line, "production_date", None)
-                    if not inj_date:
-                        inj_date = getattr(receipt, "date", None)
-
-                    date_str = inj_date.strftime("%Y-%m-%d") if inj_date else ""
-                    b.in_lot = f"{lot_str} ({date_str})"
-                else:
-                    b.in_lot = ""
-
-                # 생산 LOT
-                b.work_lot = getattr(wo, "work_lot", "") if wo else ""
-
-                # 검사 LOT = C-LOT
-                b.inspect_lot = getattr(b, "lot_no", "")
-
-                # 검사자
-                b.inspector = inspector_by_lot.get(b.lot_no, "")
-
-                # 프로그램 / 품명 (안전하게 캐싱)
-                b.program = getattr(b.product, "program_name", "")
-                b.product_name = getattr(b.product, "name", "")
+    # 라인이 있을 때만 LOT 역추적 수행 (일괄 로더)
+    box_list = [ln.finished_box for ln in lines if ln.finished_box_id]
+    if box_list:
+        BoxProvenanceLoader.for_request(request).annotate(box_list)
 
     context = {
         "shipment": shipment,
@@ -450,8 +236,10 @@ def shipment_save(request):
         )
 
         # 🔹 라인 + 상태 변경
+        ship_edges = []
         for b in box_list:
             qty = getattr(b, "qty", 0)
+            ship_edges.append(ship_edge(b.lot_no, sh_lot, qty))
 
             SalesShipmentLine.objects.create(
                 shipment=shipment,
@@ -475,6 +263,9 @@ def shipment_save(request):
                 dlt_yn="N",
             ).update(shipped=True)
 
+        # 🔹 LOT 계보: C-LOT → SH
+        set_edges(ship_edges)
+
     return JsonResponse(
         {
             "success": True,
@@ -504,6 +295,8 @@ def shipment_update(request, pk):
     FinishedBox = apps.get_model("quality", "FinishedBox")
     OutgoingFinishedLot = apps.get_model("quality", "OutgoingFinishedLot")
 
+    removed_edges, added_edges = [], []
+
     with transaction.atomic():
         # 🔹 1) 라인 삭제 처리
         if delete_line_ids:
@@ -517,6 +310,7 @@ def shipment_update(request, pk):
                 # 출하 라인 soft delete
                 ln.delete_yn = "Y"
                 ln.save(update_fields=["delete_yn"])
+                removed_edges.append(ship_edge(ln.c_lot, shipment.sh_lot, 0)[:4])
 
                 if fb:
                     # BOX 출하 취소
@@ -559,6 +353,7 @@ def shipment_update(request, pk):
                     created_by=request.user.username,
                     updated_by=request.user.username,
                 )
+                added_edges.append(ship_edge(b.lot_no, shipment.sh_lot, qty))
                 # BOX 출하 처리
                 b.shipped = True
                 b.save(update_fields=["shipped"])
@@ -568,6 +363,10 @@ def shipment_update(request, pk):
                     dlt_yn="N",
                 ).update(shipped=True)
 
+        # 🔹 LOT 계보: C-LOT → SH
+        remove_edges(removed_edges)
+        set_edges(added_edges)
+
         # 🔹 3) 총 출하수량 재계산
         total_qty = (
             SalesShipmentLine.objects
@@ -596,12 +395,6 @@ def shipment_box_search(request, pk):
     c_lot = (request.GET.get("clot") or "").strip()
 
     FinishedBox = apps.get_model("quality", "FinishedBox")
-    OutgoingFinishedLot = apps.get_model("quality", "OutgoingFinishedLot")
-    WorkOrder = apps.get_model("production", "WorkOrder")
-    WorkOrderInjectionUsage = apps.get_model("production", "WorkOrderInjectionUsage")
-    InjectionReceiptLine = apps.get_model("purchase", "InjectionReceiptLine")
-    InjectionReceipt = apps.get_model("purchase", "InjectionReceipt")
-    InjectionOrder = apps.get_model("injectionorder", "InjectionOrder")
 
     # 기준 출하서
     shipment = get_object_or_404(
@@ -646,82 +439,8 @@ def shipment_box_search(request, pk):
     if not box_list:
         return JsonResponse({"success": True, "results": []})
 
-    # ====== shipment_create 와 동일한 LOT 역추적 ======
-    lot_nos = [b.lot_no for b in box_list]
-
-    ofl_qs = (
-        OutgoingFinishedLot.objects.filter(
-            finished_lot__in=lot_nos,
-            dlt_yn="N",
-        )
-        .select_related("inspection")
-        .order_by("finished_lot", "-id")
-    )
-
-    inspection_by_lot = {}
-    inspector_by_lot = {}
-    for row in ofl_qs:
-        code = row.finished_lot
-        if code not in inspection_by_lot:
-            inspection_by_lot[code] = row.inspection
-            inspector_by_lot[code] = row.operator or ""
-
-    inspections = [ins for ins in inspection_by_lot.values() if ins is not None]
-    workorder_ids = {
-        ins.workorder_id for ins in inspections if getattr(ins, "workorder_id", None)
-    }
-    workorders = WorkOrder.objects.filter(id__in=workorder_ids)
-    workorder_by_id = {w.id: w for w in workorders}
-
-    usages = WorkOrderInjectionUsage.objects.filter(workorder_id__in=workorder_ids)
-    line_ids = {u.line_id for u in usages}
-    usage_by_workorder = {}
-    for u in usages:
-        if u.workorder_id not in usage_by_workorder:
-            usage_by_workorder[u.workorder_id] = u
-
-    lines = InjectionReceiptLine.objects.filter(id__in=line_ids)
-    receipt_ids = {ln.receipt_id for ln in lines}
-    line_by_id = {ln.id: ln for ln in lines}
-
-    receipts = InjectionReceipt.objects.filter(id__in=receipt_ids)
-    receipt_by_id = {r.id: r for r in receipts}
-
-    order_ids = {r.order_id for r in receipts if getattr(r, "order_id", None)}
-    orders = InjectionOrder.objects.filter(id__in=order_ids)
-    order_by_id = {o.id: o for o in orders}
-
-    # box 에 표시값 채우기
-    for b in box_list:
-        ins = inspection_by_lot.get(b.lot_no)
-        wo = workorder_by_id.get(ins.workorder_id) if ins else None
-        usage = usage_by_workorder.get(wo.id) if wo else None
-        line = line_by_id.get(usage.line_id) if usage else None
-        receipt = receipt_by_id.get(line.receipt_id) if line else None
-        order = order_by_id.get(receipt.order_id) if receipt else None
-
-        b.qty_for_outgoing = getattr(b, "qty", 0)
-        b.order_lot = getattr(order, "order_lot", "") if order else ""
-
-        if receipt and line:
-            lot_str = getattr(line, "sub_lot", None) or getattr(
-                receipt, "receipt_lot", ""
-            )
-            detail = getattr(line, "detail", None)
-            ship_line = getattr(detail, "shipment_line", None)
-            inj_date = getattr(ship_line, "production_date", None)
-            if not inj_date:
-                inj_date = getattr(receipt, "date", None)
-            date_str = inj_date.strftime("%Y-%m-%d") if inj_date else ""
-            b.in_lot = f"{lot_str} ({date_str})"
-        else:
-            b.in_lot = ""
-
-        b.work_lot = getattr(wo, "work_lot", "") if wo else ""
-        b.inspect_lot = getattr(b, "lot_no", "")
-        b.inspector = inspector_by_lot.get(b.lot_no, "")
-        b.program = getattr(b.product, "program_name", "")
-        b.product_name = getattr(b.product, "name", "")
+    # ====== shipment_create 와 동일한 LOT 역추적 (일괄 로더) ======
+    BoxProvenanceLoader.for_request(request).annotate(box_list)
 
     # JSON 응답용으로 직렬화
     results = [
@@ -5,6 +5,7 @@ app_name = 'submaterial'
 
 urlpatterns = [
     path('', views.submaterial_list, name='submaterial_list'),
+    path('export/', views.submaterial_export, name='submaterial_export'),
     path('add/', views.submaterial_add, name='submaterial_add'),
     path('<int:pk>/edit/', views.submaterial_edit, name='submaterial_edit'),
     path('<int:pk>/delete/', views.submaterial_delete, name='submaterial_delete'),
@@ -6,7 +6,10 @@ from django.utils import timezone
 from .models import Submaterial, SubmaterialPrice
 from .forms import SubmaterialForm, SubmaterialPriceForm
 
-def submaterial_list(request):
+from utils.export import XlsxColumn, iter_queryset, xlsx_response
+
+def _filtered_submaterial_qs(request):
+    """목록/엑셀 공용 검색 조건"""
     query = request.GET.get('q', '')
     use_yn = request.GET.get('use_yn', '')
     customer = request.GET.get('customer', '')
@@ -18,6 +21,15 @@ def submaterial_list(request):
         items = items.filter(use_yn=use_yn)
     if customer:
         items = items.filter(customer__name__icontains=customer)
+    return items
+
+
+def submaterial_list(request):
+    query = request.GET.get('q', '')
+    use_yn = request.GET.get('use_yn', '')
+    customer = request.GET.get('customer', '')
+
+    items = _filtered_submaterial_qs(request)
 
     paginator = Paginator(items.order_by('-id'), 10)
     page = request.GET.get('page')
@@ -30,6 +42,28 @@ def submaterial_list(request):
         'customer': customer,
     })
 
+
+SUBMATERIAL_XLSX_COLUMNS = [
+    XlsxColumn('번호', 6),
+    XlsxColumn('품명', 24),
+    XlsxColumn('규격', 24),
+    XlsxColumn('고객사', 18),
+    XlsxColumn('사용여부', 10),
+    XlsxColumn('등록일시', 18, 'yyyy-mm-dd hh:mm'),
+]
+
+
+def submaterial_export(request):
+    qs = _filtered_submaterial_qs(request).order_by('-id').values_list(
+        'name', 'spec', 'customer__name', 'use_yn', 'created_dt',
+    )
+    rows = (
+        [idx, name or '', spec or '', customer or '', use_yn, created]
+        for idx, (name, spec, customer, use_yn, created) in enumerate(iter_queryset(qs), start=1)
+    )
+    now = timezone.now().strftime('%Y%m%d_%H%M%S')
+    return xlsx_response(f'부자재목록_{now}.xlsx', '부자재목록', SUBMATERIAL_XLSX_COLUMNS, rows)
+
 def submaterial_add(request):
     if request.method == 'POST':
         form = SubmaterialForm(request.POST, request.FILES)
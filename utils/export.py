@@ -0,0 +1,163 @@
+# utils/export.py
+"""
+목록 화면 공용 스트리밍 내보내기 (CSV / XLSX)
+
+- StreamingHttpResponse 로 첫 행부터 바로 전송 → 1년치도 즉시 다운로드 시작, 메모리 일정
+- 쿼리셋은 iterator(chunk_size) 로 읽음 → PostgreSQL 서버사이드 커서에서 청크 단위 조회
+- BOM 은 맨 앞에 1회 (엑셀 한글 호환)
+- 행 변환(row_fn)은 객체 속성만 읽어야 함. 파생값은 annotate 로 미리 계산하거나
+  iter_batches() 로 청크 단위 일괄 조회해서 붙인다 (행당 추가 쿼리 금지)
+"""
+import csv
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from urllib.parse import quote
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000   # 서버사이드 커서 fetch 크기
+_FLUSH_ROWS = 200          # 이 행 수만큼 모아서 한 번에 전송
+
+BOM = "\ufeff"
+
+
+def _set_attachment(resp, filename: str, fallback: str):
+    """한글 파일명 호환 Content-Disposition (ASCII 대체명 + RFC 5987)"""
+    ascii_name = filename.encode("ascii", "ignore").decode()
+    if not ascii_name.rsplit(".", 1)[0]:
+        ascii_name = fallback
+    resp["Content-Disposition"] = (
+        f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+    )
+
+
+class Echo:
+    """csv.writer 가 쓴 한 줄을 그대로 돌려주는 버퍼"""
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    """BOM + 헤더 + 행들을 CSV 문자열 조각으로 생성"""
+    writer = csv.writer(Echo())
+    yield BOM + writer.writerow(header)
+    buf = []
+    for row in rows:
+        buf.append(writer.writerow(row))
+        if len(buf) >= _FLUSH_ROWS:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+
+
+def iter_queryset(qs, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """서버사이드 커서 청크 조회(prefetch_related 도 청크 단위로 적용됨)"""
+    return qs.iterator(chunk_size=chunk_size)
+
+
+def iter_batches(qs, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """쿼리셋을 chunk_size 개씩 리스트로 — 청크별 일괄 조회(파생값)용"""
+    it = iter_queryset(qs, chunk_size)
+    while True:
+        batch = list(islice(it, chunk_size))
+        if not batch:
+            return
+        yield batch
+
+
+def csv_response(filename: str, header, rows) -> StreamingHttpResponse:
+    """rows(리스트 이터러블) → 스트리밍 CSV 응답"""
+    resp = StreamingHttpResponse(iter_csv(header, rows), content_type="text/csv; charset=utf-8")
+    _set_attachment(resp, filename, "export.csv")
+    return resp
+
+
+def stream_queryset_csv(qs, filename: str, header, row_fn, *, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """쿼리셋 → row_fn(obj) → 스트리밍 CSV 응답"""
+    return csv_response(filename, header, (row_fn(o) for o in iter_queryset(qs, chunk_size)))
+
+
+# ─────────────────────────────────────────────────────────
+# XLSX (openpyxl write-only)
+#   - 행은 바로 임시파일로 기록(메모리 일정), 저장 후 FileResponse 로 청크 전송
+#   - 열 너비/표시형식은 XlsxColumn 으로 미리 정의 (셀별 스타일 지정 없음)
+# ─────────────────────────────────────────────────────────
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@dataclass(frozen=True)
+class XlsxColumn:
+    title: str
+    width: float = 12
+    number_format: str | None = None   # 예) "#,##0", "yyyy-mm-dd" — 일시 열은 반드시 지정
+
+
+def _xlsx_value(value):
+    """엑셀은 tz 정보를 못 받음 → aware datetime 은 현지 시각(naive)으로"""
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def write_xlsx(fileobj, sheet_title: str, columns, rows) -> int:
+    """write-only 워크북으로 rows 를 fileobj 에 기록. 반환: 데이터 행 수"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title[:31])
+    ws.freeze_panes = "A2"
+    for i, col in enumerate(columns, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = col.width
+
+    header_font = Font(bold=True)
+    center = Alignment(horizontal="center", vertical="center")
+    header = []
+    for col in columns:
+        cell = WriteOnlyCell(ws, value=col.title)
+        cell.font = header_font
+        cell.alignment = center
+        header.append(cell)
+    ws.append(header)
+
+    # 표시형식이 있는 열만 WriteOnlyCell 로 감쌈(나머지는 값 그대로 → 가장 빠른 경로)
+    formatted = [(i, col.number_format) for i, col in enumerate(columns) if col.number_format]
+    count = 0
+    for row in rows:
+        if formatted:
+            row = list(row)
+            for i, fmt in formatted:
+                if i < len(row) and row[i] not in (None, ""):
+                    cell = WriteOnlyCell(ws, value=_xlsx_value(row[i]))
+                    cell.number_format = fmt
+                    row[i] = cell
+        ws.append(row)
+        count += 1
+
+    wb.save(fileobj)
+    return count
+
+
+def xlsx_response(filename: str, sheet_title: str, columns, rows) -> FileResponse:
+    """rows → 임시파일(write-only) → 스트리밍 다운로드 (응답 종료 시 임시파일 자동 삭제)"""
+    tmp = tempfile.TemporaryFile(suffix=".xlsx")
+    write_xlsx(tmp, sheet_title, columns, rows)
+    tmp.seek(0)
+    resp = FileResponse(tmp, content_type=XLSX_CONTENT_TYPE)
+    _set_attachment(resp, filename, "export.xlsx")
+    return resp
+
+
+def stream_queryset_xlsx(qs, filename: str, sheet_title: str, columns, row_fn,
+                         *, chunk_size: int = EXPORT_CHUNK_SIZE) -> FileResponse:
+    """쿼리셋 → row_fn(obj) → XLSX 다운로드"""
+    return xlsx_response(
+        filename, sheet_title, columns, (row_fn(o) for o in iter_queryset(qs, chunk_size))
+    )
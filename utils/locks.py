@@ -0,0 +1,30 @@
+# utils/locks.py
+"""
+PostgreSQL 트랜잭션 범위 advisory lock
+
+집계 테이블처럼 유니크 키 없이 "구간 DELETE → INSERT ... SELECT" 로 다시 쓰는 곳에서
+같은 구간을 동시에 재계산하면 (READ COMMITTED 에서 서로의 새 행을 못 지워) 행이 중복된다.
+재계산 전에 구간 키로 잠그면 두 번째 트랜잭션은 첫 번째 커밋 뒤에 DELETE 하므로 중복이 생기지 않는다.
+- 잠금은 바깥 트랜잭션이 끝날 때 풀림 → 반드시 transaction.atomic 안에서 호출
+- 여러 키는 정렬해서 잠금 (교착 방지)
+"""
+import zlib
+
+from django.db import connection
+
+
+def _namespace_key(namespace: str) -> int:
+    """이름 → int4 (pg_advisory_xact_lock(int4, int4) 의 첫 번째 키)"""
+    h = zlib.crc32(namespace.encode("utf-8"))
+    return h - (1 << 32) if h >= (1 << 31) else h
+
+
+def advisory_xact_lock(namespace: str, keys) -> None:
+    """(namespace, key) 마다 pg_advisory_xact_lock — keys 는 int4 범위의 정수(대개 FK id)"""
+    keys = sorted({int(k) for k in keys if k is not None})
+    if not keys:
+        return
+    ns = _namespace_key(namespace)
+    with connection.cursor() as cur:
+        for key in keys:
+            cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", [ns, key])
@@ -1,23 +1,211 @@
 # utils/lot.py
-from django.db import connection
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections, DEFAULT_DB_ALIAS
 from django.utils import timezone
 from datetime import date as _date  # ★ 추가
 
+
+# ─────────────────────────────────────────────────────────
+# LOT 포맷 / 기존 데이터 위치
+#   - 카운터 키(lot_type)는 next_lot_seq()와 동일한 production_lot_counter 행을 공유
+#   - 시퀀스 자리수는 최소 자리수(넘치면 자연스럽게 늘어남)
+# ─────────────────────────────────────────────────────────
+LOT_FORMATS = {
+    "OR": "OR{ymd}-{seq:03d}",   # 사출 발주
+    "IN": "IN{ymd}{seq:03d}",    # 입고 헤더(사출/통합 공용)
+    "IS": "IS{ymd}{seq:06d}",    # 사출 창고이동
+    "JB": "JB{ymd}-{seq:03d}",   # 작업지시(화면 발급)
+    "J":  "J{ymd}-{seq:03d}",    # 작업지시(모델 save 자동발급)
+    "C":  "C-{ymd}-{seq:02d}",   # 완성 BOX(C-LOT)
+    "SH": "SH{ymd}-{seq:03d}",   # 출하
+}
+
+# 카운터 행이 처음 만들어질 때(=그 날짜 첫 발급) 한 번만 참고하는 기존 LOT 컬럼.
+# 카운터 도입 이전에 발급된 번호와 겹치지 않도록 시작 번호를 맞춘다.
+LOT_SEED_SOURCES = {
+    "OR": [("injectionorder.InjectionOrder", "order_lot")],
+    "IN": [("purchase.InjectionReceipt", "receipt_lot"), ("purchase.UnifiedReceipt", "receipt_lot")],
+    "IS": [("purchase.InjectionIssue", "receipt_lot")],
+    "JB": [("production.WorkOrder", "work_lot")],
+    "J":  [("production.WorkOrder", "work_lot")],
+    "C":  [("quality.FinishedBox", "lot_no"), ("quality.OutgoingFinishedLot", "finished_lot")],
+    "SH": [("sales.SalesShipment", "sh_lot")],
+}
+
+# 프로세스가 한 번에 확보하는 번호 수 (settings.LOT_BLOCK_SIZE 로 조정)
+DEFAULT_LOT_BLOCK_SIZE = 10
+
+_block_lock = threading.Lock()
+_blocks: dict = {}            # (lot_type, lot_date) -> [next_seq, last_seq]
+_local = threading.local()    # 스레드별 카운터 전용 커넥션
+
+
+def _to_lot_date(anchor_dt=None) -> _date:
+    """datetime/date → LOT 기준일(date)"""
+    if anchor_dt is None:
+        anchor_dt = timezone.now()
+
+    # ★ anchor_dt가 date면 그대로 사용, datetime이면 localdate/UTC 보정
+    if isinstance(anchor_dt, _date) and not hasattr(anchor_dt, "hour"):
+        return anchor_dt
+    return timezone.localdate(anchor_dt) if timezone.is_aware(anchor_dt) else anchor_dt.date()
+
+
+def _lot_prefix(lot_type: str, lot_date: _date) -> str:
+    fmt = LOT_FORMATS[lot_type]
+    return fmt.split("{seq", 1)[0].format(ymd=lot_date.strftime("%Y%m%d"))
+
+
+def format_lot(lot_type: str, lot_date: _date, seq: int) -> str:
+    """시퀀스 번호 → LOT 문자열"""
+    return LOT_FORMATS[lot_type].format(ymd=lot_date.strftime("%Y%m%d"), seq=seq)
+
+
+def _seed_seq(lot_type: str, lot_date: _date) -> int:
+    """
+    카운터 도입 이전 데이터의 최대 시퀀스.
+    카운터 행이 없을 때(해당 날짜 첫 발급)만 호출되므로 날짜당 1회.
+    """
+    prefix = _lot_prefix(lot_type, lot_date)
+    last = 0
+    for model_label, field in LOT_SEED_SOURCES.get(lot_type, []):
+        model = apps.get_model(model_label)
+        codes = (
+            model._base_manager
+            .filter(**{f"{field}__startswith": prefix})
+            .values_list(field, flat=True)
+        )
+        for code in codes:
+            tail = code[len(prefix):]
+            if tail.isdigit():
+                last = max(last, int(tail))
+    return last
+
+
+def _counter_connection():
+    """
+    카운터 전용 autocommit 커넥션(스레드별).
+    요청 트랜잭션과 분리해서 카운터 행 잠금을 즉시 풀고,
+    요청이 롤백돼도 이미 나간 번호가 되돌아가 다른 프로세스와 겹치지 않게 한다.
+    (PostgreSQL sequence 와 같은 의미: 번호 공백은 생길 수 있음)
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = connections.create_connection(DEFAULT_DB_ALIAS)
+        _local.conn = conn
+    conn.close_if_unusable_or_obsolete()
+    return conn
+
+
+def reserve_lot_seq(lot_type: str, lot_date: _date, count: int = 1) -> int:
+    """
+    카운터에서 연속된 count 개의 번호를 한 번에 확보하고 첫 번호를 반환한다.
+    - 평상시: UPDATE ... RETURNING 1회
+    - 해당 날짜 첫 발급: 기존 LOT 최대값으로 시작점을 맞춘 뒤 UPSERT 1회
+    """
+    if count < 1:
+        raise ValueError("count는 1 이상이어야 합니다.")
+
+    conn = _counter_connection()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE production_lot_counter
+               SET last_seq = last_seq + %s
+             WHERE lot_type = %s AND lot_date = %s
+            RETURNING last_seq
+            """,
+            [count, lot_type, lot_date],
+        )
+        row = cur.fetchone()
+        if row is None:
+            seed = _seed_seq(lot_type, lot_date)
+            cur.execute(
+                """
+                INSERT INTO production_lot_counter (lot_type, lot_date, last_seq)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (lot_type, lot_date)
+                DO UPDATE SET last_seq = production_lot_counter.last_seq + %s
+                RETURNING last_seq
+                """,
+                [lot_type, lot_date, seed + count, count],
+            )
+            row = cur.fetchone()
+    return row[0] - count + 1
+
+
+def reserve_lots(lot_type: str, count: int, anchor_dt=None) -> list[str]:
+    """연속된 LOT 번호 count 개를 카운터 1회 갱신으로 확보"""
+    lot_date = _to_lot_date(anchor_dt)
+    first = reserve_lot_seq(lot_type, lot_date, count)
+    return [format_lot(lot_type, lot_date, first + i) for i in range(count)]
+
+
+def sub_lot_code(header_lot: str, sub_seq: int) -> str:
+    """서브 LOT: 헤더LOT-XX"""
+    return f"{header_lot}-{sub_seq:02d}"
+
+
+def reserve_lot_tree(lot_type: str, sub_counts, anchor_dt=None) -> list[tuple[str, list[tuple[int, str]]]]:
+    """
+    헤더 LOT len(sub_counts)개 + 각 헤더의 서브 LOT 번호를 카운터 1회 갱신으로 확보.
+    서브 LOT 은 헤더 안에서 1부터 연속이므로 카운터가 필요 없다.
+    반환: [(header_lot, [(sub_seq, sub_lot), ...]), ...]
+    """
+    sub_counts = list(sub_counts)
+    if not sub_counts:
+        return []
+    headers = reserve_lots(lot_type, len(sub_counts), anchor_dt)
+    return [
+        (h, [(seq, sub_lot_code(h, seq)) for seq in range(1, n + 1)])
+        for h, n in zip(headers, sub_counts)
+    ]
+
+
+def _evict_past_blocks(keep) -> None:
+    """오늘 이전 날짜의 남은 블록 정리 (_block_lock 안에서 호출). 버려진 번호는 공백으로 남는다."""
+    today = _to_lot_date()
+    for key in [k for k in _blocks if k[1] < today and k != keep]:
+        del _blocks[key]
+
+
+def next_lot(lot_type: str, anchor_dt=None) -> str:
+    """
+    프로세스가 보유한 블록에서 LOT 1개 발급.
+    블록이 비었을 때만 카운터를 1회 갱신한다(테이블 스캔/재시도 없음).
+    """
+    lot_date = _to_lot_date(anchor_dt)
+    key = (lot_type, lot_date)
+    with _block_lock:
+        block = _blocks.get(key)
+        if block is None or block[0] > block[1]:
+            size = max(int(getattr(settings, "LOT_BLOCK_SIZE", DEFAULT_LOT_BLOCK_SIZE)), 1)
+            first = reserve_lot_seq(lot_type, lot_date, size)
+            block = [first, first + size - 1]
+            _evict_past_blocks(key)
+        seq = block[0]
+        block[0] += 1
+        if block[0] > block[1]:
+            _blocks.pop(key, None)
+        else:
+            _blocks[key] = block
+    return format_lot(lot_type, lot_date, seq)
+
+
 def get_next_lot(lot_type: str, anchor_dt=None) -> str:
     """
     LOT 발급 헬퍼
     - lot_type: 'PO','OR','IN','JB','CP','OT'
     - anchor_dt: datetime 또는 date (없으면 timezone.now())
+    - LOT_FORMATS 에 등록된 유형은 블록 할당기(next_lot) 사용
     """
-    if anchor_dt is None:
-        anchor_dt = timezone.now()
-
-    # ★ anchor_dt가 date면 그대로 사용, datetime이면 localdate/UTC 보정
-    if isinstance(anchor_dt, _date) and not hasattr(anchor_dt, "hour"):
-        lot_date = anchor_dt
-    else:
-        lot_date = timezone.localdate(anchor_dt) if timezone.is_aware(anchor_dt) else anchor_dt.date()
+    if lot_type in LOT_FORMATS:
+        return next_lot(lot_type, anchor_dt)
 
+    lot_date = _to_lot_date(anchor_dt)
     with connection.cursor() as cur:
         cur.execute("SELECT next_lot_seq(%s, %s)", [lot_type, lot_date])
         (lot,) = cur.fetchone()